@@ -1,10 +1,22 @@
 from flask import Flask, render_template, jsonify, request
+import pandas as pd
 import database
+import predictor
+import resampler
 from datetime import datetime
 import pytz
 
 app = Flask(__name__)
 IST = pytz.timezone('Asia/Kolkata')
+# Most rows one /api/predict/batch request may score; the forest walk
+# allocates rows x trees arrays
+PREDICT_BATCH_LIMIT = 1000
+
+@app.before_request
+def start_predictor():
+    # Load the model and start its reload watcher with the first request, in
+    # the serving process only (not on import, nor in the debug reloader's parent)
+    predictor.start()
 
 @app.route('/')
 def index():
@@ -17,28 +29,98 @@ def get_data_api():
     limit_str = request.args.get('limit', '200')
     start_date = request.args.get('start')
     end_date = request.args.get('end')
+    # Defaults to the index; any registered constituent, e.g. symbol=RELIANCE.NS
+    symbol = request.args.get('symbol')
+    # Optional projection, e.g. fields=close,rsi_14,target
+    fields = request.args.get('fields')
+    columns = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
     
     try:
         limit = int(limit_str)
-        df = database.get_data(timeframe, start_date=start_date, end_date=end_date, limit=limit)
+        if timeframe == 'features_merged':
+            df = database.get_features(start_date=start_date, end_date=end_date, limit=limit, columns=columns)
+        elif timeframe not in database.TIMEFRAMES:
+            # Custom timeframes (30m, 2h, 4h...) are built from stored bars on request
+            df = resampler.get_resampled(timeframe, start_date=start_date, end_date=end_date,
+                                         limit=limit, symbol=symbol)
+            if columns is not None:
+                columns = [c for c in columns if c not in ('ts', 'timestamp')]
+                unknown = [c for c in columns if c not in df.columns]
+                if unknown:
+                    raise ValueError(f"Unknown columns for {timeframe}: {', '.join(unknown)}")
+                df = df[columns]
+        else:
+            df = database.get_data(timeframe, start_date=start_date, end_date=end_date, limit=limit,
+                                   columns=columns, symbol=symbol)
         
-        # Format for frontend
-        data = []
-        for index, row in df.iterrows():
-            record = row.to_dict()
-            # Ensure timestamp is formatted
-            record['timestamp'] = index.strftime('%Y-%m-%d %H:%M:%S')
-            data.append(record)
+        # Format for frontend: missing values as null, timestamp as text.
+        # Categorical columns are decoded to their labels only here.
+        records = df.astype(object).where(df.notna(), None)
+        records.insert(0, 'timestamp', df.index.strftime('%Y-%m-%d %H:%M:%S'))
+        data = records.to_dict('records')
             
         return jsonify({
             'status': 'success', 
             'data': data,
-            'timeframe': timeframe
+            'timeframe': timeframe,
+            'symbol': symbol or database.DEFAULT_SYMBOL
         })
         
+    except ValueError as e:
+        # Unknown fields, a bad limit
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/predict')
+def predict_api():
+    """
+    Prediction for the latest bar of features_merged.
+    """
+    try:
+        results, served = predictor.predict_latest()
+        return jsonify({'status': 'success', 'model': served['path'], **results[0]})
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/predict/batch', methods=['GET', 'POST'])
+def predict_batch_api():
+    """
+    GET: predictions for the latest `limit` bars (default 50).
+    POST: predictions for {"rows": [{feature: value, ...}, ...]}; a row's
+    "timestamp" supplies the hour feature, categoricals may be labels or codes.
+    Either way at most PREDICT_BATCH_LIMIT rows.
+    """
+    try:
+        if request.method == 'POST':
+            rows = (request.get_json(silent=True) or {}).get('rows')
+            if not rows or not isinstance(rows, list):
+                return jsonify({'status': 'error', 'message': "Expected a JSON body with 'rows'"}), 400
+            if len(rows) > PREDICT_BATCH_LIMIT:
+                return jsonify({'status': 'error',
+                                'message': f"At most {PREDICT_BATCH_LIMIT} rows per request"}), 400
+            df = pd.DataFrame(rows)
+            if 'timestamp' in df.columns:
+                df.index = pd.to_datetime(df.pop('timestamp'))
+            served = predictor.current()
+            results = predictor.predict(df, served)
+        else:
+            limit = request.args.get('limit', '50')
+            if not limit.isdigit() or int(limit) == 0:
+                return jsonify({'status': 'error', 'message': "limit must be a positive integer"}), 400
+            results, served = predictor.predict_latest(min(int(limit), PREDICT_BATCH_LIMIT))
+        return jsonify({'status': 'success', 'model': served['path'], 'predictions': results})
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/symbols')
+def get_symbols():
+    return jsonify({'status': 'success', 'symbols': database.list_symbols()})
+
 @app.route('/api/status')
 def get_status():
     now_ist = datetime.now(IST)
@@ -54,7 +136,8 @@ def get_status():
             
     return jsonify({
         'current_time': now_ist.strftime('%Y-%m-%d %H:%M:%S'),
-        'market_open': market_open
+        'market_open': market_open,
+        'query_cache': database.cache_info()
     })
 
 if __name__ == '__main__':
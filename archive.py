@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import pandas as pd
+import database
+
+# Immutable columnar archive for closed months, one Parquet file per
+# (table, IST month): archive/<table>/<YYYY-MM>.parquet. Each table's
+# manifest records the watermark: every row with ts below it lives in the
+# archive and no longer in SQLite.
+ARCHIVE_DIR = 'archive'
+IST = 'Asia/Kolkata'
+ARCHIVED_TABLES = ['nifty_15m', 'nifty_1h', 'nifty_1d', 'nifty_1wk', 'features_merged']
+# Months kept hot in SQLite, including the current one
+KEEP_MONTHS = 2
+ROW_GROUP_SIZE = 50000
+# Tables whose newest archived row also stays in SQLite: feature_builder's
+# as-of join looks up the daily bar before each hot session there
+KEEP_LAST_ARCHIVED = {'nifty_1d'}
+
+_manifests = {}
+
+def _table_dir(table):
+    return os.path.join(ARCHIVE_DIR, table)
+
+def _manifest_path(table):
+    return os.path.join(_table_dir(table), '_manifest.json')
+
+def load_manifest(table):
+    """
+    Manifest for `table`, re-read only when the file changes on disk.
+    """
+    path = _manifest_path(table)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {'watermark': None, 'months': []}
+    cached = _manifests.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path) as f:
+            cached = (mtime, json.load(f))
+        _manifests[path] = cached
+    return cached[1]
+
+def _save_manifest(table, manifest):
+    path = _manifest_path(table)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def watermark(table):
+    return load_manifest(table)['watermark']
+
+def month_start(month):
+    """
+    Epoch seconds of 00:00 IST on the first day of 'YYYY-MM'.
+    """
+    return int(pd.Timestamp(f'{month}-01', tz=IST).timestamp())
+
+def _next_month(month):
+    return (pd.Period(month, 'M') + 1).strftime('%Y-%m')
+
+def _months_of(ts):
+    return database.from_epoch(ts).strftime('%Y-%m')
+
+def read(table, columns=None, start_ts=None, end_ts=None, limit=None):
+    """
+    Archived rows of `table` (with a ts column), newest first. Only month
+    files overlapping [start_ts, end_ts] are opened, only the requested
+    columns are decoded and the ts bounds are pushed into the Parquet reader.
+    With a limit, months are read newest-first until enough rows are found.
+    """
+    manifest = load_manifest(table)
+    months = sorted(manifest['months'], reverse=True)
+    filters = []
+    if start_ts is not None:
+        filters.append(('ts', '>=', int(start_ts)))
+        months = [m for m in months if month_start(_next_month(m)) > start_ts]
+    if end_ts is not None:
+        filters.append(('ts', '<=', int(end_ts)))
+        months = [m for m in months if month_start(m) <= end_ts]
+
+    import pyarrow.parquet as pq
+    frames, rows = [], 0
+    for month in months:
+        path = os.path.join(_table_dir(table), f'{month}.parquet')
+        cols = None
+        if columns is not None:
+            # Files written before a column was added simply lack it
+            available = set(pq.read_schema(path).names)
+            cols = ['ts'] + [c for c in columns if c in available and c != 'ts']
+        part = pq.read_table(path, columns=cols, filters=filters or None).to_pandas()
+        frames.append(part.sort_values('ts', ascending=False))
+        rows += len(part)
+        if limit is not None and rows >= limit:
+            break
+
+    if not frames:
+        return pd.DataFrame(columns=['ts'] + list(columns or []))
+    df = pd.concat(frames, ignore_index=True)
+    return df.head(limit) if limit is not None else df
+
+def compact(table, keep_months=KEEP_MONTHS):
+    """
+    Move closed months of `table` older than the newest `keep_months` months
+    out of SQLite into immutable Parquet files, then advance the watermark.
+    """
+    current = pd.Timestamp.now(tz=IST).strftime('%Y-%m')
+    boundary_month = (pd.Period(current, 'M') - (keep_months - 1)).strftime('%Y-%m')
+    boundary = month_start(boundary_month)
+    manifest = load_manifest(table)
+    old_watermark = manifest['watermark']
+    if old_watermark is not None and old_watermark >= boundary:
+        print(f"{table}: nothing to compact before {boundary_month}.")
+        return
+
+    with database.pooled_connection() as conn:
+        query = f"SELECT * FROM {table} WHERE ts < ?"
+        params = [boundary]
+        if old_watermark is not None:
+            query += " AND ts >= ?"
+            params.append(old_watermark)
+        df = pd.read_sql_query(query, conn, params=params)
+
+        os.makedirs(_table_dir(table), exist_ok=True)
+        new_months = []
+        for month, part in df.groupby(_months_of(df['ts'])):
+            path = os.path.join(_table_dir(table), f'{month}.parquet')
+            tmp_path = path + '.tmp'
+            part.sort_values('ts').to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+            os.replace(tmp_path, path)
+            new_months.append(month)
+
+        # Readers switch to the archive for these months as soon as the
+        # manifest lands; SQLite rows below the watermark are ignored even if
+        # the delete below never happens.
+        _save_manifest(table, {
+            'watermark': boundary,
+            'months': sorted(set(manifest['months']) | set(new_months)),
+        })
+        if table in KEEP_LAST_ARCHIVED:
+            conn.execute(f"DELETE FROM {table} WHERE ts < ? AND ts < "
+                         f"(SELECT MAX(ts) FROM {table} WHERE ts < ?)", (boundary, boundary))
+        else:
+            conn.execute(f"DELETE FROM {table} WHERE ts < ?", (boundary,))
+        database.bump_versions(conn, [table])
+        conn.commit()
+
+    print(f"{table}: archived {len(df)} rows in {len(new_months)} month files before {boundary_month}.")
+
+def compact_all(keep_months=KEEP_MONTHS):
+    with database.pooled_connection() as conn:
+        existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    symbol_tables = [database.candle_table(tf, symbol)
+                     for symbol in database.list_symbols()[1:] for tf in database.TIMEFRAMES]
+    for table in ARCHIVED_TABLES + symbol_tables:
+        if table in existing:
+            compact(table, keep_months)
+
+if __name__ == '__main__':
+    compact_all(int(sys.argv[1]) if len(sys.argv) > 1 else KEEP_MONTHS)
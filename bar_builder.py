@@ -0,0 +1,257 @@
+import sys
+import time
+import pandas as pd
+import database
+import nse_calendar
+import process_data
+import streaming_indicators
+
+# Epoch arithmetic for the per-tick path: IST has no DST, so session
+# boundaries are fixed offsets from 00:00 IST.
+IST_OFFSET = 19800
+DAY_SECONDS = 86400
+OPEN_SECONDS = int(nse_calendar.SESSION_OPEN.total_seconds())
+CLOSE_SECONDS = int(nse_calendar.SESSION_CLOSE.total_seconds())
+DEFAULT_TIMEFRAMES = ('15m', '1h', '1d')
+# Closed candles buffered per timeframe before one store_data call
+FLUSH_SIZE = 50
+# Wall-clock seconds a closed candle may wait in the buffer; 0 writes each
+# candle as it closes. Keeps live 15m/1h/1d candles from waiting on FLUSH_SIZE.
+FLUSH_INTERVAL = 5
+# Minimum tick-time seconds between partial-candle pushes to an engine.
+# Evaluating a forming candle copies the engine state, so it is throttled.
+PARTIAL_INTERVAL = 5
+
+def bucket_start(ts, interval):
+    """
+    Epoch seconds of the start of the `interval` bar holding epoch second `ts`;
+    None for an intraday interval outside the session. Scalar twin of
+    nse_calendar.bucket_starts.
+    """
+    day = (ts + IST_OFFSET) // DAY_SECONDS * DAY_SECONDS - IST_OFFSET
+    if interval == '1d':
+        return day
+    if interval == '1wk':
+        # Epoch day 0 was a Thursday
+        return day - ((day + IST_OFFSET) // DAY_SECONDS + 3) % 7 * DAY_SECONDS
+    offset = ts - day
+    if offset < OPEN_SECONDS or offset >= CLOSE_SECONDS:
+        return None
+    length = int(nse_calendar.interval_length(interval).total_seconds())
+    return day + OPEN_SECONDS + (offset - OPEN_SECONDS) // length * length
+
+class ReplaySource:
+    """
+    Replays ticks or 1-minute bars from a CSV file in file order.
+    Tick files have timestamp, price[, volume] columns; bar files have
+    timestamp, open, high, low, close[, volume]. Yields
+    (epoch seconds, open, high, low, close, volume); a tick is a bar with
+    open == high == low == close.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        df = pd.read_csv(self.path)
+        ts = database.to_epoch(pd.to_datetime(df['timestamp'], format='ISO8601')).tolist()
+        volume = df['volume'].tolist() if 'volume' in df.columns else [0] * len(df)
+        if 'price' in df.columns:
+            price = df['price'].tolist()
+            return zip(ts, price, price, price, price, volume)
+        return zip(ts, df['open'].tolist(), df['high'].tolist(), df['low'].tolist(),
+                   df['close'].tolist(), volume)
+
+class BarBuilder:
+    """
+    Keeps the in-progress candle of each timeframe in memory while ticks or
+    1-minute bars stream in. A candle closes when the first update of the next
+    bucket arrives (or close_due passes its end); closed candles are written to
+    the database in batches of up to `flush_size`, and no later than
+    `flush_interval` wall-clock seconds after they close. Timeframes with a streaming
+    indicator engine also get the forming candle evaluated at most every
+    `partial_interval` seconds of tick time; the latest values are kept in
+    `latest` and passed to `on_partial(timeframe, start, bar, values)`.
+    """
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, symbol=None, flush_size=FLUSH_SIZE,
+                 engines=None, partial_interval=PARTIAL_INTERVAL, on_partial=None,
+                 flush_interval=FLUSH_INTERVAL):
+        self.timeframes = list(timeframes)
+        self.symbol = symbol
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.engines = engines or {}
+        self.partial_interval = partial_interval
+        self.on_partial = on_partial
+        self.lengths = {tf: None if tf in ('1d', '1wk') else
+                        int(nse_calendar.interval_length(tf).total_seconds()) for tf in self.timeframes}
+        # [start, open, high, low, close, volume] per timeframe
+        self.bars = {tf: None for tf in self.timeframes}
+        self.closed = {tf: [] for tf in self.timeframes}
+        # Monotonic time the oldest buffered closed candle was closed
+        self._pending_since = None
+        self.latest = {}
+        self._last_push = {tf: None for tf in self.engines}
+        self._committed = {tf: self._engine_epoch(engine) for tf, engine in self.engines.items()}
+        self.ticks = 0
+        self.late = 0
+        self.stored = 0
+
+    @staticmethod
+    def _engine_epoch(engine):
+        if engine.last_timestamp is None:
+            return None
+        return int(database.to_epoch([pd.Timestamp(engine.last_timestamp)])[0])
+
+    def update(self, ts, o, h, l, c, v=0):
+        """
+        Fold one tick (o == h == l == c) or 1-minute bar starting at epoch `ts`.
+        """
+        ts = int(ts)
+        self.ticks += 1
+        if self._pending_since is not None:
+            self.flush_due()
+        day = (ts + IST_OFFSET) // DAY_SECONDS * DAY_SECONDS - IST_OFFSET
+        offset = ts - day
+        # Pre-open and post-close prints don't shape any candle, daily included
+        if offset < OPEN_SECONDS or offset >= CLOSE_SECONDS:
+            return
+        for tf in self.timeframes:
+            length = self.lengths[tf]
+            if length is not None:
+                start = day + OPEN_SECONDS + (offset - OPEN_SECONDS) // length * length
+            else:
+                start = day if tf == '1d' else bucket_start(ts, tf)
+
+            bar = self.bars[tf]
+            if bar is not None and start == bar[0]:
+                if h > bar[2]:
+                    bar[2] = h
+                if l < bar[3]:
+                    bar[3] = l
+                bar[4] = c
+                bar[5] += v
+            elif bar is not None and start < bar[0]:
+                # Out-of-order update for a candle that has already closed
+                self.late += 1
+                continue
+            else:
+                if bar is not None:
+                    self._close(tf, bar)
+                bar = self.bars[tf] = [start, o, h, l, c, v]
+
+            if tf in self.engines:
+                last = self._last_push[tf]
+                if last is None or ts - last >= self.partial_interval:
+                    self._last_push[tf] = ts
+                    self._push_partial(tf, bar)
+
+    def _as_dict(self, bar):
+        return {'open': bar[1], 'high': bar[2], 'low': bar[3], 'close': bar[4], 'volume': bar[5]}
+
+    def _push_partial(self, tf, bar):
+        values = self.engines[tf].update(self._as_dict(bar), commit=False)
+        self.latest[tf] = (bar[0], values)
+        if self.on_partial is not None:
+            self.on_partial(tf, bar[0], self._as_dict(bar), values)
+
+    def _close(self, tf, bar):
+        engine = self.engines.get(tf)
+        committed = self._committed.get(tf)
+        if engine is not None and (committed is None or bar[0] > committed):
+            engine.update(self._as_dict(bar), database.from_epoch([bar[0]])[0])
+            self._committed[tf] = bar[0]
+            self._last_push[tf] = None
+        self.closed[tf].append(bar)
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        if len(self.closed[tf]) >= self.flush_size:
+            self.flush([tf])
+        else:
+            self.flush_due()
+
+    def flush_due(self):
+        """
+        Flush when the oldest buffered candle has waited flush_interval seconds.
+        """
+        if self._pending_since is not None and time.monotonic() - self._pending_since >= self.flush_interval:
+            self.flush()
+
+    def close_due(self, now):
+        """
+        Close every candle whose bucket ended at or before epoch `now`, e.g.
+        from a timer after the session closes when no further ticks arrive.
+        """
+        for tf, bar in self.bars.items():
+            if bar is None:
+                continue
+            if self.lengths[tf] is None:
+                end = bar[0] + CLOSE_SECONDS
+            else:
+                day = (bar[0] + IST_OFFSET) // DAY_SECONDS * DAY_SECONDS - IST_OFFSET
+                end = min(bar[0] + self.lengths[tf], day + CLOSE_SECONDS)
+            if tf == '1wk':
+                end += 4 * DAY_SECONDS
+            if end <= now:
+                self._close(tf, bar)
+                self.bars[tf] = None
+        self.flush_due()
+
+    def flush(self, timeframes=None):
+        """
+        Write buffered closed candles with one store_data call per timeframe.
+        """
+        for tf in timeframes or self.timeframes:
+            rows = self.closed[tf]
+            if not rows:
+                continue
+            self.closed[tf] = []
+            df = pd.DataFrame([r[1:] for r in rows], columns=['open', 'high', 'low', 'close', 'volume'],
+                              index=database.from_epoch([r[0] for r in rows]))
+            database.store_data(df, tf, self.symbol)
+            self.stored += len(df)
+        if not any(self.closed.values()):
+            self._pending_since = None
+
+    def finish(self):
+        """
+        End of stream: close the forming candles and flush everything.
+        """
+        for tf, bar in self.bars.items():
+            if bar is not None:
+                self._close(tf, bar)
+                self.bars[tf] = None
+        self.flush()
+
+def load_engines(timeframes=DEFAULT_TIMEFRAMES, symbol=None):
+    """
+    Streaming engines for the timeframes that have one, resumed from the
+    process_data checkpoints when they exist. The builder never saves them;
+    stream_signals stays the owner of the checkpoint files.
+    """
+    engines = {}
+    for tf in timeframes:
+        if tf in streaming_indicators.ENGINES:
+            engine = streaming_indicators.load_checkpoint(process_data.checkpoint_path(tf, symbol))
+            engines[tf] = engine or streaming_indicators.new_engine(tf)
+    return engines
+
+def run(source, builder):
+    """
+    Drain `source` into `builder` and flush at the end. Returns ticks per second.
+    """
+    start = time.perf_counter()
+    update = builder.update
+    for row in source:
+        update(*row)
+    builder.finish()
+    return builder.ticks / (time.perf_counter() - start)
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python bar_builder.py <replay.csv> [symbol]")
+        sys.exit(1)
+    symbol = sys.argv[2] if len(sys.argv) > 2 else None
+    builder = BarBuilder(symbol=symbol, engines=load_engines(symbol=symbol))
+    rate = run(ReplaySource(sys.argv[1]), builder)
+    print(f"Replayed {builder.ticks} updates at {rate:,.0f}/s, stored {builder.stored} candles, "
+          f"{builder.late} late updates dropped.")
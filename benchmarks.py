@@ -0,0 +1,971 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+# Resolved against this file so benchmarks can run from a scratch directory
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nifty50_hourly_targets.csv')
+
+def load_sample_ohlc():
+    df = pd.read_csv(CSV_PATH, index_col=0)
+    df.index = pd.to_datetime(df.index)
+    return df[['open', 'high', 'low', 'close', 'volume']]
+
+def scaled_ohlc(rows):
+    """
+    Repeat the sample candles up to `rows` bars, alternating forward and
+    reversed copies so prices stay continuous and bounded at each joint.
+    """
+    base = load_sample_ohlc()
+    values = base.values
+    copies = []
+    for i in range(-(-rows // len(base))):
+        copies.append(values if i % 2 == 0 else values[::-1])
+    values = np.concatenate(copies)[:rows]
+    index = pd.date_range('2000-01-03 09:15', periods=rows, freq='h', tz='Asia/Kolkata', name='timestamp')
+    return pd.DataFrame(values, index=index, columns=base.columns)
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def compare_frames(expected, actual, rtol=1e-7, atol=1e-6):
+    """
+    Column-by-column parity check; returns a list of mismatching column names.
+    """
+    mismatched = []
+    for col in expected.columns:
+        a, b = expected[col], actual[col]
+        if isinstance(b.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(a):
+            same = (a.astype(object).fillna('') == b.astype(object).fillna('')).all()
+        else:
+            same = np.allclose(a.astype(float), b.astype(float), rtol=rtol, atol=atol, equal_nan=True)
+        if not same:
+            mismatched.append(col)
+    return mismatched
+
+def bench_indicators(rows=1_000_000):
+    """
+    Parity of the numpy indicator backend against pandas_ta on the sample CSV,
+    then timings for both backends on the sample and on `rows` scaled bars.
+    """
+    import indicators
+
+    sample = load_sample_ohlc()
+    for name in ('calculate_hourly_indicators', 'calculate_daily_indicators'):
+        fn = getattr(indicators, name)
+        expected = fn(sample.copy())
+        actual = fn(sample.copy(), backend='numpy')
+        mismatched = compare_frames(expected, actual)
+        print(f"{name} parity: {'OK' if not mismatched else 'MISMATCH ' + str(mismatched)}")
+
+    for label, df in (('sample', sample), (f'{rows} rows', scaled_ohlc(int(rows)))):
+        _, t_pandas = timed(indicators.calculate_hourly_indicators, df.copy())
+        _, t_numpy = timed(indicators.calculate_hourly_indicators, df.copy(), backend='numpy')
+        print(f"hourly indicators, {label}: pandas {t_pandas:.3f}s | numpy {t_numpy:.3f}s "
+              f"| speedup {t_pandas / t_numpy:.1f}x")
+
+def remove_database(path):
+    """
+    Close the pooled connections and delete the database file and its WAL files.
+    """
+    import database
+
+    database.close_pool()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def fresh_database(path, pragmas=None):
+    """
+    Point database.py at a new, empty database file with the declared tables.
+    """
+    import database
+
+    remove_database(path)
+    database.DB_NAME = path
+    if pragmas is not None:
+        database.PRAGMAS = pragmas
+    database.init_db()
+
+def build_feature_db(path, rows, stored=None):
+    """
+    A fresh database at `path` for the training benchmarks: `rows` hourly
+    bars with indicators and targets (only the first `stored` written, all by
+    default), their daily bars, features_merged built from both and an empty
+    feature cache. Returns the hourly frame.
+    """
+    import tempfile
+    import database
+    import feature_cache
+    import indicators
+    import process_data
+
+    hourly = process_data.add_targets(indicators.calculate_hourly_indicators(scaled_ohlc(rows), backend='numpy'))
+    daily = hourly[['open', 'high', 'low', 'close', 'volume']].resample('D').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+    fresh_database(path)
+    feature_cache.CACHE_DIR = tempfile.mkdtemp()
+    database.store_data(indicators.calculate_daily_indicators(daily, backend='numpy'), '1d')
+    database.store_data(hourly.iloc[:stored], '1h')
+    return hourly
+
+def remove_feature_db(path):
+    """
+    Delete a build_feature_db database and its feature cache.
+    """
+    import shutil
+    import feature_cache
+
+    remove_database(path)
+    shutil.rmtree(feature_cache.CACHE_DIR, ignore_errors=True)
+
+def bench_concurrent_reads(rows=100_000, readers=4):
+    """
+    Latency of /api/data?limit=1000 from several threads while another
+    process (the updater) upserts `rows` hourly bars, with sqlite's default
+    rollback journal vs the pooled WAL configuration.
+    """
+    import multiprocessing
+    import database
+    import indicators
+    from app import app
+
+    rows, readers = int(rows), int(readers)
+    df = indicators.calculate_hourly_indicators(scaled_ohlc(rows), backend='numpy')
+    client = app.test_client()
+    tuned = dict(database.PRAGMAS)
+    configs = (('rollback journal', {'journal_mode': 'DELETE'}), ('WAL + pragmas', tuned))
+
+    for label, pragmas in configs:
+        path = 'bench_concurrent.db'
+        fresh_database(path, pragmas)
+        database.store_data(df, '1h')
+
+        latencies = []
+        writer = multiprocessing.get_context('fork').Process(
+            target=database.store_data, args=(df.assign(close=df['close'] + 1), '1h'))
+
+        def read_loop():
+            while writer.is_alive():
+                _, elapsed = timed(client.get, '/api/data?timeframe=1h&limit=1000')
+                latencies.append(elapsed)
+
+        start = time.perf_counter()
+        writer.start()
+        threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        writer.join()
+        write_time = time.perf_counter() - start
+        for t in threads:
+            t.join()
+
+        lat = np.array(latencies) * 1000
+        print(f"{label}: store_data {write_time:.2f}s | {len(lat)} reads | "
+              f"p50 {np.percentile(lat, 50):.1f}ms p99 {np.percentile(lat, 99):.1f}ms "
+              f"max {lat.max():.1f}ms")
+        remove_database(path)
+    database.PRAGMAS = tuned
+
+def bench_typed_reads(rows=100_000, repeats=5):
+    """
+    Memory and latency of reading `rows` hourly bars: the old untyped
+    SELECT * against a projected, typed read (float32 indicators).
+    """
+    import database
+    import indicators
+
+    rows, repeats = int(rows), int(repeats)
+    path = 'bench_typed.db'
+    fresh_database(path)
+    database.store_data(indicators.calculate_hourly_indicators(scaled_ohlc(rows), backend='numpy'), '1h')
+
+    def untyped():
+        with database.pooled_connection() as conn:
+            df = pd.read_sql_query("SELECT * FROM nifty_1h ORDER BY ts DESC LIMIT ?", conn, params=(rows,))
+        return df.set_index('ts')
+
+    cases = (
+        ('untyped SELECT *', untyped),
+        ('typed, all columns', lambda: database.get_data('1h', limit=rows)),
+        ('typed, all columns, float32', lambda: database.get_data('1h', limit=rows, float32=True)),
+        ('typed, close + target', lambda: database.get_data('1h', limit=rows, columns=['close', 'target'])),
+    )
+    for label, read in cases:
+        times = []
+        for _ in range(repeats):
+            df, elapsed = timed(read)
+            times.append(elapsed)
+        mb = df.memory_usage(deep=True).sum() / 2**20
+        print(f"{label}: {len(df)} rows x {df.shape[1]} cols | {mb:.1f} MiB | "
+              f"median {np.median(times) * 1000:.0f}ms")
+    remove_database(path)
+
+def bench_symbols(symbols=50, rows=5000, workers=None):
+    """
+    Full hourly/daily recompute of `symbols` synthetic constituents with
+    `rows` hourly bars each, serial vs a process pool of `workers`.
+    """
+    import database
+    import process_data
+
+    symbols, rows = int(symbols), int(rows)
+    workers = int(workers) if workers else os.cpu_count()
+    base = scaled_ohlc(rows)
+    names = [f'SYN{i:02d}.NS' for i in range(symbols)]
+
+    for label, n in (('serial', 1), (f'{workers} workers', workers)):
+        path = 'bench_symbols.db'
+        fresh_database(path)
+        for i, name in enumerate(names):
+            # Each symbol trades at its own price level
+            df = base.copy()
+            df[['open', 'high', 'low', 'close']] *= 0.05 + i / 10
+            database.store_data(df, '1h', name)
+            database.store_data(df.resample('1D').agg({'open': 'first', 'high': 'max', 'low': 'min',
+                                                        'close': 'last', 'volume': 'sum'}).dropna(),
+                                '1d', name)
+        failed, elapsed = timed(process_data.process_symbols, names, n, 'numpy')
+        print(f"{label}: {symbols} symbols x {rows} bars in {elapsed:.2f}s "
+              f"({symbols * rows / elapsed:,.0f} bars/s), {len(failed)} failed")
+        remove_database(path)
+
+def bench_incremental_fetch(new_bars=3, holes=5):
+    """
+    One 1h update cycle against a FileProvider serving the sample candles, with
+    the newest `new_bars` bars and `holes` whole days missing from the database:
+    the old fixed 5d refetch vs fetch_missing plus gap backfill.
+    """
+    import tempfile
+    import database
+    import data_fetcher
+
+    new_bars, holes = int(new_bars), int(holes)
+    source = load_sample_ohlc()
+    source.index = source.index.tz_convert('Asia/Kolkata')
+    source_dir = tempfile.mkdtemp()
+    source.to_csv(os.path.join(source_dir, 'nifty_1h.csv'))
+    days = pd.Series(source.index.strftime('%Y-%m-%d'))
+    dropped_days = days.drop_duplicates().iloc[-60:-5].sample(holes, random_state=0)
+    stored = source.iloc[:-new_bars][~days.iloc[:-new_bars].isin(dropped_days).to_numpy()]
+
+    def fixed_period():
+        df = data_fetcher.fetch_latest_data('1h')
+        return database.store_data(df, '1h')
+
+    def incremental():
+        database.store_data(data_fetcher.fetch_missing('1h'), '1h')
+        data_fetcher.backfill_gaps('1h')
+
+    for label, cycle in (('fixed 5d refetch', fixed_period), ('incremental + gaps', incremental)):
+        fresh_database('bench_fetch.db')
+        database.store_data(stored, '1h')
+        provider = data_fetcher.FileProvider(source_dir)
+        previous = data_fetcher.set_provider(provider)
+        # The second cycle is the steady state: nothing new, gaps already handled
+        for run in ('first cycle', 'next cycle'):
+            provider.requests.clear()
+            _, elapsed = timed(cycle)
+            rows = sum(r[2] for r in provider.requests)
+            missing = len(source) - len(database.get_data('1h', columns=[]))
+            print(f"{label}, {run}: {len(provider.requests)} requests, {rows} rows transferred, "
+                  f"{elapsed * 1000:.0f}ms, {missing} bars still missing")
+        data_fetcher.set_provider(previous)
+        remove_database('bench_fetch.db')
+
+def split_hourly(hourly):
+    """
+    15m bars that resample exactly back to `hourly`: each hour's range sits in
+    its first quarter and the later quarters stay flat at the close. The
+    15:15 bar is a single quarter (the session closes at 15:30).
+    """
+    counts = np.where(hourly.index.strftime('%H:%M') == '15:15', 1, 4)
+    df = hourly.loc[hourly.index.repeat(counts)].copy()
+    quarter = df.groupby(level=0).cumcount().to_numpy()
+    df.index = (df.index + pd.to_timedelta(15 * quarter, unit='min')).rename('timestamp')
+    later = quarter > 0
+    for col in ('open', 'high', 'low'):
+        df.loc[later, col] = df.loc[later, 'close']
+    df.loc[later, 'volume'] = 0
+    return df
+
+def bench_update_cycle(latency=1.0, new_bars=3):
+    """
+    One realtime update cycle against a FileProvider that sleeps `latency`
+    seconds per request, with the stages run one at a time vs as the
+    concurrent graph. Reports per-stage timings of both.
+    """
+    import tempfile
+    import database
+    import data_fetcher
+    import realtime_updater
+    import resampler
+
+    latency, new_bars = float(latency), int(new_bars)
+    hourly = load_sample_ohlc()
+    hourly.index = hourly.index.tz_convert('Asia/Kolkata')
+    quarter = split_hourly(hourly)
+    daily = resampler.resample(hourly, '1d')
+    source_dir = tempfile.mkdtemp()
+    quarter.to_csv(os.path.join(source_dir, 'nifty_15m.csv'))
+    daily.to_csv(os.path.join(source_dir, 'nifty_1d.csv'))
+
+    for label, workers in (('sequential', 1), ('concurrent graph', None)):
+        fresh_database('bench_cycle.db')
+        database.store_data(hourly.iloc[:-new_bars], '1h')
+        database.store_data(quarter[quarter.index < hourly.index[-new_bars]], '15m')
+        database.store_data(daily.iloc[:-1], '1d')
+        for tf in ('1h', '1d'):
+            if os.path.exists(f'indicator_state_{tf}.json'):
+                os.remove(f'indicator_state_{tf}.json')
+        previous = data_fetcher.set_provider(data_fetcher.FileProvider(source_dir, latency))
+        # Checkpoints and warm caches come from a first cycle; the second is the steady state
+        realtime_updater.run_stages(realtime_updater.build_stages(False), workers)
+        with database.pooled_connection() as conn:
+            for tf, cutoff in (('1h', hourly.index[-new_bars]), ('15m', hourly.index[-new_bars])):
+                conn.execute(f"DELETE FROM nifty_{tf} WHERE ts >= ?", (int(cutoff.timestamp()),))
+            conn.commit()
+        start = time.perf_counter()
+        _, report = realtime_updater.run_stages(realtime_updater.build_stages(False), workers)
+        print(f"{label}:")
+        realtime_updater.print_report(report, time.perf_counter() - start)
+        data_fetcher.set_provider(previous)
+        database.close_pool()
+
+def replay_session(sessions=5, per_second=2, seed=0):
+    """
+    Synthetic tick stream: a random walk around the sample's last close,
+    `per_second` ticks per second through each of `sessions` full sessions.
+    """
+    import bar_builder
+
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2024-01-01', periods=sessions, tz='Asia/Kolkata')
+    offsets = np.arange(bar_builder.OPEN_SECONDS * per_second, bar_builder.CLOSE_SECONDS * per_second) / per_second
+    stamps = (days.values[:, None] + pd.to_timedelta(offsets, unit='s').values[None, :]).ravel()
+    price = load_sample_ohlc()['close'].iloc[-1] + np.cumsum(rng.normal(0, 0.5, len(stamps)))
+    index = pd.DatetimeIndex(stamps, name='timestamp').tz_localize('UTC').tz_convert('Asia/Kolkata')
+    return pd.DataFrame({'price': price.round(2), 'volume': rng.integers(1, 100, len(stamps))}, index=index)
+
+def bench_bar_builder(sessions=5, per_second=2):
+    """
+    Ticks per second through bar_builder on a replayed tick file, with and
+    without partial-candle pushes to the indicator engines, plus the same
+    session replayed as 1-minute bars. The built candles are checked against
+    resampler.resample of the raw stream.
+    """
+    import tempfile
+    import bar_builder
+    import database
+    import resampler
+
+    ticks = replay_session(int(sessions), int(per_second))
+    minutes = resampler.resample(ticks.rename(columns={'price': 'close'}).assign(
+        open=ticks['price'], high=ticks['price'], low=ticks['price']), '1m')
+    source_dir = tempfile.mkdtemp()
+    tick_path = os.path.join(source_dir, 'ticks.csv')
+    minute_path = os.path.join(source_dir, 'bars_1m.csv')
+    ticks.to_csv(tick_path)
+    minutes.to_csv(minute_path)
+
+    runs = (('ticks, no engines', tick_path, False),
+            ('ticks, engine partials', tick_path, True),
+            ('1m bars, engine partials', minute_path, True))
+    for label, path, with_engines in runs:
+        fresh_database('bench_bars.db')
+        engines = {tf: bar_builder.streaming_indicators.new_engine(tf) for tf in ('1h', '1d')} if with_engines else None
+        builder = bar_builder.BarBuilder(engines=engines)
+        rate = bar_builder.run(bar_builder.ReplaySource(path), builder)
+        mismatched = []
+        for tf in bar_builder.DEFAULT_TIMEFRAMES:
+            expected = resampler.resample(minutes, tf)
+            stored = database.get_data(tf, limit=100000, columns=['open', 'high', 'low', 'close', 'volume']).sort_index()
+            if len(stored) != len(expected) or compare_frames(expected, stored):
+                mismatched.append(tf)
+        print(f"{label}: {builder.ticks:,} updates at {rate:,.0f}/s, {builder.stored} candles stored, "
+              f"parity {'OK' if not mismatched else 'MISMATCH ' + str(mismatched)}")
+        remove_database('bench_bars.db')
+
+def bench_response_cache(latency=0.5):
+    """
+    A rebuild's downloads (full history of 15m/1h/1d plus a few closed
+    backfill ranges) run twice through the response cache in front of a
+    FileProvider that sleeps `latency` seconds per request, once more a month
+    later, then twice from an empty cache with MAX_BYTES below its size to
+    exercise eviction. The clock starts the day after the sample's last bar.
+    """
+    import tempfile
+    import data_fetcher
+    import resampler
+    import response_cache
+
+    latency = float(latency)
+    hourly = load_sample_ohlc()
+    hourly.index = hourly.index.tz_convert('Asia/Kolkata')
+    source_dir = tempfile.mkdtemp()
+    split_hourly(hourly).to_csv(os.path.join(source_dir, 'nifty_15m.csv'))
+    hourly.to_csv(os.path.join(source_dir, 'nifty_1h.csv'))
+    resampler.resample(hourly, '1d').to_csv(os.path.join(source_dir, 'nifty_1d.csv'))
+    days = hourly.index.normalize().unique()
+    ranges = [(days[i], days[i + 5]) for i in range(0, len(days) - 5, len(days) // 4)]
+
+    def rebuild():
+        for interval in ('1d', '1h', '15m'):
+            data_fetcher.fetch_nifty_data(interval, 'max')
+        for start, end in ranges:
+            data_fetcher.fetch_nifty_data('1h', start=start, end=end)
+
+    response_cache.CACHE_DIR = tempfile.mkdtemp()
+    max_bytes_default = response_cache.MAX_BYTES
+    clock = data_fetcher.get_ist_time
+    day_after = (hourly.index[-1].normalize() + pd.Timedelta(days=1, hours=18)).to_pydatetime()
+    source = data_fetcher.FileProvider(source_dir, latency)
+    previous = data_fetcher.set_provider(data_fetcher.CachingProvider(source))
+    runs = (('cold cache', None, 0), ('warm cache', None, 0), ('warm, a month later', None, 30),
+            ('cold, 100 KiB limit', 100 * 1024, 0), ('warm, 100 KiB limit', 100 * 1024, 0))
+    for label, max_bytes, days_later in runs:
+        data_fetcher.get_ist_time = lambda: day_after + pd.Timedelta(days=days_later)
+        if max_bytes is not None and response_cache.MAX_BYTES != max_bytes:
+            response_cache.clear()
+            response_cache.MAX_BYTES = max_bytes
+        source.requests.clear()
+        _, elapsed = timed(rebuild)
+        r = response_cache.report()
+        print(f"{label}: {len(source.requests)} provider requests, {elapsed:.2f}s | "
+              f"{r['entries']} entries ({r['immutable']} immutable), {r['bytes'] / 1024:.0f} KiB, "
+              f"hit rate so far {r['hit_rate']:.0%}")
+    data_fetcher.set_provider(previous)
+    data_fetcher.get_ist_time = clock
+    response_cache.MAX_BYTES = max_bytes_default
+
+def bench_bulk_load(rows=1_000_000, chunk_rows=100_000):
+    """
+    bulk_load of `rows` hourly rows with indicators from CSV and from Parquet
+    into an empty nifty_1h, against store_data on a 100k-row slice.
+    """
+    import tempfile
+    import bulk_load
+    import database
+    import indicators
+    import process_data
+
+    rows, chunk_rows = int(rows), int(chunk_rows)
+    df = process_data.add_targets(indicators.calculate_hourly_indicators(scaled_ohlc(rows), backend='numpy'))
+    source_dir = tempfile.mkdtemp()
+    csv_path = os.path.join(source_dir, 'snapshot.csv')
+    parquet_path = os.path.join(source_dir, 'snapshot.parquet')
+    df.to_csv(csv_path)
+    df.to_parquet(parquet_path)
+
+    fresh_database('bench_load.db')
+    sample = df.iloc[:100_000]
+    _, elapsed = timed(database.store_data, sample, '1h')
+    print(f"store_data: {len(sample):,} rows in {elapsed:.2f}s ({len(sample) / elapsed:,.0f} rows/s)")
+
+    for label, path in (('csv', csv_path), ('parquet', parquet_path)):
+        fresh_database('bench_load.db')
+        written, elapsed = timed(bulk_load.bulk_load, path, 'nifty_1h', chunk_rows)
+        stored = database.get_data('1h', limit=rows, columns=['close', 'ema_100', 'target'])
+        ok = len(stored) == rows and not compare_frames(df[stored.columns], stored.sort_index())
+        print(f"bulk_load {label}: {written:,} rows in {elapsed:.2f}s ({written / elapsed:,.0f} rows/s), "
+              f"parity {'OK' if ok else 'MISMATCH'}")
+        remove_database('bench_load.db')
+
+def _install_legacy_triggers(conn, hourly_cols, daily_cols):
+    """
+    The per-row nifty_1h insert trigger features_merged used to be synced by:
+    one nifty_1d lookup by `date` per daily column.
+    """
+    conn.execute("ALTER TABLE nifty_1h ADD COLUMN date TEXT")
+    conn.execute("ALTER TABLE nifty_1d ADD COLUMN date TEXT")
+    cols = hourly_cols + [f'daily_{c}' for c in daily_cols] + ['signal']
+    conn.execute(f"CREATE TABLE features_merged (timestamp TEXT PRIMARY KEY, {', '.join(cols[1:])})")
+    values = [f'new.{c}' for c in hourly_cols]
+    values += [f"(SELECT {c} FROM nifty_1d WHERE date = new.date LIMIT 1)" for c in daily_cols]
+    values.append("new.target")
+    conn.execute(f"""
+        CREATE TRIGGER sync_nifty_1h_insert AFTER INSERT ON nifty_1h
+        BEGIN
+            INSERT OR REPLACE INTO features_merged ({', '.join(cols)}) VALUES ({', '.join(values)});
+        END
+    """)
+    conn.commit()
+
+def bench_features(rows=20000):
+    """
+    Full-history nifty_1h upsert of `rows` bars with features_merged kept in
+    sync by the old per-row triggers vs the set-based feature_builder, plus
+    an incremental daily update with the new builder.
+    """
+    import database
+    import feature_builder
+    import indicators
+    import process_data
+
+    rows = int(rows)
+    hourly = process_data.add_targets(indicators.calculate_hourly_indicators(scaled_ohlc(rows), backend='numpy'))
+    ohlc = hourly[['open', 'high', 'low', 'close', 'volume']]
+    daily = ohlc.resample('D').agg({'open': 'first', 'high': 'max', 'low': 'min',
+                                     'close': 'last', 'volume': 'sum'})
+    daily = indicators.calculate_daily_indicators(daily, backend='numpy')
+    daily_cols = ['rsi_14', 'rsi_slope', 'ema_20', 'ema_20_slope', 'trend_flag']
+
+    fresh_database('bench_features.db')
+    with database.pooled_connection() as conn:
+        hourly_cols = [r[1] for r in conn.execute("PRAGMA table_info(nifty_1h)") if r[1] != 'ts']
+        _install_legacy_triggers(conn, hourly_cols, daily_cols)
+    # Keep the new builder out of the legacy run
+    refresh_for, feature_builder.refresh_for = feature_builder.refresh_for, lambda *args: 0
+    database.store_data(daily.assign(date=daily.index.strftime('%Y-%m-%d')), '1d')
+    _, legacy = timed(database.store_data, hourly.assign(date=hourly.index.strftime('%Y-%m-%d')), '1h')
+    feature_builder.refresh_for = refresh_for
+
+    fresh_database('bench_features.db')
+    database.store_data(daily, '1d')
+    _, setbased = timed(database.store_data, hourly, '1h')
+    print(f"{rows} hourly bars, {len(daily)} daily bars: per-row triggers {legacy:.2f}s | "
+          f"set-based {setbased:.2f}s | speedup {legacy / setbased:.0f}x")
+
+    changed = daily.iloc[-5:].copy()
+    changed['ema_20'] += 1
+    _, incremental = timed(database.store_data, changed, '1d')
+    print(f"5 changed daily bars: {incremental * 1000:.0f}ms incl. the features_merged refresh")
+    remove_database('bench_features.db')
+
+def bench_schema_migration(rows=500_000, extra=4):
+    """
+    A multi-column change to a `rows`-bar nifty_1h (drop `extra` retired
+    columns, retype one, add one): one ALTER TABLE per column, each a table
+    pass, vs migrate_schema's single copy-and-swap rebuild.
+    """
+    import database
+    import indicators
+    import migrate_schema
+    import schema
+
+    rows, extra = int(rows), int(extra)
+    df = indicators.calculate_hourly_indicators(scaled_ohlc(rows), backend='numpy')
+    retired = [f'retired_{i}' for i in range(extra)]
+    for name in retired:
+        df[name] = 1.0
+
+    def legacy_database():
+        fresh_database('bench_schema.db')
+        with database.pooled_connection() as conn:
+            for name in retired:
+                conn.execute(f"ALTER TABLE nifty_1h ADD COLUMN {name} REAL")
+            conn.execute("ALTER TABLE nifty_1h DROP COLUMN atr_pct")
+            conn.execute("ALTER TABLE nifty_1h DROP COLUMN bb_squeeze")
+            conn.execute("ALTER TABLE nifty_1h ADD COLUMN bb_squeeze TEXT")
+            conn.commit()
+        database.store_data(df.drop(columns='atr_pct'), '1h')
+        database.close_pool()
+
+    legacy_database()
+    conn = database.get_db_connection()
+    start = time.perf_counter()
+    for name in retired:
+        conn.execute(f"ALTER TABLE nifty_1h DROP COLUMN {name}")
+    # No ALTER COLUMN in SQLite: a retype is drop, add and a full UPDATE
+    conn.execute("ALTER TABLE nifty_1h RENAME COLUMN bb_squeeze TO bb_squeeze_old")
+    conn.execute("ALTER TABLE nifty_1h ADD COLUMN bb_squeeze INTEGER")
+    conn.execute("UPDATE nifty_1h SET bb_squeeze = bb_squeeze_old")
+    conn.execute("ALTER TABLE nifty_1h DROP COLUMN bb_squeeze_old")
+    conn.execute("ALTER TABLE nifty_1h ADD COLUMN atr_pct REAL")
+    conn.commit()
+    conn.close()
+    per_column = time.perf_counter() - start
+
+    legacy_database()
+    migrate_schema.DB_NAME = 'bench_schema.db'
+    _, planned = timed(migrate_schema.migrate)
+    conn = database.get_db_connection()
+    live = [(r[1], r[2]) for r in conn.execute("PRAGMA table_info(nifty_1h)")]
+    count = conn.execute("SELECT COUNT(*) FROM nifty_1h").fetchone()[0]
+    conn.close()
+    ok = live == schema.candle_columns('1h') and count == rows
+    print(f"{rows} rows, {extra + 2} column changes: per-column ALTERs {per_column:.2f}s | "
+          f"single rebuild {planned:.2f}s | speedup {per_column / planned:.1f}x, "
+          f"schema {'OK' if ok else 'MISMATCH'}")
+    remove_database('bench_schema.db')
+
+def bench_categorical_storage(rows=500_000):
+    """
+    nifty_1h with `rows` bars storing rsi_zone/ema_alignment/target as TEXT
+    labels (the old layout) vs schema codes: table size, full typed read,
+    and the encode_signals-style UPDATE pass the codes make unnecessary.
+    """
+    import database
+    import indicators
+    import process_data
+    import schema
+
+    rows = int(rows)
+    df = process_data.add_targets(indicators.calculate_hourly_indicators(scaled_ohlc(rows), backend='numpy'))
+    columns = [c for c, _ in schema.candle_columns('1h') if c in df.columns]
+
+    def table_bytes():
+        with database.pooled_connection() as conn:
+            conn.execute("VACUUM")
+            return conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'nifty_1h'").fetchone()[0]
+
+    results = {}
+    for label in ('text labels', 'codes'):
+        fresh_database('bench_categorical.db')
+        if label == 'text labels':
+            text_columns = [(c, 'TEXT' if schema.categories_of(c) else t) for c, t in schema.candle_columns('1h')]
+            values = df.reset_index()
+            values['ts'] = database.to_epoch(values['timestamp'])
+            values['timestamp'] = database.ist_text(values['ts'])
+            values = values[['ts', 'timestamp'] + columns].astype(object)
+            with database.pooled_connection() as conn:
+                conn.execute("DROP TABLE nifty_1h")
+                conn.execute(schema.create_sql('nifty_1h', text_columns))
+                conn.executemany(f"INSERT INTO nifty_1h ({', '.join(values.columns)}) "
+                                 f"VALUES ({', '.join(['?'] * len(values.columns))})",
+                                 values.where(values.notna(), None).itertuples(index=False, name=None))
+                conn.commit()
+        else:
+            database.store_data(df, '1h')
+        size = table_bytes()
+        database.clear_cache()
+        read, elapsed = timed(database.get_data, '1h', limit=rows)
+        results[label] = read
+        line = f"{label}: {size / 1024 / 1024:.1f} MiB ({size / rows:.0f} B/row) | typed read {elapsed:.2f}s"
+        if label == 'text labels':
+            with database.pooled_connection() as conn:
+                _, encode = timed(conn.execute, """
+                    UPDATE nifty_1h SET target = CASE target WHEN 'PUT' THEN 0
+                        WHEN 'SIDEWAYS' THEN 1 WHEN 'CALL' THEN 2 END""")
+                conn.rollback()
+            line += f" | post-hoc encode pass {encode:.2f}s"
+        print(line)
+        database.close_pool()
+
+    cat_cols = [c for c in results['codes'].columns if schema.categories_of(c)]
+    ok = not compare_frames(results['text labels'][cat_cols], results['codes'][cat_cols])
+    print(f"categorical parity: {'OK' if ok else 'MISMATCH'}")
+    remove_database('bench_categorical.db')
+
+def bench_labels(rows=100_000):
+    """
+    The full horizon x threshold label grid of `rows` closes: one
+    Series.apply(categorize) per label as add_targets used to, vs the
+    broadcast label_matrix pass, plus the stored matrix size.
+    """
+    import tempfile
+    import labels
+    import schema
+
+    rows = int(rows)
+    close = scaled_ohlc(rows)['close']
+    names = {(h, t): labels.label_name(h, t) for h in labels.HORIZONS for t in labels.THRESHOLDS}
+
+    def legacy_grid():
+        out = {}
+        for (h, t), name in names.items():
+            ret = (close.shift(-h) - close) / close
+            out[name] = ret.apply(lambda r: None if pd.isna(r) else
+                                  ('CALL' if r > t else ('PUT' if r < -t else 'SIDEWAYS')))
+        return pd.DataFrame(out)
+
+    legacy, t_legacy = timed(legacy_grid)
+    frame, t_matrix = timed(labels.label_frame, close)
+    codes = {label: code for code, label in enumerate(schema.CATEGORIES['target'])}
+    expected = legacy.apply(lambda col: col.map(codes)).fillna(-1).astype('int8')
+    ok = expected.equals(frame[expected.columns])
+    print(f"{rows} bars x {len(names)} labels: per-label apply {t_legacy:.2f}s | "
+          f"label_matrix {t_matrix * 1000:.0f}ms | speedup {t_legacy / t_matrix:.0f}x, "
+          f"parity {'OK' if ok else 'MISMATCH'}")
+
+    labels.LABELS_DIR = tempfile.mkdtemp()
+    _, t_store = timed(labels.store, frame, 'nifty_1h')
+    size = os.path.getsize(os.path.join(labels.LABELS_DIR, 'nifty_1h.parquet'))
+    one, t_load = timed(labels.load, 'nifty_1h', ['h5_t60'])
+    print(f"stored matrix: {size / 1024:.0f} KiB ({size / rows / len(names):.3f} B/label/bar), "
+          f"write {t_store * 1000:.0f}ms, one label read back in {t_load * 1000:.0f}ms")
+
+def bench_feature_cache(rows=50_000):
+    """
+    train_model.load_training_matrix on `rows` hourly bars: a cold run reads
+    and prepares features_merged, a warm run maps the cached matrix; one
+    changed hourly bar must invalidate it.
+    """
+    import contextlib
+    import io
+    import database
+    import train_model
+
+    hourly = build_feature_db('bench_feature_cache.db', int(rows))
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return train_model.load_training_matrix()
+
+    (X_cold, y_cold, _), cold = timed(run)
+    (X_warm, y_warm, _), warm = timed(run)
+    # The cache stores X as float64; compare values, not dtypes
+    same = (np.array_equal(X_cold.to_numpy(dtype=np.float64), X_warm.to_numpy(), equal_nan=True)
+            and list(X_cold.columns) == list(X_warm.columns)
+            and (y_cold.to_numpy() == y_warm.to_numpy()).all())
+    print(f"{len(X_cold)} x {X_cold.shape[1]} matrix: cold {cold:.2f}s | cached {warm * 1000:.1f}ms | "
+          f"speedup {cold / warm:.0f}x, parity {'OK' if same else 'MISMATCH'}")
+
+    database.store_data(hourly.iloc[-100:].assign(close=hourly['close'].iloc[-100:] + 1), '1h')
+    _, rebuilt = timed(run)
+    print(f"after a write to nifty_1h: rebuilt in {rebuilt:.2f}s "
+          f"({'invalidated' if rebuilt > warm * 10 else 'STALE HIT'})")
+    remove_feature_db('bench_feature_cache.db')
+
+def bench_walk_forward(rows=20_000, workers=None):
+    """
+    walk_forward.walk_forward over `rows` hourly bars, folds run one after
+    another and then across a process pool mapping the cached matrix. Both
+    must give the same per-fold metrics, and no training bar may sit within
+    the embargo of its test fold.
+    """
+    import contextlib
+    import io
+    import labels
+    import train_model
+    import walk_forward
+
+    workers = int(workers) if workers else max(2, os.cpu_count())
+    build_feature_db('bench_walk_forward.db', int(rows))
+
+    def run(n):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return walk_forward.walk_forward(workers=n)
+
+    # Warm the feature cache so both runs time only the folds
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, _, _ = train_model.load_training_matrix()
+    (serial, _), serial_time = timed(run, 1)
+    (pooled, aggregate), pooled_time = timed(run, workers)
+    same = serial.equals(pooled)
+    embargo = labels.HORIZON
+    leaks = sum(int((X.index[train] + embargo >= X.index[test[0]]).sum())
+                for train, test in walk_forward.make_folds(X.index, embargo=embargo))
+    print(f"{len(X)} rows, {walk_forward.N_FOLDS} folds: serial {serial_time:.2f}s | "
+          f"{workers} workers {pooled_time:.2f}s | speedup {serial_time / pooled_time:.1f}x "
+          f"({os.cpu_count()} CPUs), parity {'OK' if same else 'MISMATCH'}, "
+          f"embargo {'OK' if leaks == 0 else f'{leaks} LEAKED ROWS'}")
+    print(aggregate[['threshold', 'put_precision', 'call_precision', 'coverage']].to_string(
+        index=False, float_format='%.3f'))
+    remove_feature_db('bench_walk_forward.db')
+
+def bench_hyperparam_search(rows=20_000, configs=9, max_trees=90):
+    """
+    hyperparam_search.search over `configs` configurations against scoring
+    every one of them at `max_trees` trees on the same purged folds: trees
+    fitted, wall time and the winner's rank in the full grid. A second run
+    must resume from the log without fitting anything.
+    """
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    import hyperparam_search
+    import labels
+    import train_model
+    import walk_forward
+
+    configs, max_trees = int(configs), int(max_trees)
+    build_feature_db('bench_hyperparam_search.db', int(rows))
+    hyperparam_search.SEARCH_DIR = tempfile.mkdtemp()
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return hyperparam_search.search(n_configs=configs, max_trees=max_trees, save=False)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, _, _ = train_model.load_training_matrix()
+    table, halving = timed(run)
+    best = table[-1]
+    _, resumed = timed(run)
+
+    key = train_model.matrix_key()
+    candidates = hyperparam_search.sample_configs(configs)
+    folds = walk_forward.make_folds(X.index, hyperparam_search.N_FOLDS, embargo=labels.HORIZON)
+    start = time.perf_counter()
+    grid = [np.mean([hyperparam_search._score_fold((key, c, config, max_trees, f, train, test))['score']
+                     for f, (train, test) in enumerate(folds)])
+            for c, config in enumerate(candidates)]
+    full = time.perf_counter() - start
+
+    halving_trees = sum(n * trees for n, trees in hyperparam_search.rungs(configs, hyperparam_search.ETA, max_trees))
+    rank = 1 + sum(score > grid[best['config']] for score in grid)
+    print(f"{len(X)} rows, {configs} configs, {len(folds)} folds:")
+    print(f"  full grid at {max_trees} trees: {configs * max_trees} trees/fold, {full:.2f}s, best AUC {max(grid):.4f}")
+    print(f"  successive halving: {halving_trees} trees/fold, {halving:.2f}s, "
+          f"winner AUC {grid[best['config']]:.4f} (rank {rank} of {configs})")
+    print(f"  resumed from the log in {resumed:.2f}s ({'no refits' if resumed < halving / 5 else 'REFITTED'})")
+    remove_feature_db('bench_hyperparam_search.db')
+    shutil.rmtree(hyperparam_search.SEARCH_DIR, ignore_errors=True)
+
+def bench_model_refresh(rows=20_000, new_bars=70):
+    """
+    model_refresh on `rows` hourly bars: the full retrain against an
+    incremental refresh after `new_bars` more bars arrive (both scored on
+    the new bars), and a second history twice as long to show the refresh
+    cost follows the window rather than the history.
+    """
+    import contextlib
+    import glob
+    import io
+    import shutil
+    import tempfile
+    import database
+    import model_refresh
+
+    rows, new_bars = int(rows), int(new_bars)
+    workdir = tempfile.mkdtemp()
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for history in (rows, 2 * rows):
+            for path in glob.glob('*.pkl') + glob.glob('*.csv') + glob.glob(model_refresh.STATE_FILE):
+                os.remove(path)
+            hourly = build_feature_db('bench_model_refresh.db', history + new_bars, stored=history)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, full = timed(model_refresh.refresh)
+            database.store_data(hourly.iloc[history:], '1h')
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                state, incremental = timed(model_refresh.refresh)
+            scored = [line for line in log.getvalue().splitlines() if 'new labelled bars,' in line]
+            print(f"{history} bars: full retrain {full:.2f}s | refresh with {new_bars} new bars "
+                  f"{incremental:.2f}s ({'refreshed' if state and state['refreshes'] == 1 else 'NOT REFRESHED'})"
+                  f"{' | ' + scored[0] if scored else ''}")
+            remove_feature_db('bench_model_refresh.db')
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def bench_predict(rows=20_000, requests=1000):
+    """
+    /api/predict on a model trained over `rows` hourly bars: per-request
+    latency through the Flask test client, the compiled forest against
+    sklearn's predict_proba (speed and parity), and a hot reload while
+    requests keep arriving.
+    """
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    import joblib
+    import database
+    import model_refresh
+    import predictor
+    import train_model
+
+    rows, requests = int(rows), int(requests)
+    workdir = tempfile.mkdtemp()
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        build_feature_db('bench_predict.db', rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            model_refresh.refresh()
+            X, _, _ = train_model.load_training_matrix()
+        predictor.RELOAD_INTERVAL = 0.2
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+        client = app.app.test_client()
+
+        served = predictor.current()
+        model = joblib.load(served['path'])
+        sample = X.iloc[-2000:][served['columns']]
+        expected = model.predict_proba(sample)
+        diff = np.abs(predictor.forest_proba(served['forest'], sample.to_numpy()) - expected).max()
+        row = sample.iloc[[-1]]
+        _, sk_one = timed(model.predict_proba, row)
+        model.set_params(n_jobs=1)
+        sk_times = [timed(model.predict_proba, row)[1] for _ in range(50)]
+        fast_times = [timed(predictor.forest_proba, served['forest'], row.to_numpy())[1] for _ in range(1000)]
+        print(f"{len(X)} rows, {served['trees']} trees, depth {served['forest']['depth']}: "
+              f"max |p - sklearn| = {diff:.1e}")
+        print(f"  one row: sklearn n_jobs=-1 {sk_one * 1000:.2f}ms | n_jobs=1 p50 {np.median(sk_times) * 1000:.2f}ms | "
+              f"compiled p50 {np.median(fast_times) * 1e6:.0f}us p99 {np.percentile(fast_times, 99) * 1e6:.0f}us")
+
+        def request_latencies(n):
+            times = []
+            for _ in range(n):
+                response, elapsed = timed(client.get, '/api/predict')
+                assert response.status_code == 200, response.get_json()
+                times.append(elapsed)
+            return np.array(times) * 1000
+
+        times = request_latencies(requests)
+        print(f"  GET /api/predict x {requests}: p50 {np.median(times):.2f}ms | "
+              f"p99 {np.percentile(times, 99):.2f}ms | max {times.max():.2f}ms")
+        batch, elapsed = timed(client.get, '/api/predict/batch?limit=500')
+        print(f"  GET /api/predict/batch?limit=500: {len(batch.get_json()['predictions'])} rows in {elapsed * 1000:.1f}ms")
+        # The same bars submitted as records, categoricals as labels
+        latest = database.get_features(limit=20).sort_index()
+        records = latest.astype(object).where(latest.notna(), None)
+        records.insert(0, 'timestamp', latest.index.strftime('%Y-%m-%d %H:%M:%S%z'))
+        posted = client.post('/api/predict/batch', json={'rows': records.to_dict('records')}).get_json()
+        fetched = client.get('/api/predict/batch?limit=20').get_json()
+        same = [p['probabilities'] for p in posted['predictions']] == \
+               [p['probabilities'] for p in fetched['predictions']]
+        print(f"  POST /api/predict/batch of the latest 20 bars: parity {'OK' if same else 'MISMATCH'}")
+
+        # Hot reload: a forced full retrain lands while requests keep coming
+        def retrain():
+            with contextlib.redirect_stdout(io.StringIO()):
+                model_refresh.refresh(force_full=True)
+
+        trainer = threading.Thread(target=retrain)
+        old_path = served['path']
+        time.sleep(1.1)   # model files are named to the second
+        trainer.start()
+        times, models = [], set()
+        deadline = time.perf_counter() + 60
+        while time.perf_counter() < deadline:
+            response, elapsed = timed(client.get, '/api/predict')
+            assert response.status_code == 200, response.get_json()
+            times.append(elapsed * 1000)
+            models.add(response.get_json()['model'])
+            if not trainer.is_alive() and predictor.current()['path'] != old_path and len(models) > 1:
+                break
+        trainer.join()
+        print(f"  during retrain + reload: {len(times)} requests, none failed, "
+              f"p99 {np.percentile(times, 99):.2f}ms | models served: {len(models)} "
+              f"({'swapped' if len(models) > 1 else 'NOT RELOADED'})")
+    finally:
+        remove_feature_db('bench_predict.db')
+        os.chdir(previous)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+BENCHMARKS = {
+    'indicators': bench_indicators,
+    'concurrent_reads': bench_concurrent_reads,
+    'typed_reads': bench_typed_reads,
+    'symbols': bench_symbols,
+    'incremental_fetch': bench_incremental_fetch,
+    'update_cycle': bench_update_cycle,
+    'bar_builder': bench_bar_builder,
+    'response_cache': bench_response_cache,
+    'bulk_load': bench_bulk_load,
+    'features': bench_features,
+    'schema_migration': bench_schema_migration,
+    'categorical_storage': bench_categorical_storage,
+    'labels': bench_labels,
+    'feature_cache': bench_feature_cache,
+    'walk_forward': bench_walk_forward,
+    'hyperparam_search': bench_hyperparam_search,
+    'model_refresh': bench_model_refresh,
+    'predict': bench_predict,
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmarks.py <{'|'.join(BENCHMARKS)}> [args...]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*sys.argv[2:])
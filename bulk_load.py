@@ -0,0 +1,184 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import pandas as pd
+import archive
+import database
+import feature_builder
+import migrate_schema
+
+# Rows read, converted and committed at a time
+CHUNK_ROWS = 100000
+# Connection settings for the load only. synchronous=OFF skips the fsync per
+# commit: a crash mid-load can lose the load, which is simply rerun.
+LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': -256000,      # 256 MB page cache (negative = KiB)
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+TIME_COLUMNS = ['timestamp', 'Datetime', 'Date', '__index_level_0__']
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """
+    Stream a CSV or Parquet snapshot as frames of at most `chunk_rows` rows.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+def _suspend(conn, table):
+    """
+    Drop the triggers and secondary indexes of `table`, returning their SQL so
+    they can be recreated once the rows are in.
+    """
+    objects = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL", (table,)).fetchall()
+    for kind, name, _ in objects:
+        conn.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+    return objects
+
+def _restore(conn, objects):
+    # Indexes are rebuilt in one sorted pass each; triggers come back last so
+    # they don't fire for the rebuild
+    for kind in ('index', 'trigger'):
+        for obj_kind, name, sql in objects:
+            if obj_kind == kind:
+                conn.execute(sql)
+
+def _epoch_seconds(values):
+    """
+    Epoch seconds of a time column. Text stamps that share one layout and one
+    UTC offset (as this repo writes them) skip per-row offset parsing: the
+    wall-clock part is parsed in one pass and the offset applied afterwards.
+    Naive stamps are exchange time (IST).
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return database.to_epoch(values)
+    text = values.astype(str)
+    suffixes = text.str.slice(19).unique()
+    match = re.fullmatch(r'([+-])(\d\d):(\d\d)', suffixes[0]) if len(suffixes) == 1 else None
+    if len(suffixes) == 1 and (match or suffixes[0] == ''):
+        offset = 19800
+        if match:
+            sign, hours, minutes = match.groups()
+            offset = (int(hours) * 3600 + int(minutes) * 60) * (1 if sign == '+' else -1)
+        try:
+            wall = pd.to_datetime(text.str.slice(0, 19), format='%Y-%m-%d %H:%M:%S')
+            return ((wall - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype='int64') - offset
+        except ValueError:
+            # Some other layout; parse it generically below
+            pass
+    stamps = pd.to_datetime(text, format='ISO8601', utc=text.str.contains(r'[+-]\d\d:\d\d$|Z$').any())
+    return database.to_epoch(stamps)
+
+def _prepare(chunk, table_cols, keyed_by_ts):
+    """
+    Rows of `chunk` ready to bind: ts/timestamp derived from the time column,
+    only the columns the table has, categorical codes instead of labels,
+    sorted by time so inserts append.
+    """
+    if isinstance(chunk.index, pd.DatetimeIndex):
+        # Parquet written from an indexed frame brings its index back
+        chunk = chunk.reset_index(names='timestamp')
+    time_col = next((c for c in TIME_COLUMNS if c in chunk.columns), chunk.columns[0])
+    ts = _epoch_seconds(chunk.pop(time_col))
+    chunk['timestamp'] = database.ist_text(ts)
+    if keyed_by_ts:
+        chunk['ts'] = ts
+    chunk = chunk.iloc[ts.argsort(kind='stable')]
+    chunk = chunk[[c for c in chunk.columns if c in table_cols]]
+    # Categorical labels are stored as their schema codes
+    return database.encode_categories(chunk.copy())
+
+def bulk_load(path, table, chunk_rows=CHUNK_ROWS):
+    """
+    Load a CSV/Parquet snapshot straight into `table` (nifty_1h, nifty_1d,
+    features_merged, ...), replacing rows with the same key. Each chunk is
+    one transaction; the table's triggers and indexes are dropped for the
+    load and rebuilt afterwards. Loads into nifty_1h/nifty_1d end with one
+    set-based features_merged refresh over the loaded range.
+    Returns the number of rows written.
+    """
+    if table.startswith('nifty_'):
+        # A fresh database gets the declared candle tables first, an older one
+        # its pending schema changes
+        database.init_db()
+        migrate_schema.DB_NAME = database.DB_NAME
+        migrate_schema.migrate()
+
+    conn = sqlite3.connect(database.DB_NAME, isolation_level=None)
+    for name, value in LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    table_cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+    if not table_cols:
+        conn.close()
+        print(f"Error: table {table} does not exist.")
+        return 0
+    keyed_by_ts = 'ts' in table_cols
+    wm = archive.watermark(table) if keyed_by_ts else None
+
+    start = time.perf_counter()
+    objects = _suspend(conn, table)
+    written, skipped, ignored = 0, 0, set()
+    loaded = []
+    try:
+        for chunk in read_chunks(path, chunk_rows):
+            ignored.update(c for c in chunk.columns if c not in table_cols and c not in TIME_COLUMNS)
+            rows = _prepare(chunk, table_cols, keyed_by_ts)
+            if wm is not None:
+                # Archived months are immutable, as in store_data
+                archived = (rows['ts'] < wm).to_numpy()
+                skipped += int(archived.sum())
+                rows = rows[~archived]
+            if rows.empty:
+                continue
+            cols = list(rows.columns)
+            query = (f"INSERT OR REPLACE INTO {table} ({', '.join(cols)}) "
+                     f"VALUES ({', '.join(['?'] * len(cols))})")
+            # NaN binds as NULL, so plain lists need no per-value conversion
+            values = zip(*[rows[c].tolist() for c in cols])
+            conn.execute("BEGIN")
+            conn.executemany(query, values)
+            conn.execute("COMMIT")
+            written += len(rows)
+            if keyed_by_ts:
+                loaded += [int(rows['ts'].min()), int(rows['ts'].max())]
+            print(f"  {written} rows loaded...")
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.execute("BEGIN")
+        _restore(conn, objects)
+        if loaded:
+            feature_builder.refresh_for(conn, table, min(loaded), max(loaded))
+        database.bump_versions(conn, [table])
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    if ignored:
+        print(f"Ignored columns not in {table}: {', '.join(sorted(ignored))}")
+    if skipped:
+        print(f"Skipped {skipped} rows in archived months.")
+    print(f"Loaded {written} rows into {table} in {elapsed:.2f}s "
+          f"({written / elapsed if elapsed else 0:,.0f} rows/s), "
+          f"{len(objects)} triggers/indexes rebuilt.")
+    return written
+
+if __name__ == '__main__':
+    # python bulk_load.py SNAPSHOT TABLE [CHUNK_ROWS]
+    if len(sys.argv) < 3:
+        print("Usage: python bulk_load.py <snapshot.csv|snapshot.parquet> <table> [chunk_rows]")
+        sys.exit(1)
+    if not os.path.exists(sys.argv[1]):
+        print(f"Error: {sys.argv[1]} not found.")
+        sys.exit(1)
+    bulk_load(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else CHUNK_ROWS)
@@ -1,40 +1,230 @@
-import yfinance as yf
+import os
+import re
+import time as time_module
+import numpy as np
 import pandas as pd
 import pytz
 from datetime import datetime, timedelta, time
+import database
+import nse_calendar
+import response_cache
 
 # Constants
 SYMBOL = "^NSEI"
+# Nifty 50 constituents on Yahoo Finance (NSE listing). Update on index rebalancing.
+NIFTY50_SYMBOLS = [
+    'ADANIENT.NS', 'ADANIPORTS.NS', 'APOLLOHOSP.NS', 'ASIANPAINT.NS', 'AXISBANK.NS',
+    'BAJAJ-AUTO.NS', 'BAJFINANCE.NS', 'BAJAJFINSV.NS', 'BEL.NS', 'BHARTIARTL.NS',
+    'CIPLA.NS', 'COALINDIA.NS', 'DRREDDY.NS', 'EICHERMOT.NS', 'ETERNAL.NS',
+    'GRASIM.NS', 'HCLTECH.NS', 'HDFCBANK.NS', 'HDFCLIFE.NS', 'HEROMOTOCO.NS',
+    'HINDALCO.NS', 'HINDUNILVR.NS', 'ICICIBANK.NS', 'INDUSINDBK.NS', 'INFY.NS',
+    'ITC.NS', 'JIOFIN.NS', 'JSWSTEEL.NS', 'KOTAKBANK.NS', 'LT.NS',
+    'M&M.NS', 'MARUTI.NS', 'NESTLEIND.NS', 'NTPC.NS', 'ONGC.NS',
+    'POWERGRID.NS', 'RELIANCE.NS', 'SBILIFE.NS', 'SBIN.NS', 'SHRIRAMFIN.NS',
+    'SUNPHARMA.NS', 'TATACONSUM.NS', 'TATAMOTORS.NS', 'TATASTEEL.NS', 'TCS.NS',
+    'TECHM.NS', 'TITAN.NS', 'TRENT.NS', 'ULTRACEMCO.NS', 'WIPRO.NS',
+]
 IST = pytz.timezone('Asia/Kolkata')
 
+# How far back Yahoo serves intraday bars, in days
+RETENTION_DAYS = {'15m': 60, '1h': 730}
+# Gap days closer together than this are backfilled with one request
+GAP_MERGE_DAYS = 7
+# Backfill requests reach this far past the gap days on both sides, so a
+# healthy response always holds some bars and an empty one means failure
+GAP_PAD_DAYS = 4
+# Oldest year a cached 'max' request walks back to (see CachingProvider)
+HISTORY_START_YEAR = 1990
+
 def get_ist_time():
     return datetime.now(IST)
 
-def fetch_nifty_data(interval, period="max"):
+def period_days(period):
+    """
+    Length in days of a trailing period such as '5d', '6mo' or '2y'.
+    """
+    number, unit = re.fullmatch(r'(\d+)(d|mo|y)', period).groups()
+    return int(number) * {'d': 1, 'mo': 30, 'y': 365}[unit]
+
+def period_blocks(start, now=None):
+    """
+    [start, end) calendar blocks from the year of `start` up to `now`, oldest
+    first: whole years, whole months of the current year, then the running
+    month with an open end (None).
+    """
+    now = pd.Timestamp(get_ist_time() if now is None else now).tz_convert(nse_calendar.IST)
+    start = pd.Timestamp(start).tz_convert(nse_calendar.IST)
+    month = now.normalize().replace(day=1)
+    year = month.replace(month=1)
+    blocks = [(year.replace(year=y), year.replace(year=y + 1)) for y in range(start.year, now.year)]
+    block = max(year, start.normalize().replace(day=1))
+    while block < month:
+        blocks.append((block, block + pd.DateOffset(months=1)))
+        block += pd.DateOffset(months=1)
+    blocks.append((month, None))
+    return blocks
+
+class DataProvider:
+    """
+    Source of raw candles. history() returns a frame indexed by bar start time
+    with open/high/low/close[/volume] columns, for either a trailing `period`
+    ('5d', '730d', 'max') or the range [start, end). retention_days maps
+    intervals to how many days back the source serves them.
+    """
+    retention_days = {}
+
+    def history(self, symbol, interval, period=None, start=None, end=None):
+        raise NotImplementedError
+
+    def period_start(self, symbol, interval, period):
+        """
+        First bar time a trailing `period` request covers; None for 'max'.
+        """
+        if period == 'max':
+            return None
+        return pd.Timestamp(get_ist_time()) - pd.Timedelta(days=period_days(period))
+
+class YFinanceProvider(DataProvider):
+    retention_days = RETENTION_DAYS
+
+    def history(self, symbol, interval, period=None, start=None, end=None):
+        import yfinance as yf
+        # valid intervals: 1m,2m,5m,15m,30m,60m,90m,1h,1d,5d,1wk,1mo,3mo
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            if interval in RETENTION_DAYS:
+                # Yahoo rejects intraday ranges reaching past its retention
+                oldest = get_ist_time() - timedelta(days=RETENTION_DAYS[interval] - 1)
+                start = max(pd.Timestamp(start), pd.Timestamp(oldest))
+            return ticker.history(start=start, end=end, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+class FileProvider(DataProvider):
+    """
+    Serves candles from CSV files in `directory` named like the tables they
+    feed (nifty_1h.csv, sym_reliance_ns_15m.csv), for tests and benchmarks.
+    Periods are measured back from the newest row of the file. Every request
+    is recorded in `requests` as (symbol, interval, rows returned); `latency`
+    seconds are slept per request to stand in for the network.
+    """
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+        self.requests = []
+        self._frames = {}
+
+    def _load(self, symbol, interval):
+        path = os.path.join(self.directory, f'{database.candle_table(interval, symbol)}.csv')
+        if path not in self._frames:
+            if not os.path.exists(path):
+                self._frames[path] = pd.DataFrame()
+            else:
+                df = pd.read_csv(path, index_col=0)
+                df.index = pd.to_datetime(df.index, utc=True).tz_convert(IST).rename('timestamp')
+                self._frames[path] = df.sort_index()
+        return self._frames[path]
+
+    def history(self, symbol, interval, period=None, start=None, end=None):
+        df = self._load(symbol, interval)
+        if not df.empty:
+            if start is not None:
+                df = df[df.index >= pd.Timestamp(start)]
+                if end is not None:
+                    df = df[df.index < pd.Timestamp(end)]
+            elif period not in (None, 'max'):
+                df = df[df.index > self.period_start(symbol, interval, period)]
+        self.requests.append((symbol, interval, len(df)))
+        if self.latency:
+            time_module.sleep(self.latency)
+        return df.copy()
+
+    def period_start(self, symbol, interval, period):
+        df = self._load(symbol, interval)
+        if df.empty:
+            return None
+        if period == 'max':
+            return df.index[0]
+        return df.index[-1] - pd.Timedelta(days=period_days(period))
+
+class CachingProvider(DataProvider):
+    """
+    Wraps another provider with the on-disk response cache (response_cache):
+    closed historical ranges are kept forever, live ones for a short TTL.
+    Empty responses are never cached since they usually mean a failed request.
+    Trailing periods are requested as period_blocks: the closed years and
+    months keep their keys from one day to the next, so rerunning the 'max'
+    downloads on a later day only fetches the running month again.
     """
-    Fetch Nifty 50 data from Yahoo Finance.
+    def __init__(self, provider):
+        self.provider = provider
+        self.retention_days = provider.retention_days
+
+    def period_start(self, symbol, interval, period):
+        return self.provider.period_start(symbol, interval, period)
+
+    def _period_history(self, symbol, interval, period):
+        start = self.period_start(symbol, interval, period)
+        if start is not None:
+            frames = [self.history(symbol, interval, start=block_start, end=block_end)
+                      for block_start, block_end in period_blocks(start)]
+        else:
+            # 'max' without a known first bar: walk back until a closed block
+            # older than the first data comes back empty
+            frames = []
+            first_year = pd.Timestamp(f'{HISTORY_START_YEAR}-01-01', tz=nse_calendar.IST)
+            for block_start, block_end in reversed(period_blocks(first_year)):
+                df = self.history(symbol, interval, start=block_start, end=block_end)
+                if df.empty and block_end is not None and any(not f.empty for f in frames):
+                    break
+                frames.insert(0, df)
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames)
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        return df[df.index > start] if period != 'max' else df
+
+    def history(self, symbol, interval, period=None, start=None, end=None):
+        if start is None:
+            return self._period_history(symbol, interval, period)
+        key = response_cache.request_key(symbol, interval, period, start, end)
+        df = response_cache.get(key)
+        if df is not None:
+            print(f"  {symbol} {interval}: served from response cache")
+            return df
+        df = self.provider.history(symbol, interval, period=period, start=start, end=end)
+        if not df.empty:
+            response_cache.put(key, df, response_cache.expiry(start, end))
+        return df
+
+_provider = CachingProvider(YFinanceProvider())
+
+def set_provider(provider):
+    """
+    Replace the candle source (e.g. a FileProvider in tests); returns the previous one.
+    """
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
+
+def fetch_nifty_data(interval, period="max", symbol=SYMBOL, start=None, end=None):
+    """
+    Fetch Nifty 50 (or constituent `symbol`) data from the provider (Yahoo Finance).
     interval: '15m', '1h', '1d', '1wk'
     period: 'max', '1y', '5y', etc.
+    start, end: fetch [start, end) instead of a trailing period
     """
-    print(f"Fetching {interval} data for period: {period}...")
+    if start is not None:
+        print(f"Fetching {symbol} {interval} data from {start}...")
+    else:
+        print(f"Fetching {symbol} {interval} data for period: {period}...")
     
     try:
-        # yfinance parameters
-        # valid intervals: 1m,2m,5m,15m,30m,60m,90m,1h,1d,5d,1wk,1mo,3mo
-        yf_interval = interval
-        if interval == '1wk':
-            yf_interval = '1wk' 
-        elif interval == '15m':
-             # Intraday data is limited. yfinance allows 60d for 15m
-             if period == 'max':
-                 period = '60d' # Max allowed for 15m
-        elif interval == '1h':
-             # Intraday data limited. yfinance allows 730d for 1h
-             if period == 'max':
-                 period = '730d' # Max allowed for 1h
+        if interval in RETENTION_DAYS and period == 'max':
+            # Intraday data is limited: 60d for 15m, 730d for 1h
+            period = f'{RETENTION_DAYS[interval]}d'
                  
-        ticker = yf.Ticker(SYMBOL)
-        df = ticker.history(period=period, interval=yf_interval)
+        df = _provider.history(symbol, interval, period=period, start=start, end=end)
         
         if df.empty:
             print(f"No data received for {interval}")
@@ -73,13 +263,75 @@ def fetch_nifty_data(interval, period="max"):
         print(f"Error in fetch_nifty_data: {e}")
         return pd.DataFrame()
 
-def fetch_latest_data(interval='15m'):
+def fetch_latest_data(interval='15m', symbol=SYMBOL):
     """
     Fetch the latest data (e.g. last 1 day or 5 days) to update real-time
     """
     # for real-time, we just need the last few candles
     period = '5d' 
-    return fetch_nifty_data(interval, period)
+    return fetch_nifty_data(interval, period, symbol)
+
+def fetch_missing(interval, symbol=SYMBOL):
+    """
+    Fetch only bars newer than what is stored for `interval`, plus the newest
+    stored bar itself since it may have been fetched while still forming.
+    Falls back to the full history when nothing is stored yet.
+    """
+    last = database.last_timestamp(interval, symbol)
+    if last is None:
+        return fetch_nifty_data(interval, 'max', symbol)
+    df = fetch_nifty_data(interval, symbol=symbol, start=last)
+    return df[df.index >= last] if not df.empty else df
+
+def find_gaps(interval, symbol=SYMBOL):
+    """
+    Bars missing from the stored `interval` series against the NSE session
+    calendar, between its first and last stored bar. Days already checked
+    with the provider and days beyond its retention are left out.
+    """
+    table_name = database.candle_table(interval, symbol)
+    start = None
+    retention = _provider.retention_days.get(interval)
+    if retention:
+        start = (get_ist_time() - timedelta(days=retention - 1)).strftime('%Y-%m-%d')
+    stored = database.get_data(interval, start_date=start, columns=[], symbol=symbol).index
+    if stored.empty:
+        return stored
+
+    expected = nse_calendar.expected_bars(interval, stored.min(), stored.max())
+    missing = expected.difference(stored)
+    checked = database.checked_gap_days(table_name)
+    return missing[~missing.strftime('%Y-%m-%d').isin(checked)]
+
+def backfill_gaps(interval, symbol=SYMBOL):
+    """
+    Request the days holding gaps found by find_gaps, one range per run of
+    nearby days, and store only the missing bars. Returns the number filled.
+    """
+    missing = find_gaps(interval, symbol)
+    if missing.empty:
+        print(f"No gaps in {symbol} {interval}.")
+        return 0
+
+    days = pd.DatetimeIndex(sorted(set(missing.normalize())))
+    print(f"{len(missing)} {symbol} {interval} bars missing across {len(days)} days, backfilling...")
+    # Split into runs wherever consecutive gap days are far apart
+    breaks = list(np.flatnonzero(days[1:] - days[:-1] > pd.Timedelta(days=GAP_MERGE_DAYS)) + 1)
+    filled = 0
+    for run in np.split(days, breaks):
+        df = fetch_nifty_data(interval, symbol=symbol, start=run[0] - timedelta(days=GAP_PAD_DAYS),
+                              end=run[-1] + timedelta(days=1 + GAP_PAD_DAYS))
+        if df.empty:
+            # Nothing came back (provider error or outside retention); try again next time
+            continue
+        found = df[df.index.isin(missing)]
+        if not found.empty:
+            database.store_data(found, interval, symbol)
+            filled += len(found)
+        # The provider's answer for these days is final: holidays and short
+        # sessions are not requested again
+        database.mark_gap_days_checked(database.candle_table(interval, symbol), run.strftime('%Y-%m-%d'))
+    return filled
 
 if __name__ == "__main__":
     # Test fetching
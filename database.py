@@ -1,49 +1,427 @@
 import sqlite3
+import queue
+import threading
+import numpy as np
 import pandas as pd
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 import os
+import re
+import uuid
+import archive
+import feature_builder
+import schema
 
 DB_NAME = 'nifty50_data.db'
+# Storage is partitioned by symbol: every symbol has its own set of candle
+# tables keyed by ts, so (symbol, ts) is unique and each symbol gets its own
+# primary-key index. The index keeps its original nifty_* tables.
+DEFAULT_SYMBOL = '^NSEI'
+TIMEFRAMES = ['15m', '1h', '1d', '1wk']
+# Candle tables are keyed by `ts`, epoch seconds (UTC). Frames are always
+# presented in exchange time; the `timestamp` TEXT column is kept alongside
+# as the IST rendering for ad-hoc SQL.
+IST = 'Asia/Kolkata'
+
+# WAL lets dashboard reads proceed while the updater writes. synchronous=NORMAL
+# is durable under WAL except for the last commits on power loss.
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,       # 64 MB page cache (negative = KiB)
+    'mmap_size': 268435456,     # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,       # writers queue behind each other instead of failing
+}
+# Idle connections kept per database file
+POOL_SIZE = 8
+# sqlite3 keeps this many prepared statements per connection, keyed by SQL text
+STATEMENT_CACHE_SIZE = 256
+# Relative difference below which a stored float counts as unchanged
+CHANGE_RTOL = 1e-9
+
+# Explicit read dtypes, from schema.py. Categorical columns are stored as
+# codes and read back as pd.Categorical over the same labels, so nothing is
+# decoded to strings until a frame is rendered (e.g. the /api/data JSON).
+FLAG_COLUMNS = schema.FLAG_COLUMNS
+# Kept at float64 even when indicators are read as float32
+PRICE_COLUMNS = schema.PRICE_COLUMNS
+
+# Read results cached per process, validated against table_versions
+QUERY_CACHE_SIZE = 64
+# features_merged rows are rebuilt whenever nifty_1h or nifty_1d is written
+DEPENDENT_TABLES = {'nifty_1h': ['features_merged'], 'nifty_1d': ['features_merged']}
+
+_pools = {}
+_query_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
+    """
+    Open a new connection with the tuned pragmas applied. Prefer pooled_connection().
+    """
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
     return conn
 
-def init_db():
-    conn = get_db_connection()
+@contextmanager
+def pooled_connection():
+    """
+    Check a connection out of the pool for DB_NAME for the duration of the block.
+    A connection is only ever used by one thread at a time.
+    """
+    pool = _pools.setdefault(DB_NAME, queue.LifoQueue())
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = get_db_connection()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        if pool.qsize() < POOL_SIZE:
+            pool.put(conn)
+        else:
+            conn.close()
+
+def close_pool():
+    """
+    Close all idle pooled connections (e.g. before replacing the database file).
+    """
+    for pool in _pools.values():
+        while not pool.empty():
+            pool.get_nowait().close()
+    _pools.clear()
+
+@lru_cache(maxsize=128)
+def _upsert_sql(table_name, cols_to_store):
+    """
+    Generated UPSERT text per (table, columns); identical text lets sqlite3
+    reuse the prepared statement from its per-connection cache.
+    """
+    col_str = ', '.join(cols_to_store)
+    placeholders = ', '.join(['?'] * len(cols_to_store))
+
+    # Update all columns EXCEPT the ts key on conflict
+    update_cols = [c for c in cols_to_store if c != 'ts']
+    update_clause = ', '.join([f"{c}=excluded.{c}" for c in update_cols])
+
+    return f'''
+        INSERT INTO {table_name} ({col_str})
+        VALUES ({placeholders})
+        ON CONFLICT(ts) DO UPDATE SET
+        {update_clause}
+    '''
+
+def to_epoch(index):
+    """
+    Epoch seconds for a DatetimeIndex; naive timestamps are taken as IST.
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize(IST)
+    return ((index - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype='int64')
+
+def from_epoch(ts):
+    """
+    IST DatetimeIndex named 'timestamp' built directly from epoch seconds.
+    """
+    index = pd.to_datetime(np.asarray(ts, dtype='int64'), unit='s', utc=True).tz_convert(IST)
+    index.name = 'timestamp'
+    return index
+
+def ist_text(ts):
+    """
+    'YYYY-MM-DD HH:MM:SS+05:30' renderings of epoch seconds, the format of the
+    timestamp TEXT column, built without a per-row Timestamp.
+    """
+    local = (np.asarray(ts, dtype='int64') + 19800).astype('datetime64[s]')
+    return np.char.add(np.char.replace(np.datetime_as_string(local), 'T', ' '), '+05:30')
+
+def symbol_prefix(symbol=None):
+    """
+    Table prefix for `symbol`: 'nifty' for the index, else e.g. 'sym_reliance_ns'.
+    """
+    if symbol is None or symbol == DEFAULT_SYMBOL:
+        return 'nifty'
+    return 'sym_' + re.sub(r'[^a-z0-9]+', '_', symbol.lower()).strip('_')
+
+def candle_table(timeframe, symbol=None):
+    return f'{symbol_prefix(symbol)}_{timeframe}'
+
+
+def _epoch_bound(date_str, end=False):
+    """
+    Epoch seconds for a get_data filter. A bare YYYY-MM-DD covers the whole
+    IST day; other strings are parsed as timestamps (IST unless they carry an offset).
+    """
+    ts = pd.Timestamp(date_str)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(IST)
+    if end and len(date_str) == 10:
+        ts += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return int(ts.timestamp())
+
+def init_db(symbols=()):
+    with pooled_connection() as conn:
+        _create_tables(conn)
+        for symbol in symbols:
+            _create_symbol_tables(conn, symbol)
+    print(f"Database {DB_NAME} initialized successfully.")
+
+def _create_candle_table(conn, table_name, timeframe):
+    # Columns (indicators included) come from schema.py
+    conn.execute(schema.create_sql(table_name, schema.candle_columns(timeframe)))
+
+def _create_tables(conn):
     c = conn.cursor()
     
     # Create tables for different timeframes
-    timeframes = ['15m', '1h', '1d', '1wk']
-    
-    for tf in timeframes:
-        table_name = f'nifty_{tf}'
-        c.execute(f'''
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                timestamp TEXT PRIMARY KEY,
-                open REAL,
-                high REAL,
-                low REAL,
-                close REAL,
-                volume INTEGER,
-                target TEXT
-            )
-        ''')
+    for tf in TIMEFRAMES:
+        _create_candle_table(conn, f'nifty_{tf}', tf)
+        
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+
+    c.execute(GAP_CHECKS_DDL)
+    sync_categories(conn)
+    _ensure_database_id(conn)
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS symbols (
+            symbol TEXT PRIMARY KEY,
+            prefix TEXT UNIQUE NOT NULL
+        )
+    ''')
+    c.execute("INSERT OR IGNORE INTO symbols (symbol, prefix) VALUES (?, ?)",
+              (DEFAULT_SYMBOL, symbol_prefix(DEFAULT_SYMBOL)))
         
     conn.commit()
-    conn.close()
-    print(f"Database {DB_NAME} initialized successfully.")
 
-def store_data(df, timeframe):
+def _create_symbol_tables(conn, symbol):
+    """
+    Create the candle tables of `symbol` with the same declared columns as
+    the index's tables and register it.
+    """
+    _create_tables(conn)
+    for tf in TIMEFRAMES:
+        _create_candle_table(conn, candle_table(tf, symbol), tf)
+    conn.execute("INSERT OR IGNORE INTO symbols (symbol, prefix) VALUES (?, ?)",
+                 (symbol, symbol_prefix(symbol)))
+    conn.commit()
+
+def add_symbol(symbol):
+    with pooled_connection() as conn:
+        _create_symbol_tables(conn, symbol)
+
+def list_symbols():
+    """
+    Registered symbols, the index first.
+    """
+    with pooled_connection() as conn:
+        try:
+            rows = conn.execute("SELECT symbol FROM symbols ORDER BY symbol").fetchall()
+        except sqlite3.OperationalError:
+            return [DEFAULT_SYMBOL]
+    symbols = [r[0] for r in rows if r[0] != DEFAULT_SYMBOL]
+    return [DEFAULT_SYMBOL] + symbols
+
+def bump_versions(conn, tables):
+    """
+    Increment the write version of `tables` (plus their dependents) inside the
+    caller's transaction, invalidating cached reads in every process.
+    """
+    tables = list(tables)
+    for table in list(tables):
+        tables.extend(DEPENDENT_TABLES.get(table, []))
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.executemany('''
+        INSERT INTO table_versions (table_name, version) VALUES (?, 1)
+        ON CONFLICT(table_name) DO UPDATE SET version = version + 1
+    ''', [(t,) for t in dict.fromkeys(tables)])
+
+# A random id written once into each database file. Version counters restart
+# in a recreated or reloaded file, so cached results are keyed by both.
+DB_IDENTITY_DDL = 'CREATE TABLE IF NOT EXISTS db_identity (id TEXT NOT NULL)'
+
+def _ensure_database_id(conn):
+    conn.execute(DB_IDENTITY_DDL)
+    if conn.execute("SELECT 1 FROM db_identity").fetchone() is None:
+        conn.execute("INSERT INTO db_identity (id) VALUES (?)", (uuid.uuid4().hex,))
+
+def database_id(conn):
+    """
+    Identity of the database file behind `conn`; assigned on first use for
+    databases created before it existed.
+    """
+    try:
+        row = conn.execute("SELECT id FROM db_identity").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row is None:
+        _ensure_database_id(conn)
+        conn.commit()
+        row = conn.execute("SELECT id FROM db_identity").fetchone()
+    return row[0]
+
+def table_version(conn, table_name):
+    try:
+        row = conn.execute("SELECT version FROM table_versions WHERE table_name = ?",
+                           (table_name,)).fetchone()
+    except sqlite3.OperationalError:
+        # Databases created before table_versions existed
+        return 0
+    return row[0] if row else 0
+
+def last_timestamp(timeframe, symbol=None):
+    """
+    Start time of the newest stored bar (IST), or None when nothing is stored.
+    """
+    table_name = candle_table(timeframe, symbol)
+    with pooled_connection() as conn:
+        try:
+            ts = conn.execute(f"SELECT MAX(ts) FROM {table_name}").fetchone()[0]
+        except sqlite3.OperationalError:
+            return None
+    if ts is None:
+        # Everything may have been compacted into the archive
+        older = archive.read(table_name, [], limit=1)
+        if older.empty:
+            return None
+        ts = older['ts'].iloc[0]
+    return from_epoch([ts])[0]
+
+# Shared code table of the categorical columns, written from schema.CATEGORIES:
+# SELECT c.label FROM nifty_1h h JOIN categories c
+#     ON c.column_name = 'target' AND c.code = h.target
+CATEGORIES_DDL = '''
+    CREATE TABLE IF NOT EXISTS categories (
+        column_name TEXT,
+        code INTEGER,
+        label TEXT,
+        PRIMARY KEY (column_name, code)
+    )
+'''
+
+def sync_categories(conn):
+    conn.execute(CATEGORIES_DDL)
+    conn.executemany("INSERT OR REPLACE INTO categories (column_name, code, label) VALUES (?, ?, ?)",
+                     [(col, code, label) for col, labels in schema.CATEGORIES.items()
+                      for code, label in enumerate(labels)])
+
+def category_codes(values, column):
+    """
+    int8 codes (-1 = missing) of a categorical column given as labels (any
+    case), as codes, or as a mix of both (e.g. archived text months next to
+    coded rows). Unknown labels are reported and stored as missing.
+    """
+    labels = schema.categories_of(column)
+    values = pd.Series(values).reset_index(drop=True)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        if list(values.cat.categories) == labels:
+            return values.cat.codes.to_numpy(dtype=np.int8)
+        values = values.astype(object)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.fillna(-1).to_numpy(dtype=np.int8)
+    codes = values.map({label: code for code, label in enumerate(labels)})
+    rest = values.notna() & codes.isna()
+    if rest.any():
+        # Codes, or labels in another case (e.g. 'bullish')
+        upper = {label.upper(): code for code, label in enumerate(labels)}
+        numeric = pd.to_numeric(values[rest], errors='coerce')
+        codes[rest] = numeric.fillna(values[rest].astype(str).str.upper().map(upper))
+        unknown = values[values.notna() & codes.isna()]
+        if not unknown.empty:
+            print(f"Warning: unknown {column} labels stored as NULL: {sorted(set(map(str, unknown)))}")
+    return codes.fillna(-1).to_numpy(dtype=np.int8)
+
+def encode_categories(df):
+    """
+    Replace the categorical columns of `df` by their codes (NaN = missing,
+    stored as NULL), in place.
+    """
+    for col in df.columns:
+        if schema.categories_of(col) is not None:
+            codes = category_codes(df[col], col)
+            df[col] = np.where(codes >= 0, codes, np.nan)
+    return df
+
+# Days whose gaps have already been requested from the provider, per table.
+# Its answer is final: holidays and short sessions are not requested again.
+GAP_CHECKS_DDL = '''
+    CREATE TABLE IF NOT EXISTS gap_checks (
+        table_name TEXT,
+        day TEXT,
+        PRIMARY KEY (table_name, day)
+    )
+'''
+
+def checked_gap_days(table_name):
+    with pooled_connection() as conn:
+        conn.execute(GAP_CHECKS_DDL)
+        rows = conn.execute("SELECT day FROM gap_checks WHERE table_name = ?", (table_name,)).fetchall()
+    return {r[0] for r in rows}
+
+def mark_gap_days_checked(table_name, days):
+    with pooled_connection() as conn:
+        conn.execute(GAP_CHECKS_DDL)
+        conn.executemany("INSERT OR IGNORE INTO gap_checks (table_name, day) VALUES (?, ?)",
+                         [(table_name, str(day)) for day in days])
+        conn.commit()
+
+def store_data(df, timeframe, symbol=None):
     """
     Store OHLC data and all indicators in the database with safe upserts.
+    symbol: defaults to the index; tables for a new symbol are created on first store.
+    Only rows that are new or differ from what is stored are written, and
+    only their range of features_merged is rebuilt.
+    Returns a dict of inserted/updated/skipped row counts.
     """
     if df.empty:
-        return
-        
-    conn = get_db_connection()
-    table_name = f'nifty_{timeframe}'
+        return {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    with pooled_connection() as conn:
+        return _store_data(conn, df, timeframe, symbol)
+
+def _changed_mask(incoming, existing):
+    """
+    Vectorized column-wise comparison of incoming rows against the stored rows
+    aligned to them. True where any column differs (NULL equals NULL).
+    """
+    changed = np.zeros(len(incoming), dtype=bool)
+    for col in incoming.columns:
+        a, b = incoming[col], existing[col]
+        both_na = (a.isna() & b.isna()).to_numpy()
+        try:
+            fa = a.to_numpy(dtype=float, na_value=np.nan)
+            fb = b.to_numpy(dtype=float, na_value=np.nan)
+            same = np.isclose(fa, fb, rtol=CHANGE_RTOL, atol=0)
+        except (TypeError, ValueError):
+            same = (a.astype(object) == b.astype(object)).to_numpy()
+        changed |= ~(same | both_na)
+    return changed
+
+def _store_data(conn, df, timeframe, symbol=None):
+    table_name = candle_table(timeframe, symbol)
     
     df_reset = df.reset_index()
     if 'Date' in df_reset.columns:
@@ -51,87 +429,221 @@ def store_data(df, timeframe):
     elif 'Datetime' in df_reset.columns:
         df_reset.rename(columns={'Datetime': 'timestamp'}, inplace=True)
         
-    df_reset['timestamp'] = df_reset['timestamp'].astype(str)
+    if 'timestamp' not in df_reset.columns:
+        print(f"Error: timestamp column missing for {timeframe}")
+        return {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    index = pd.DatetimeIndex(df_reset['timestamp'])
+    if index.tz is None:
+        index = index.tz_localize(IST)
+    df_reset['ts'] = to_epoch(index)
+    df_reset['timestamp'] = ist_text(df_reset['ts'])
+    encode_categories(df_reset)
     
     # Get all column names from the database table to see what we can store
     cursor = conn.execute(f"PRAGMA table_info({table_name})")
     table_cols = [row[1] for row in cursor.fetchall()]
+    if not table_cols:
+        if symbol_prefix(symbol) != 'nifty':
+            _create_symbol_tables(conn, symbol)
+        if timeframe not in TIMEFRAMES:
+            # Custom timeframes built by resampler.py
+            _create_candle_table(conn, table_name, timeframe)
+            conn.commit()
+        table_cols = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
     
+    if 'ts' not in table_cols:
+        print(f"Error: {table_name} has no ts key, run migrate_schema.py first")
+        return {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    # Archived months are immutable; rows below the watermark live in Parquet
+    wm = archive.watermark(table_name)
+    if wm is not None and (df_reset['ts'] < wm).any():
+        print(f"Skipping {(df_reset['ts'] < wm).sum()} {table_name} rows in archived months.")
+        df_reset = df_reset[df_reset['ts'] >= wm]
+        if df_reset.empty:
+            return {'inserted': 0, 'updated': 0, 'skipped': 0}
+
     # Identify which columns in the DF exist in the table
     cols_to_store = [c for c in df_reset.columns if c in table_cols]
-    
-    if 'timestamp' not in cols_to_store:
-        print(f"Error: timestamp column missing for {timeframe}")
-        conn.close()
-        return
+    data_to_store = df_reset[cols_to_store].reset_index(drop=True)
 
-    data_to_store = df_reset[cols_to_store].copy()
-    
-    # Prepare the UPSERT query
-    col_str = ', '.join(cols_to_store)
-    placeholders = ', '.join(['?'] * len(cols_to_store))
-    
-    # Update all columns EXCEPT timestamp on conflict
-    update_cols = [c for c in cols_to_store if c != 'timestamp']
-    update_clause = ', '.join([f"{c}=excluded.{c}" for c in update_cols])
-    
-    query = f'''
-        INSERT INTO {table_name} ({col_str})
-        VALUES ({placeholders})
-        ON CONFLICT(timestamp) DO UPDATE SET
-        {update_clause}
-    '''
-    
-    # Use executemany for batch performance
-    values = [tuple(x) for x in data_to_store.values]
-    conn.executemany(query, values)
-        
-    conn.commit()
-    conn.close()
-    print(f"Stored {len(df)} records for {timeframe} timeframe (all columns upserted).")
+    # Compare against what is already stored over the same time range
+    existing = pd.read_sql_query(
+        f"SELECT {', '.join(cols_to_store)} FROM {table_name} WHERE ts >= ? AND ts <= ?",
+        conn, params=[int(data_to_store['ts'].min()), int(data_to_store['ts'].max())])
+    is_new = ~data_to_store['ts'].isin(existing['ts']).to_numpy()
+    # reindex leaves missing rows all-NULL; they are new rather than changed
+    existing = existing.set_index('ts').reindex(data_to_store['ts']).reset_index(drop=True)
+    is_changed = ~is_new & _changed_mask(data_to_store.drop(columns='ts'), existing)
+    data_to_store = data_to_store[is_new | is_changed]
+
+    stats = {
+        'inserted': int(is_new.sum()),
+        'updated': int(is_changed.sum()),
+        'skipped': int(len(is_new) - is_new.sum() - is_changed.sum()),
+    }
+
+    if not data_to_store.empty:
+        # Prepare the UPSERT query
+        query = _upsert_sql(table_name, tuple(cols_to_store))
+
+        # Use executemany for batch performance; nullable dtypes from typed
+        # reads carry pd.NA, which sqlite3 cannot bind
+        values = data_to_store.astype(object).where(data_to_store.notna(), None)
+        values = list(values.itertuples(index=False, name=None))
+        conn.executemany(query, values)
+        # Same transaction, so features_merged never lags its sources
+        feature_builder.refresh_for(conn, table_name, int(data_to_store['ts'].min()),
+                                    int(data_to_store['ts'].max()))
+        bump_versions(conn, [table_name])
+        conn.commit()
 
-def get_data(timeframe, start_date=None, end_date=None, limit=None):
+    label = timeframe if symbol_prefix(symbol) == 'nifty' else f'{symbol} {timeframe}'
+    print(f"Stored {label} data: {stats['inserted']} inserted, "
+          f"{stats['updated']} updated, {stats['skipped']} unchanged.")
+    return stats
+
+def get_data(timeframe, start_date=None, end_date=None, limit=None, columns=None, float32=False,
+             symbol=None):
     """
     Retrieve data from database.
+    symbol: defaults to the index (^NSEI)
     start_date, end_date: ISO format strings (YYYY-MM-DD...)
+    columns: optional list of columns to read (the index is always included)
+    float32: read indicator columns as float32 (prices stay float64)
+    Closed months compacted into the Parquet archive are unioned in transparently.
+    Results are served from an LRU cache until the table is written again.
     """
-    conn = get_db_connection()
-    table_name = f'nifty_{timeframe}'
-    
-    query = f"SELECT * FROM {table_name}"
+    return _cached_read(candle_table(timeframe, symbol), start_date, end_date, limit, columns, float32)
+
+def get_features(start_date=None, end_date=None, limit=None, columns=None, float32=False):
+    """
+    Retrieve rows of features_merged (hot SQLite rows plus the archive).
+    """
+    return _cached_read('features_merged', start_date, end_date, limit, columns, float32)
+
+def _cached_read(table_name, start_date, end_date, limit, columns, float32):
+    """
+    _read_table behind a bounded LRU keyed by the query arguments. An entry is
+    only valid for the table version it was read at; the version is read
+    before the query, so a concurrent write can only make an entry look stale.
+    """
+    key = (DB_NAME, table_name, start_date, end_date, limit,
+           tuple(columns) if columns is not None else None, float32)
+    with pooled_connection() as conn:
+        # A recreated file restarts the counters: the file's identity is part of the version
+        version = (database_id(conn), table_version(conn, table_name))
+
+    with _cache_lock:
+        entry = _query_cache.get(key)
+        if entry is not None and entry[0] == version:
+            _query_cache.move_to_end(key)
+            _cache_stats['hits'] += 1
+            return entry[1].copy()
+        _cache_stats['misses'] += 1
+
+    df = _read_table(table_name, start_date, end_date, limit, columns, float32)
+
+    with _cache_lock:
+        _query_cache[key] = (version, df.copy())
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+            _cache_stats['evictions'] += 1
+    return df
+
+def cache_info():
+    """
+    Hit/miss/eviction counters and current size of the read cache.
+    """
+    with _cache_lock:
+        return dict(_cache_stats, size=len(_query_cache), maxsize=QUERY_CACHE_SIZE)
+
+def clear_cache():
+    with _cache_lock:
+        _query_cache.clear()
+        for name in _cache_stats:
+            _cache_stats[name] = 0
+
+def _apply_dtypes(df, declared, float32=False):
+    """
+    Cast a freshly read frame to explicit dtypes instead of read_sql's inference:
+    categoricals over the stored signal/regime codes, nullable int8 for 0/1
+    flags, and the declared SQLite type for the rest.
+    """
+    for col in df.columns:
+        try:
+            labels = schema.categories_of(col)
+            if labels is not None:
+                df[col] = pd.Categorical.from_codes(category_codes(df[col], col), labels)
+            elif col in FLAG_COLUMNS:
+                df[col] = df[col].astype('Int8')
+            elif 'INT' in declared.get(col, ''):
+                df[col] = df[col].astype('Int64')
+            elif declared.get(col, '') in ('REAL', 'FLOAT', 'DOUBLE', 'NUM', 'NUMERIC'):
+                use_f32 = float32 and col not in PRICE_COLUMNS
+                df[col] = df[col].astype('float32' if use_f32 else 'float64')
+        except (TypeError, ValueError):
+            # Legacy rows holding text in a numeric column keep the inferred dtype
+            pass
+    return df
+
+def _read_table(table_name, start_date, end_date, limit, columns, float32=False):
+    start_ts = _epoch_bound(start_date) if start_date else None
+    end_ts = _epoch_bound(end_date, end=True) if end_date else None
+    wm = archive.watermark(table_name)
+
+    with pooled_connection() as conn:
+        declared = {r[1]: r[2].upper() for r in conn.execute(f"PRAGMA table_info({table_name})")}
+    if columns is not None:
+        # Names come from API callers: only the table's own columns reach the SQL
+        unknown = [c for c in columns if c not in declared]
+        if unknown:
+            raise ValueError(f"Unknown columns for {table_name}: {', '.join(map(str, unknown))}")
+        select = ', '.join(f'"{c}"' for c in ['ts'] + [c for c in columns if c != 'ts'])
+    else:
+        select = '*'
+    query = f"SELECT {select} FROM {table_name}"
     params = []
     
     conditions = []
-    if start_date:
-        # If start_date is just YYYY-MM-DD, add time
-        if len(start_date) == 10:
-            start_date += " 00:00:00"
-        conditions.append("timestamp >= ?")
-        params.append(start_date)
-    if end_date:
-        # If end_date is just YYYY-MM-DD, add time
-        if len(end_date) == 10:
-            end_date += " 23:59:59"
-        conditions.append("timestamp <= ?")
-        params.append(end_date)
+    if start_ts is not None:
+        conditions.append("ts >= ?")
+        params.append(start_ts)
+    if end_ts is not None:
+        conditions.append("ts <= ?")
+        params.append(end_ts)
+    if wm is not None:
+        conditions.append("ts >= ?")
+        params.append(wm)
         
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
         
-    query += " ORDER BY timestamp DESC"
+    query += " ORDER BY ts DESC"
     
     if limit:
-        query += f" LIMIT {limit}"
+        query += f" LIMIT {int(limit)}"
         
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    with pooled_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    # Older rows come from the archive when the range reaches below the watermark
+    if wm is not None and (start_ts is None or start_ts < wm) and (not limit or len(df) < limit):
+        arch_end = wm - 1 if end_ts is None else min(end_ts, wm - 1)
+        older = archive.read(table_name, columns, start_ts, arch_end,
+                             limit - len(df) if limit else None)
+        if not older.empty:
+            df = pd.concat([df, older], ignore_index=True) if not df.empty else older
     
-    if not df.empty:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df.set_index('timestamp', inplace=True)
-        df.sort_index(ascending=False, inplace=True)
+    # Index straight from the integer key; the TEXT rendering is not parsed
+    df.index = from_epoch(df.pop('ts'))
+    if 'timestamp' in df.columns:
+        df = df.drop(columns='timestamp')
         
-    return df
+    return _apply_dtypes(df, declared, float32)
 
 if __name__ == '__main__':
     init_db()
@@ -3,7 +3,7 @@ import pandas as pd
 
 def debug_signals():
     print("Fetching hourly data...")
-    df = database.get_data('1h', limit=1000)
+    df = database.get_data('1h', limit=1000, columns=['close', 'target'])
     print(f"Total rows fetched: {len(df)}")
     
     # Check for duplicates or weird indices
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+import schema
+
+# Dictionary encodings for the categorical outputs (code = position, -1 = missing),
+# shared with the stored schema
+RSI_ZONES = schema.CATEGORIES['rsi_zone']
+EMA_ALIGNMENTS = schema.CATEGORIES['ema_alignment']
+TREND_FLAGS = schema.CATEGORIES['trend_flag']
+
+def _column(df, name):
+    return np.ascontiguousarray(df[name].to_numpy(dtype=np.float64))
+
+def _linear_filter(x, c, init):
+    """
+    y[t] = c * y[t-1] + (1 - c) * x[t] with y[-1] = init, vectorized in blocks.
+    Within a block y[j] = c^(j+1) * y_prev + (1 - c) * c^j * cumsum(x[i] / c^i);
+    blocks are short enough that c^-j cannot overflow.
+    """
+    n = len(x)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    block = n if c >= 1.0 else max(1, min(n, int(30.0 / -np.log(c))))
+    j = np.arange(block)
+    pow_j = c ** j
+    inv_pow_j = 1.0 / pow_j
+    y_prev = init
+    for start in range(0, n, block):
+        seg = x[start:start + block]
+        k = len(seg)
+        acc = np.cumsum(seg * inv_pow_j[:k])
+        out[start:start + k] = c * pow_j[:k] * y_prev + (1.0 - c) * pow_j[:k] * acc
+        y_prev = out[start + k - 1]
+    return out
+
+def _ewm_mean(x, alpha, adjust, min_periods=1):
+    """
+    Equivalent of pd.Series(x).ewm(alpha=alpha, adjust=adjust, min_periods=...).mean()
+    for a series whose NaNs are all leading.
+    """
+    out = np.full(len(x), np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if len(valid) == 0:
+        return out
+    first = valid[0]
+    seg = x[first:]
+    c = 1.0 - alpha
+    if adjust:
+        # Weighted mean with weights c^k: numerator and denominator are both filters
+        num = _linear_filter(seg, c, 0.0)
+        den = 1.0 - c ** np.arange(1, len(seg) + 1)
+        res = num / den
+    else:
+        res = _linear_filter(seg, c, seg[0])
+    res[:max(min_periods, 1) - 1] = np.nan
+    out[first:] = res
+    return out
+
+def _ema(close, length):
+    # pandas_ta ema: SMA of the first `length` closes seeds an adjust=False EWM
+    out = np.full(len(close), np.nan)
+    if len(close) < length:
+        return out
+    seed = close[length - 1:].copy()
+    seed[0] = close[:length].mean()
+    out[length - 1:] = _ewm_mean(seed, 2.0 / (length + 1), adjust=False)
+    return out
+
+def _windows(x, length):
+    # Row t holds x[t - length + 1 .. t]; rows without a full history contain NaN
+    padded = np.concatenate([np.full(length - 1, np.nan), x])
+    return sliding_window_view(padded, length)
+
+def _rolling_mean(x, length):
+    return _windows(x, length).mean(axis=1)
+
+def _shift(x, n):
+    out = np.full(len(x), np.nan)
+    if n < len(x):
+        out[n:] = x[:len(x) - n]
+    return out
+
+def _rsi(delta, length=14):
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    gains[0] = losses[0] = np.nan
+    gain_avg = _ewm_mean(gains, 1.0 / length, adjust=True, min_periods=length)
+    loss_avg = _ewm_mean(losses, 1.0 / length, adjust=True, min_periods=length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * gain_avg / (gain_avg + loss_avg)
+
+def _flag(cond):
+    return cond.astype(np.int64)
+
+def hourly_indicators(df):
+    """
+    NumPy backend for indicators.calculate_hourly_indicators.
+    Returns a dict of column name -> array (categoricals as pd.Categorical).
+    """
+    close = _column(df, 'close')
+    high = _column(df, 'high')
+    low = _column(df, 'low')
+    out = {}
+
+    # Shared intermediates
+    prev_close = _shift(close, 1)
+    delta = close - prev_close
+    w25 = _windows(close, 25)
+    w20 = w25[:, 5:]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # RSI
+        rsi = _rsi(delta)
+        out['rsi_14'] = rsi
+        out['rsi_sma_14'] = _rolling_mean(rsi, 14)
+        out['rsi_diff'] = rsi - out['rsi_sma_14']
+        out['rsi_slope'] = rsi - _shift(rsi, 3)
+        out['rsi_dist_50'] = rsi - 50
+        zone = np.select([rsi > 70, rsi < 30], [1, 2], 0).astype(np.int8)
+        out['rsi_zone'] = pd.Categorical.from_codes(zone, RSI_ZONES)
+
+        # ROC Suite
+        for n in (7, 9, 21):
+            past = _shift(close, n)
+            out[f'roc_{n}'] = 100 * (close - past) / past
+        out['roc7_flag'] = _flag(out['roc_7'] > 0)
+        out['roc_accel'] = out['roc_7'] - out['roc_21']
+
+        # Range Metrics
+        out['hl_range'] = high - low
+        out['range_pct'] = (out['hl_range'] / close) * 100
+
+        # Moving Averages
+        for n in (7, 9, 20, 50, 100):
+            out[f'ema_{n}'] = _ema(close, n)
+        sum25 = w25.sum(axis=1)
+        out['sma_25'] = sum25 / 25
+
+        # LSMA: least squares over x = 1..25 evaluated at m * 24 + b (pandas_ta linreg)
+        x_sum = 0.5 * 25 * 26
+        x2_sum = x_sum * 51 / 3
+        divisor = 25 * x2_sum - x_sum * x_sum
+        m = (25 * (w25 @ np.arange(1.0, 26.0)) - x_sum * sum25) / divisor
+        b = (sum25 - m * x_sum) / 25
+        lsma = m * 24 + b
+        if len(close) < 25:
+            lsma[:] = np.nan
+        out['lsma_25'] = lsma
+
+        # LSMA Logic
+        out['close_gt_lsma'] = _flag(close > lsma)
+        out['close_lt_lsma'] = _flag(close < lsma)
+        out['close_pct_lsma'] = (close - lsma) / lsma * 100
+        out['lsma_diff'] = close - lsma
+        out['close_pct_sma_25'] = (close - out['sma_25']) / out['sma_25'] * 100
+
+        # EMA Alignment Flag
+        e20, e50, e100 = out['ema_20'], out['ema_50'], out['ema_100']
+        align = np.select([np.isnan(e100), (e20 > e50) & (e50 > e100), (e20 < e50) & (e50 < e100)],
+                          [-1, 1, 2], 0).astype(np.int8)
+        out['ema_alignment'] = pd.Categorical.from_codes(align, EMA_ALIGNMENTS)
+
+        # Bollinger Bands (population std, as pandas_ta bbands)
+        mid = w20.mean(axis=1)
+        dev = 2 * w20.std(axis=1)
+        out['bb_upper'] = mid + dev
+        out['bb_lower'] = mid - dev
+        out['bb_middle'] = mid
+        band = out['bb_upper'] - out['bb_lower']
+        out['bb_width'] = band / mid
+        out['bb_squeeze'] = _flag(out['bb_width'] < _rolling_mean(out['bb_width'], 20))
+        out['bb_position'] = (close - out['bb_lower']) / band
+        out['bb_range'] = band
+        out['bb_upper_slope'] = out['bb_upper'] - _shift(out['bb_upper'], 1)
+        out['bb_lower_slope'] = out['bb_lower'] - _shift(out['bb_lower'], 1)
+
+        # ATR
+        tr = np.maximum.reduce([np.abs(high - low), np.abs(high - prev_close), np.abs(prev_close - low)])
+        tr[0] = np.nan
+        out['atr_14'] = _ewm_mean(tr, 1.0 / 14, adjust=True, min_periods=14)
+        out['atr_pct'] = out['atr_14'] / close * 100
+
+        # Breakouts
+        out['break_high_5'] = _flag(close > _windows(_shift(high, 1), 5).max(axis=1))
+        out['break_low_5'] = _flag(close < _windows(_shift(low, 1), 5).min(axis=1))
+
+    return out
+
+def daily_indicators(df):
+    """
+    NumPy backend for indicators.calculate_daily_indicators.
+    """
+    close = _column(df, 'close')
+    out = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = _rsi(close - _shift(close, 1))
+        out['rsi_14'] = rsi
+        out['rsi_slope'] = rsi - _shift(rsi, 3)
+        ema = _ema(close, 20)
+        out['ema_20'] = ema
+        out['ema_20_slope'] = ema - _shift(ema, 3)
+        out['trend_flag'] = pd.Categorical.from_codes(_flag(close > ema).astype(np.int8), TREND_FLAGS)
+    return out
@@ -0,0 +1,128 @@
+import sys
+import time
+import database
+import archive
+import schema
+
+# features_merged holds every nifty_1h column plus the indicators of the
+# previous completed daily bar as daily_<column> and the encoded target as
+# `signal`. It is rebuilt set-based for the affected range whenever nifty_1h
+# or nifty_1d is written, inside the same transaction, instead of by per-row
+# triggers with one nifty_1d lookup per daily column.
+# Its columns are declared in schema.feature_columns().
+FEATURES_TABLE = schema.FEATURES_TABLE
+HOURLY_TABLE = 'nifty_1h'
+DAILY_TABLE = 'nifty_1d'
+# target is stored as its code in schema.CATEGORIES; signal is the same code
+# under the name the training code has always used
+SIGNAL_SQL = 'h.target'
+# Triggers installed by older versions of migrate_features_merged.py
+LEGACY_TRIGGERS = ['sync_nifty_1h_insert', 'sync_nifty_1h_update']
+DAY_SECONDS = 86400
+IST_OFFSET = 19800
+
+_plans = {}
+
+def _columns(conn, table):
+    return [(r[1], r[2]) for r in conn.execute(f"PRAGMA table_info({table})")]
+
+def ensure_schema(conn):
+    """
+    Create features_merged, or add the declared columns it lacks, so upstream
+    schema changes need no further steps. Only columns whose source exists in
+    nifty_1h/nifty_1d are filled (migrate_schema adds the rest). A table from
+    before the ts key is derived data and simply rebuilt. Returns the upsert
+    SQL for the current schema (cached per schema_version).
+    """
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    plan = _plans.get((database.DB_NAME, schema_version))
+    if plan is not None:
+        return plan
+
+    for name in LEGACY_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    hourly_live = dict(_columns(conn, HOURLY_TABLE))
+    daily_live = dict(_columns(conn, DAILY_TABLE))
+    hourly = [(name, ctype) for name, ctype in schema.candle_columns('1h') if name in hourly_live]
+    daily = [(f'daily_{name}', name, ctype) for name, ctype in schema.candle_columns('1d')
+             if name not in schema.DAILY_FEATURE_EXCLUDE and name in daily_live]
+    wanted = [(name, ctype) for name, ctype in hourly if name != 'ts']
+    wanted += [(name, ctype) for name, _, ctype in daily] + [('signal', 'INTEGER')]
+
+    existing = dict(_columns(conn, FEATURES_TABLE))
+    if existing and 'ts' not in existing:
+        print(f"Rebuilding {FEATURES_TABLE} keyed by ts...")
+        conn.execute(f"DROP TABLE {FEATURES_TABLE}")
+        existing = {}
+    if not existing:
+        conn.execute(schema.create_sql(FEATURES_TABLE, wanted))
+    else:
+        for name, ctype in wanted:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {FEATURES_TABLE} ADD COLUMN {name} {ctype}")
+
+    targets = ['ts'] + [name for name, _ in wanted]
+    sources = [f'h.{name}' for name, _ in hourly]
+    sources += [f'd.{source}' for _, source, _ in daily] + [SIGNAL_SQL]
+    # As-of join: each hourly bar gets the newest daily bar stamped before its
+    # own session day, found through the nifty_1d primary key (archive.compact
+    # keeps the last archived daily bar in SQLite for the first hot sessions)
+    sql = f'''
+        INSERT INTO {FEATURES_TABLE} ({', '.join(targets)})
+        SELECT {', '.join(sources)}
+        FROM {HOURLY_TABLE} h
+        LEFT JOIN {DAILY_TABLE} d ON d.ts = (
+            SELECT MAX(ts) FROM {DAILY_TABLE}
+            WHERE ts < h.ts - (h.ts + {IST_OFFSET}) % {DAY_SECONDS})
+        WHERE h.ts >= ? AND h.ts < ?
+        ON CONFLICT(ts) DO UPDATE SET
+        {', '.join(f'{c}=excluded.{c}' for c in targets if c != 'ts')}
+    '''
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    _plans[(database.DB_NAME, schema_version)] = sql
+    return sql
+
+def refresh(conn, start_ts=None, end_ts=None):
+    """
+    Rebuild the features_merged rows of hourly bars in [start_ts, end_ts)
+    (epoch seconds, open-ended when None) inside the caller's transaction.
+    Rows in archived months are left alone. Returns the number of rows written.
+    """
+    sql = ensure_schema(conn)
+    wm = archive.watermark(FEATURES_TABLE)
+    start_ts = max(start_ts or 0, wm or 0)
+    end_ts = end_ts if end_ts is not None else 2 ** 62
+    if start_ts >= end_ts:
+        return 0
+    count = conn.execute(sql, (start_ts, end_ts)).rowcount
+    database.bump_versions(conn, [FEATURES_TABLE])
+    return count
+
+def refresh_for(conn, table_name, start_ts, end_ts):
+    """
+    Refresh the features_merged rows affected by writes to `table_name`
+    between start_ts and end_ts (inclusive). A daily bar feeds the hourly
+    bars of the sessions after it, up to the day of the next daily bar.
+    """
+    if table_name == HOURLY_TABLE:
+        return refresh(conn, start_ts, end_ts + 1)
+    if table_name == DAILY_TABLE:
+        next_ts = conn.execute(f"SELECT MIN(ts) FROM {DAILY_TABLE} WHERE ts > ?", (end_ts,)).fetchone()[0]
+        return refresh(conn, start_ts + 1, next_ts + DAY_SECONDS if next_ts is not None else None)
+    return 0
+
+def rebuild():
+    """
+    Recompute every hot features_merged row from nifty_1h and nifty_1d.
+    """
+    start = time.perf_counter()
+    with database.pooled_connection() as conn:
+        count = refresh(conn)
+        conn.commit()
+    print(f"Rebuilt {count} {FEATURES_TABLE} rows in {time.perf_counter() - start:.2f}s.")
+    return count
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        database.DB_NAME = sys.argv[1]
+    rebuild()
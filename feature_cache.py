@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import database
+
+# Prepared training matrices, one directory per fingerprint:
+# feature_cache/<fingerprint>/{X.npy, y.npy, index.npy, meta.json}. X and y are loaded
+# memory-mapped, so a repeat run reads pages on demand instead of re-running
+# the SQLite read and the numeric coercion. X is stored as float64; the trees
+# see every feature as a float anyway.
+CACHE_DIR = 'feature_cache'
+# Matrices kept; the least recently used go first
+MAX_ENTRIES = 8
+
+def _file_digest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def fingerprint(table, label=None, label_path=None, **params):
+    """
+    Key of a prepared matrix: the database file and its identity, the write
+    version of the source table (bumped by every write, refresh and
+    compaction), the label (name and stored matrix contents) and any
+    preparation parameters, e.g. the exclusion list and a code version.
+    """
+    with database.pooled_connection() as conn:
+        db_id = database.database_id(conn)
+        version = database.table_version(conn, table)
+    inputs = {
+        'db': os.path.abspath(database.DB_NAME),
+        # The version restarts when the file is recreated; its identity doesn't
+        'db_id': db_id,
+        'table': table,
+        'version': version,
+        'label': label,
+        'label_digest': _file_digest(label_path) if label_path else None,
+        'params': params,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+def _entry_dir(key):
+    return os.path.join(CACHE_DIR, key)
+
+def load(key):
+    """
+    (X, y, feature_cols) for `key`, memory-mapped, or None on a miss.
+    X and y get back the index they were stored with.
+    """
+    path = _entry_dir(key)
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        index = pd.Index(np.load(os.path.join(path, 'index.npy')))
+    except FileNotFoundError:
+        return None
+    values = np.load(os.path.join(path, 'X.npy'), mmap_mode='r')
+    target = np.load(os.path.join(path, 'y.npy'), mmap_mode='r')
+    os.utime(os.path.join(path, 'meta.json'))
+    # copy=False keeps the frame a view of the mapped file
+    X = pd.DataFrame(values, index=index, columns=meta['columns'], copy=False)
+    y = pd.Series(target, index=index, name=meta['target'], copy=False)
+    return X, y, meta['columns']
+
+def store(key, X, y):
+    """
+    Save a prepared X/y under `key` (written to a temp directory and renamed
+    into place), then trim the cache to MAX_ENTRIES.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _entry_dir(key) + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'X.npy'), np.ascontiguousarray(X.to_numpy(dtype=np.float64)))
+    np.save(os.path.join(tmp_path, 'y.npy'), y.to_numpy())
+    np.save(os.path.join(tmp_path, 'index.npy'), X.index.to_numpy())
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({'columns': list(X.columns), 'target': y.name, 'rows': len(X)}, f)
+    shutil.rmtree(_entry_dir(key), ignore_errors=True)
+    os.replace(tmp_path, _entry_dir(key))
+    _trim()
+
+def _trim():
+    entries = [e for e in os.listdir(CACHE_DIR)
+               if os.path.exists(os.path.join(CACHE_DIR, e, 'meta.json'))]
+    entries.sort(key=lambda e: os.path.getmtime(os.path.join(CACHE_DIR, e, 'meta.json')))
+    for entry in entries[:-MAX_ENTRIES]:
+        shutil.rmtree(os.path.join(CACHE_DIR, entry), ignore_errors=True)
+
+def clear():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'clear':
+        clear()
+        print("Feature cache cleared.")
+    elif os.path.isdir(CACHE_DIR):
+        for entry in sorted(os.listdir(CACHE_DIR)):
+            meta_path = os.path.join(CACHE_DIR, entry, 'meta.json')
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                print(f"{entry}: {meta['rows']} rows x {len(meta['columns'])} features")
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+import numpy as np
+from sklearn.metrics import roc_auc_score
+import database
+import feature_cache
+import labels
+import train_model
+import walk_forward
+
+# Successive-halving search over the Random Forest hyperparameters. N_CONFIGS
+# random configurations are scored on purged walk-forward folds with few
+# trees; the best 1/ETA go on to ETA times as many trees, until one remains
+# at MAX_TREES. Every (configuration, trees, fold) score is appended to a log
+# in SEARCH_DIR, so an interrupted search resumes where it stopped.
+SEARCH_DIR = 'search_results'
+SPACE = {
+    'max_depth': [4, 6, 8, 10, 12, None],
+    'min_samples_leaf': [5, 10, 20, 30, 50, 100],
+    'max_features': ['sqrt', 'log2', 0.3, 0.5],
+}
+N_CONFIGS = 27
+ETA = 3
+MAX_TREES = 300
+MIN_TREES = 10
+N_FOLDS = 3
+SEED = 42
+
+def sample_configs(n_configs=N_CONFIGS, seed=SEED):
+    """
+    `n_configs` distinct configurations drawn from SPACE (the whole grid when
+    it is smaller); the same seed always draws the same list.
+    """
+    grid = [{}]
+    for name, values in SPACE.items():
+        grid = [dict(config, **{name: value}) for config in grid for value in values]
+    rng = np.random.default_rng(seed)
+    picks = rng.permutation(len(grid))[:n_configs]
+    return [grid[i] for i in sorted(picks)]
+
+def rungs(n_configs=N_CONFIGS, eta=ETA, max_trees=MAX_TREES):
+    """
+    (configurations, trees) per rung, e.g. 27 configs with eta 3:
+    27 x 11, 9 x 33, 3 x 100, 1 x 300 trees.
+    """
+    count = 1
+    while n_configs // eta ** count >= 1:
+        count += 1
+    return [(max(1, n_configs // eta ** i), max(MIN_TREES, max_trees // eta ** (count - 1 - i)))
+            for i in range(count)]
+
+def _score_fold(task):
+    """
+    Pool worker: fit one configuration with `trees` trees on one fold of the
+    memory-mapped matrix and return its ROC AUC on the test block.
+    """
+    key, config_id, config, trees, fold, train, test = task
+    X, y, _ = feature_cache.load(key)
+    model = train_model.make_model(n_jobs=1, n_estimators=trees, **config)
+    model.fit(X.iloc[train], y.iloc[train])
+    y_test = y.iloc[test].to_numpy()
+    if len(np.unique(y_test)) < 2:
+        score = float('nan')
+    else:
+        score = roc_auc_score(y_test, model.predict_proba(X.iloc[test])[:, 1])
+    return {'config': config_id, 'trees': trees, 'fold': fold, 'score': score}
+
+def log_path(key, configs, n_folds, eta, max_trees):
+    """
+    Result log of one search: the matrix it runs on and its settings are part
+    of the name, so changed data or settings start a new log.
+    """
+    settings = json.dumps([key, configs, n_folds, eta, max_trees], sort_keys=True, default=str)
+    return os.path.join(SEARCH_DIR, f"search_{hashlib.sha256(settings.encode()).hexdigest()[:16]}.jsonl")
+
+def _read_log(path):
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except json.JSONDecodeError:
+                    continue   # a line cut short by an interrupted run
+                done[(r['config'], r['trees'], r['fold'])] = r['score']
+    return done
+
+def search(label=None, n_configs=N_CONFIGS, eta=ETA, max_trees=MAX_TREES, n_folds=N_FOLDS,
+           cpus=None, seed=SEED, save=True):
+    """
+    Run (or resume) the search on the training matrix of `label`, fitting
+    folds in parallel on up to `cpus` processes. Returns the rung table as a
+    list of dicts, best last; with `save` the winner is written to
+    train_model.PARAMS_FILE.
+    """
+    X, _, _ = train_model.load_training_matrix(label)
+    key = train_model.matrix_key(label)
+    configs = sample_configs(n_configs, seed)
+    folds = walk_forward.make_folds(X.index, n_folds, embargo=labels.horizon_of(label))
+    os.makedirs(SEARCH_DIR, exist_ok=True)
+    path = log_path(key, configs, n_folds, eta, max_trees)
+    done = _read_log(path)
+    cpus = cpus or os.cpu_count()
+    print(f"Searching {len(configs)} configurations on {len(X)} rows, {n_folds} purged folds, "
+          f"{cpus} CPUs ({len(done)} fold scores already in {path})")
+
+    schedule = rungs(len(configs), eta, max_trees)
+    alive = list(range(len(configs)))
+    table = []
+    pool = None
+    if cpus > 1:
+        # Pooled SQLite connections must not be inherited across fork()
+        database.close_pool()
+        pool = multiprocessing.get_context('fork').Pool(cpus)
+    try:
+        for rung, (_, trees) in enumerate(schedule):
+            tasks = [(key, c, configs[c], trees, f, train, test)
+                     for c in alive for f, (train, test) in enumerate(folds)
+                     if (c, trees, f) not in done]
+            start = time.perf_counter()
+            with open(path, 'a') as log:
+                for r in (pool.imap_unordered(_score_fold, tasks) if pool else map(_score_fold, tasks)):
+                    done[(r['config'], r['trees'], r['fold'])] = r['score']
+                    log.write(json.dumps(r) + '\n')
+                    log.flush()
+            scores = {c: np.nanmean([done[(c, trees, f)] for f in range(len(folds))]) for c in alive}
+            alive = sorted(alive, key=lambda c: scores[c], reverse=True)
+            print(f"  rung {rung}: {len(scores)} configs x {trees} trees, {len(tasks)} fits in "
+                  f"{time.perf_counter() - start:.1f}s, best AUC {scores[alive[0]]:.4f}")
+            table += [{'config': c, 'trees': trees, 'score': scores[c], **configs[c]} for c in scores]
+            if rung + 1 < len(schedule):
+                alive = alive[:schedule[rung + 1][0]]
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    best = alive[0]
+    best_score = scores[best]
+    params = dict(configs[best], n_estimators=max_trees)
+    print(f"Best: {params} (AUC {best_score:.4f})")
+    if save:
+        with open(train_model.PARAMS_FILE, 'w') as f:
+            json.dump({'params': params, 'score': best_score, 'label': label, 'log': path}, f, indent=2)
+        print(f"Saved to {train_model.PARAMS_FILE}")
+    return sorted(table, key=lambda r: (r['trees'], r['score']))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Successive-halving search over the Random Forest parameters")
+    parser.add_argument('label', nargs='?', help="label from the label matrix, e.g. h5_t60")
+    parser.add_argument('--configs', type=int, default=N_CONFIGS)
+    parser.add_argument('--eta', type=int, default=ETA)
+    parser.add_argument('--max-trees', type=int, default=MAX_TREES)
+    parser.add_argument('--folds', type=int, default=N_FOLDS)
+    parser.add_argument('--cpus', type=int, help="worker processes (default: all CPUs)")
+    parser.add_argument('--dry-run', action='store_true', help="don't write the winner to " + train_model.PARAMS_FILE)
+    args = parser.parse_args()
+    search(args.label, args.configs, args.eta, args.max_trees, args.folds, args.cpus, save=not args.dry_run)
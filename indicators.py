@@ -1,14 +1,22 @@
 import pandas as pd
 import pandas_ta as ta
 import numpy as np
+import fast_indicators
 
-def calculate_hourly_indicators(df):
+def calculate_hourly_indicators(df, backend='pandas'):
     """
     Calculates detailed technical indicators for hourly data.
+    backend: 'pandas' (pandas_ta) or 'numpy' (vectorized kernels in
+    fast_indicators, categoricals returned dictionary-encoded).
     """
     if df.empty or len(df) < 50: # Need enough data for EMAs
         return df
 
+    if backend == 'numpy':
+        out = fast_indicators.hourly_indicators(df)
+        df[list(out)] = pd.DataFrame(out, index=df.index)
+        return df
+
     # RSI
     df['rsi_14'] = ta.rsi(df['close'], length=14)
     df['rsi_sma_14'] = ta.sma(df['rsi_14'], length=14)
@@ -81,13 +89,18 @@ def calculate_hourly_indicators(df):
 
     return df
 
-def calculate_daily_indicators(df):
+def calculate_daily_indicators(df, backend='pandas'):
     """
     Calculates technical indicators for daily data.
     """
     if df.empty or len(df) < 50:
         return df
 
+    if backend == 'numpy':
+        out = fast_indicators.daily_indicators(df)
+        df[list(out)] = pd.DataFrame(out, index=df.index)
+        return df
+
     # Daily RSI14
     df['rsi_14'] = ta.rsi(df['close'], length=14)
     df['rsi_slope'] = df['rsi_14'].diff(3)
@@ -1,36 +1,46 @@
+import sys
 import data_fetcher
 import database
+import resampler
 import time
 
-def initial_setup():
+def initial_setup(symbols=(data_fetcher.SYMBOL,)):
     print("Starting initial setup...")
-    database.init_db()
-    
+    database.init_db(symbols=[s for s in symbols if s != data_fetcher.SYMBOL])
+    for symbol in symbols:
+        setup_symbol(symbol)
+    print("\nInitial setup completed successfully!")
+
+def setup_symbol(symbol):
+    print(f"\n=== {symbol} ===")
     # 1. Fetch and store max available daily data
     print("\nFetching Daily Data (Max)...")
-    df_daily = data_fetcher.fetch_nifty_data('1d', 'max')
+    df_daily = data_fetcher.fetch_nifty_data('1d', 'max', symbol)
     if not df_daily.empty:
-        database.store_data(df_daily, '1d')
+        database.store_data(df_daily, '1d', symbol)
         
-    # 2. Fetch and store max available weekly data
-    print("\nFetching Weekly Data (Max)...")
-    df_weekly = data_fetcher.fetch_nifty_data('1wk', 'max')
-    if not df_weekly.empty:
-        database.store_data(df_weekly, '1wk')
+    # 2. Weekly candles are built from the daily history, no download needed
+    print("\nBuilding Weekly Data from Daily...")
+    resampler.update_resampled('1wk', '1d', symbol)
         
     # 3. Fetch and store max available hourly data (limited to 730 days)
     print("\nFetching Hourly Data (730d)...")
-    df_hourly = data_fetcher.fetch_nifty_data('1h', 'max') # handled in fetcher
+    df_hourly = data_fetcher.fetch_nifty_data('1h', 'max', symbol) # handled in fetcher
     if not df_hourly.empty:
-        database.store_data(df_hourly, '1h')
+        database.store_data(df_hourly, '1h', symbol)
         
     # 4. Fetch and store max available 15m data (limited to 60 days)
     print("\nFetching 15m Data (60d)...")
-    df_15m = data_fetcher.fetch_nifty_data('15m', 'max') # handled in fetcher
+    df_15m = data_fetcher.fetch_nifty_data('15m', 'max', symbol) # handled in fetcher
     if not df_15m.empty:
-        database.store_data(df_15m, '15m')
-        
-    print("\nInitial setup completed successfully!")
+        database.store_data(df_15m, '15m', symbol)
 
 if __name__ == "__main__":
-    initial_setup()
+    # python initial_setup.py [all | SYMBOL ...]; defaults to the index only
+    args = sys.argv[1:]
+    if args == ['all']:
+        initial_setup([data_fetcher.SYMBOL] + data_fetcher.NIFTY50_SYMBOLS)
+    elif args:
+        initial_setup(args)
+    else:
+        initial_setup()
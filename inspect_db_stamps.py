@@ -5,15 +5,21 @@ def check_db():
     c = conn.cursor()
     
     # Check for latest timestamps and their targets
-    print("Latest 20 Hourly entries sorted by string:")
-    c.execute("SELECT timestamp, target FROM nifty_1h ORDER BY timestamp DESC LIMIT 20")
+    print("Latest 20 Hourly entries sorted by epoch key:")
+    c.execute("SELECT ts, timestamp, target FROM nifty_1h ORDER BY ts DESC LIMIT 20")
     for row in c.fetchall():
-        print(f"Timestamp: '{row[0]}', Target: '{row[1]}'")
+        print(f"ts: {row[0]}, Timestamp: '{row[1]}', Target: '{row[2]}'")
         
     print("\nEntries for today (Feb 16) specifically:")
-    c.execute("SELECT timestamp, target FROM nifty_1h WHERE timestamp LIKE '2026-02-16%'")
+    # Integer range on the key: one IST day, independent of the text format
+    c.execute("""
+        SELECT ts, timestamp, target FROM nifty_1h
+        WHERE ts >= strftime('%s', '2026-02-16 00:00:00+05:30')
+          AND ts < strftime('%s', '2026-02-17 00:00:00+05:30')
+        ORDER BY ts
+    """)
     for row in c.fetchall():
-        print(f"Timestamp: '{row[0]}', Target: '{row[1]}'")
+        print(f"ts: {row[0]}, Timestamp: '{row[1]}', Target: '{row[2]}'")
         
     conn.close()
 
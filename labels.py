@@ -0,0 +1,113 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import database
+
+# Forward-return labels over a grid of horizons (bars ahead) and thresholds
+# (absolute fractional return), as int8 codes of schema.CATEGORIES['target']:
+# PUT = 0, SIDEWAYS = 1, CALL = 2, and -1 where the horizon runs past the
+# last close. One matrix per table: labels/<table>.parquet, keyed by ts.
+LABELS_DIR = 'labels'
+# The label stored as `target`
+HORIZON = 3
+THRESHOLD = 0.004
+HORIZONS = list(range(1, 9))
+THRESHOLDS = [round(0.001 * i, 3) for i in range(2, 11)]   # 0.2% .. 1.0%
+
+def label_name(horizon, threshold):
+    """
+    Column name of one label, e.g. 'h3_t40' for T+3 at +/-0.40%.
+    """
+    return f'h{horizon}_t{round(threshold * 10000)}'
+
+def horizon_of(name=None):
+    """
+    Bars a label looks ahead: 5 for 'h5_t60', HORIZON for the stored target.
+    """
+    if name is None:
+        return HORIZON
+    return int(name.split('_')[0][1:])
+
+def label_matrix(close, horizons=HORIZONS, thresholds=THRESHOLDS):
+    """
+    Codes of shape (len(close), len(horizons), len(thresholds)), computed in
+    one broadcast pass over the close array. The return is
+    (close[t + h] - close[t]) / close[t]; above +threshold is CALL, below
+    -threshold PUT, anything else SIDEWAYS.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    horizons = np.asarray(horizons)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    n = len(close)
+    if n == 0:
+        return np.empty((0, len(horizons), len(thresholds)), dtype=np.int8)
+    ahead = np.arange(n)[:, None] + horizons
+    future = close[np.minimum(ahead, n - 1)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ret = (future - close[:, None]) / close[:, None]
+    ret = ret[:, :, None]
+    codes = 1 + (ret > thresholds).astype(np.int8) - (ret < -thresholds).astype(np.int8)
+    codes[(ahead >= n) | np.isnan(ret[:, :, 0])] = -1
+    return codes
+
+def target_codes(close, horizon=HORIZON, threshold=THRESHOLD):
+    return label_matrix(close, [horizon], [threshold])[:, 0, 0]
+
+def label_frame(close, horizons=HORIZONS, thresholds=THRESHOLDS):
+    """
+    The label grid of a close series as one int8 column per label, same index.
+    """
+    codes = label_matrix(close, horizons, thresholds)
+    names = [label_name(h, t) for h in horizons for t in thresholds]
+    return pd.DataFrame(codes.reshape(len(codes), -1), index=close.index, columns=names)
+
+def matrix_path(table):
+    return os.path.join(LABELS_DIR, f'{table}.parquet')
+
+def store(frame, table):
+    """
+    Write the label matrix of `table` (a label_frame) atomically.
+    """
+    os.makedirs(LABELS_DIR, exist_ok=True)
+    out = frame.reset_index(drop=True)
+    out.insert(0, 'ts', database.to_epoch(frame.index))
+    tmp_path = matrix_path(table) + '.tmp'
+    out.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, matrix_path(table))
+
+def load(table, names=None):
+    """
+    Stored labels of `table` indexed by IST timestamp; only the `names`
+    columns are decoded when given. Empty when nothing is stored yet.
+    """
+    if not os.path.exists(matrix_path(table)):
+        return pd.DataFrame(index=database.from_epoch([]))
+    columns = None if names is None else ['ts'] + list(names)
+    df = pd.read_parquet(matrix_path(table), columns=columns)
+    df.index = database.from_epoch(df.pop('ts'))
+    return df
+
+def update(timeframe='1h', symbol=None, close=None, tail=False):
+    """
+    Recompute and store the label grid of a candle table from its closes
+    (read from the database unless `close` is given). With `tail`, `close`
+    holds only the latest bars, starting max(HORIZONS) bars before the first
+    new one: stored labels from its first bar on are replaced, older ones
+    kept. Returns the stored frame.
+    """
+    table = database.candle_table(timeframe, symbol)
+    if close is None:
+        close = database.get_data(timeframe, limit=10_000_000, columns=['close'], symbol=symbol)['close']
+    close = close.sort_index()
+    frame = label_frame(close)
+    if tail and not close.empty:
+        stored = load(table)
+        frame = pd.concat([stored[stored.index < close.index[0]], frame])
+    store(frame, table)
+    print(f"Stored {frame.shape[1]} labels x {len(frame)} {table} bars.")
+    return frame
+
+if __name__ == '__main__':
+    # python labels.py [SYMBOL]
+    update(symbol=sys.argv[1] if len(sys.argv) > 1 else None)
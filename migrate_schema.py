@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import sqlite3
+import database
+import feature_builder
+import schema
+
+DB_NAME = 'nifty50_data.db'
+
+# Stored strings look like '2023-03-02 09:15:00+05:30'; strftime('%s') honours
+# the offset. Strings without one were written in exchange time (IST).
+EPOCH_EXPR = """CAST(CASE
+    WHEN timestamp GLOB '*[+-][0-9][0-9]:[0-9][0-9]' THEN strftime('%s', timestamp)
+    ELSE strftime('%s', timestamp, '-330 minutes')
+END AS INTEGER)"""
+
+def affinity(ctype):
+    """
+    SQLite column affinity of a declared type; columns are only rebuilt when
+    it changes, not for spelling differences like INT vs INTEGER.
+    """
+    ctype = (ctype or '').upper()
+    if 'INT' in ctype:
+        return 'INTEGER'
+    if any(t in ctype for t in ('CHAR', 'CLOB', 'TEXT')):
+        return 'TEXT'
+    if not ctype or 'BLOB' in ctype:
+        return 'BLOB'
+    if any(t in ctype for t in ('REAL', 'FLOA', 'DOUB')):
+        return 'REAL'
+    return 'NUMERIC'
+
+def plan(conn, table):
+    """
+    Pending changes that bring `table` in line with schema.py: columns to add,
+    drop and retype, and whether the ts key has to be derived. Adds alone are
+    metadata-only ALTERs; anything else is one copy-and-swap rebuild.
+    """
+    declared = schema.table_columns(table)
+    live = {r[1]: r[2] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if declared is None or not live:
+        return None
+    names = [name for name, _ in declared]
+    changes = {
+        'table': table,
+        'add': [(name, ctype) for name, ctype in declared if name not in live],
+        'drop': [name for name in live if name not in names],
+        'retype': [name for name, ctype in declared
+                   if name in live and affinity(live[name]) != affinity(ctype)],
+        'rekey': schema.KEY not in live,
+    }
+    changes['rebuild'] = bool(changes['drop'] or changes['retype'] or changes['rekey'])
+    if changes['rekey']:
+        changes['add'] = [c for c in changes['add'] if c[0] != schema.KEY]
+    return changes
+
+def describe(changes):
+    parts = []
+    if changes['rekey']:
+        parts.append('key by ts')
+    if changes['add']:
+        parts.append('add ' + ', '.join(name for name, _ in changes['add']))
+    if changes['drop']:
+        parts.append('drop ' + ', '.join(changes['drop']))
+    if changes['retype']:
+        parts.append('retype ' + ', '.join(changes['retype']))
+    return '; '.join(parts)
+
+def source_expr(name, changes):
+    """
+    SQL that reads column `name` of the old table in its declared form: the
+    ts key derived from the timestamp text, categorical labels as their codes.
+    """
+    if name == schema.KEY and changes['rekey']:
+        return EPOCH_EXPR
+    labels = schema.categories_of(name)
+    if labels is not None and name in changes['retype']:
+        cases = ' '.join(f"WHEN '{label.upper()}' THEN {code}" for code, label in enumerate(labels))
+        return f"CASE WHEN typeof({name}) = 'text' THEN (CASE UPPER({name}) {cases} END) ELSE {name} END"
+    return name
+
+def rebuild(conn, changes):
+    """
+    Apply every pending change to one table with a single copy into a table
+    created from the schema, then swap it in, in one transaction. WAL readers
+    keep seeing the old table until the swap commits. Indexes are recreated;
+    triggers are not (features_merged is maintained by feature_builder).
+    """
+    table = changes['table']
+    declared = schema.table_columns(table)
+    live = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+    copied = [name for name, _ in declared if name in live or name == schema.KEY]
+    sources = [source_expr(name, changes) for name in copied]
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE tbl_name = ? AND type = 'index' AND sql IS NOT NULL",
+        (table,)).fetchall()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {table}_new")
+        conn.execute(schema.create_sql(f'{table}_new', declared))
+        # OR REPLACE: when re-keying, two spellings of one instant collapse to the newest row
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {table}_new ({', '.join(copied)})
+            SELECT {', '.join(sources)} FROM {table} ORDER BY rowid
+        """)
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        for name, sql in indexes:
+            try:
+                conn.execute(sql)
+            except sqlite3.OperationalError as e:
+                print(f"  Index {name} not recreated: {e}")
+        database.bump_versions(conn, [table])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def apply(conn, changes):
+    if changes['rebuild']:
+        rebuild(conn, changes)
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    for name, ctype in changes['add']:
+        conn.execute(f"ALTER TABLE {changes['table']} ADD COLUMN {name} {ctype}")
+    database.bump_versions(conn, [changes['table']])
+    conn.execute("COMMIT")
+
+def migrate(dry_run=False):
+    """
+    Plan and apply the pending schema changes of every managed table: one
+    table pass per table however many columns change, none for pure adds.
+    Returns the list of applied (or, with dry_run, planned) changes.
+    """
+    if not os.path.exists(DB_NAME):
+        print("Database does not exist. Run init_db first.")
+        return []
+
+    conn = sqlite3.connect(DB_NAME, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout=5000")
+    if not dry_run:
+        # The retired sync triggers would block renaming features_merged
+        for name in feature_builder.LEGACY_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    if not dry_run:
+        conn.execute("BEGIN IMMEDIATE")
+        database.sync_categories(conn)
+        conn.execute("COMMIT")
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]
+    pending = [c for c in (plan(conn, t) for t in tables if not t.endswith('_new'))
+               if c and (c['add'] or c['rebuild'])]
+    if not pending:
+        print("Schema is up to date.")
+    for changes in pending:
+        kind = 'rebuild' if changes['rebuild'] else 'alter'
+        print(f"{changes['table']} ({kind}): {describe(changes)}")
+        if dry_run:
+            continue
+        start = time.perf_counter()
+        apply(conn, changes)
+        print(f"  done in {time.perf_counter() - start:.2f}s")
+    conn.close()
+
+    if not dry_run and any(c['rekey'] or (c['table'] == schema.FEATURES_TABLE and c['rebuild'])
+                           for c in pending):
+        # features_merged is derived: rows written by the old sync triggers or
+        # encode_signals.py are recomputed from the migrated tables
+        previous, database.DB_NAME = database.DB_NAME, DB_NAME
+        try:
+            feature_builder.rebuild()
+        finally:
+            database.DB_NAME = previous
+    return pending
+
+if __name__ == "__main__":
+    # python migrate_schema.py [--dry-run] [DB]
+    args = [a for a in sys.argv[1:] if a != '--dry-run']
+    if args:
+        DB_NAME = args[0]
+    migrate(dry_run='--dry-run' in sys.argv[1:])
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import joblib
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from sklearn.utils.class_weight import compute_class_weight
+import database
+import labels
+import train_model
+
+# Incremental refresh of the trained forest. A refresh grows TREES_PER_REFRESH
+# new trees (warm_start) on the latest REFRESH_WINDOW bars and retires as many
+# of the oldest, so the forest keeps its size and slides towards recent data;
+# its cost depends on the window, not on the length of the history. A full
+# retrain (train_model's pipeline) happens every FULL_RETRAIN_DAYS, or sooner
+# when the current model's accuracy on the bars labelled since the last run
+# falls DRIFT_TOLERANCE below its held-out accuracy.
+STATE_FILE = 'model_state.json'
+REFRESH_WINDOW = 2000        # latest bars the new trees are grown on (~1 year of hourly bars)
+TREES_PER_REFRESH = 30
+MIN_NEW_ROWS = 7             # about one trading day of labelled bars, SIDEWAYS included
+FULL_RETRAIN_DAYS = 7
+DRIFT_TOLERANCE = 0.10
+MIN_DRIFT_ROWS = 30          # fewer new rows than this are too noisy to call drift
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+def save_state(state):
+    # Written to a temp file and renamed: readers never see a partial file
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+def full_retrain(label=None, reason='no model yet'):
+    """
+    train_model's full pipeline on the whole history; records the new model,
+    its held-out accuracy (the drift baseline) and the last bar it has seen.
+    """
+    print(f"Full retrain ({reason})")
+    df = train_model.load_and_prepare_data(label, balance=False)
+    trained_through = df['timestamp'].max()
+    X, y, feature_cols = train_model.prepare_features(train_model.balance_classes(df))
+    X_train, X_test, y_train, y_test = train_model.split_data_chronologically(X, y, test_size=0.2)
+    model, _, model_filename = train_model.train_model(X_train, X_test, y_train, y_test, feature_cols)
+    now = datetime.now().isoformat(timespec='seconds')
+    state = {
+        'model': model_filename,
+        'label': label,
+        'trained_through': str(trained_through),
+        'baseline_accuracy': accuracy_score(y_test, model.predict(X_test)),
+        'full_retrain_at': now,
+        'refreshed_at': now,
+        'refreshes': 0,
+    }
+    save_state(state)
+    return state
+
+def recent_matrix(label=None, window=REFRESH_WINDOW):
+    """
+    X, y of every labelled bar among the latest `window`, prepared as for
+    training but not downsampled, and the timestamp of each row.
+    """
+    df = train_model.load_and_prepare_data(label, limit=window, balance=False)
+    X, y, _ = train_model.prepare_features(df)
+    return X, y, df.loc[X.index, 'timestamp']
+
+def labelled_since(label, since):
+    """
+    Bars after `since` whose label has resolved, SIDEWAYS included.
+    """
+    since = pd.Timestamp(since)
+    if label is None:
+        target = database.get_features(start_date=since.isoformat(), columns=['target'])['target']
+        resolved = target[target.index > since].notna()
+    else:
+        codes = labels.load('nifty_1h', [label])[label]
+        resolved = codes[codes.index > since] >= 0
+    return int(resolved.sum())
+
+def refresh(label=None, force_full=False):
+    """
+    Bring the model up to date with the bars labelled since the last run:
+    a full retrain when there is no model, one is scheduled or forced, or
+    drift is detected; otherwise grow and retire TREES_PER_REFRESH trees.
+    Returns the new state, or None when there was nothing new to learn.
+    """
+    state = load_state()
+    if state is None or not os.path.exists(state['model']):
+        return full_retrain(label)
+    label = state['label'] if label is None else label
+    if force_full:
+        return full_retrain(label, 'forced')
+    if label != state['label']:
+        return full_retrain(label, f"label changed to {label}")
+    age = datetime.now() - datetime.fromisoformat(state['full_retrain_at'])
+    if age >= timedelta(days=FULL_RETRAIN_DAYS):
+        return full_retrain(label, f"scheduled, last one {age.days} days ago")
+
+    start = time.perf_counter()
+    new_bars = labelled_since(label, state['trained_through'])
+    if new_bars < MIN_NEW_ROWS:
+        print(f"Only {new_bars} new labelled bars since {state['trained_through']}; nothing to refresh")
+        return None
+    model = joblib.load(state['model'])
+    X, y, stamps = recent_matrix(label)
+    if set(X.columns) != set(model.feature_names_in_):
+        return full_retrain(label, 'feature columns changed')
+    X = X[model.feature_names_in_]
+    if y.nunique() < 2:
+        print("Recent window holds a single class; nothing to refresh")
+        return None
+
+    # Drift is measured on every new PUT/CALL bar, the ones the model predicts
+    new = (stamps > pd.Timestamp(state['trained_through'])).to_numpy()
+    if new.any():
+        accuracy = accuracy_score(y[new], model.predict(X[new]))
+        print(f"{new_bars} new labelled bars, {new.sum()} PUT/CALL: accuracy {accuracy:.3f} "
+              f"(baseline {state['baseline_accuracy']:.3f})")
+        if new.sum() >= MIN_DRIFT_ROWS and accuracy < state['baseline_accuracy'] - DRIFT_TOLERANCE:
+            return full_retrain(label, f"drift: accuracy {accuracy:.3f} on {new.sum()} new bars")
+    else:
+        print(f"{new_bars} new labelled bars, none PUT/CALL")
+
+    # warm_start keeps the fitted trees and only grows the extra ones. The
+    # 'balanced' preset is swapped for the window's explicit weights, which
+    # is what sklearn expects for warm-started fits on a subset. warm_start
+    # skips one seed draw per kept tree and the forest always keeps `size`,
+    # so each refresh needs its own random_state to grow different trees
+    size = len(model.estimators_)
+    class_weight, random_state = model.class_weight, model.random_state
+    classes = np.unique(y)
+    weights = compute_class_weight('balanced', classes=classes, y=y)
+    model.set_params(warm_start=True, n_estimators=size + TREES_PER_REFRESH,
+                     class_weight=dict(zip(classes, weights)),
+                     random_state=random_state + state['refreshes'] + 1)
+    model.fit(X, y)
+    model.estimators_ = model.estimators_[TREES_PER_REFRESH:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_),
+                     class_weight=class_weight, random_state=random_state)
+
+    model_filename = f"nifty50_model_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pkl"
+    joblib.dump(model, model_filename)
+    state.update({
+        'model': model_filename,
+        'trained_through': str(stamps.max()),
+        'refreshed_at': datetime.now().isoformat(timespec='seconds'),
+        'refreshes': state['refreshes'] + 1,
+    })
+    save_state(state)
+    print(f"Refreshed {TREES_PER_REFRESH} of {size} trees on {len(X)} recent rows "
+          f"in {time.perf_counter() - start:.2f}s -> {model_filename}")
+    return state
+
+if __name__ == '__main__':
+    # python model_refresh.py [--full] [LABEL]
+    args = [a for a in sys.argv[1:] if a != '--full']
+    refresh(args[0] if args else None, force_full='--full' in sys.argv[1:])
@@ -0,0 +1,86 @@
+import re
+import numpy as np
+import pandas as pd
+
+# NSE cash market session in exchange time. Intraday bars are stamped with
+# their start time and anchored to the open, so 1h bars start at 09:15,
+# 10:15, ..., 15:15 (the last one is cut short by the 15:30 close).
+IST = 'Asia/Kolkata'
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+SESSION_CLOSE = pd.Timedelta(hours=15, minutes=30)
+# Intraday bar lengths; daily bars are stamped 00:00 IST on the session date
+BAR_LENGTHS = {
+    '15m': pd.Timedelta(minutes=15),
+    '1h': pd.Timedelta(hours=1),
+}
+
+def session_offsets(interval):
+    """
+    Bar start times of a regular session for `interval`, as offsets from midnight.
+    """
+    step = BAR_LENGTHS[interval]
+    return pd.timedelta_range(SESSION_OPEN, SESSION_CLOSE - pd.Timedelta(seconds=1), freq=step)
+
+def trading_days(start, end):
+    """
+    Candidate session dates between `start` and `end` inclusive: weekdays.
+    Exchange holidays are not known up front; callers learn them from the
+    provider (see data_fetcher.find_gaps).
+    """
+    return pd.bdate_range(pd.Timestamp(start).date(), pd.Timestamp(end).date())
+
+def expected_bars(interval, start, end):
+    """
+    Bar start times (IST) a complete series of `interval` would hold in [start, end].
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    days = trading_days(start, end)
+    if interval in BAR_LENGTHS:
+        stamps = (days.values[:, None] + session_offsets(interval).values[None, :]).ravel()
+        index = pd.DatetimeIndex(np.sort(stamps)).tz_localize(IST)
+    elif interval == '1d':
+        index = days.tz_localize(IST)
+    else:
+        raise ValueError(f"No session calendar for interval {interval}")
+    return index[(index >= start) & (index <= end)]
+
+def interval_length(interval):
+    """
+    Bar length of an intraday interval such as '15m', '30m', '1h' or '4h';
+    None for '1d' and '1wk'.
+    """
+    if interval in ('1d', '1wk'):
+        return None
+    match = re.fullmatch(r'(\d+)(m|h)', interval)
+    if not match:
+        raise ValueError(f"Unsupported interval {interval}")
+    number, unit = int(match.group(1)), match.group(2)
+    return pd.Timedelta(minutes=number) if unit == 'm' else pd.Timedelta(hours=number)
+
+def bucket_starts(index, interval):
+    """
+    Start of the `interval` bar each timestamp falls in. Intraday buckets are
+    anchored at the 09:15 open and the last one of a session is cut short by
+    the 15:30 close; daily bars are stamped 00:00 IST and weekly ones on the
+    Monday of their Mon-Fri week. Timestamps outside the session map to NaT.
+    """
+    local = pd.DatetimeIndex(index).tz_convert(IST)
+    day = local.normalize()
+    if interval == '1d':
+        return day
+    if interval == '1wk':
+        return day - pd.to_timedelta(local.dayofweek, unit='D')
+    length = interval_length(interval)
+    offset = local - day
+    buckets = day + SESSION_OPEN + ((offset - SESSION_OPEN) // length) * length
+    return buckets.where((offset >= SESSION_OPEN) & (offset < SESSION_CLOSE))
+
+def can_derive(target, base):
+    """
+    True when `target` bars are exact aggregates of whole `base` bars.
+    """
+    order = {'1d': 1, '1wk': 2}
+    base_length, target_length = interval_length(base), interval_length(target)
+    if base_length is None or target_length is None:
+        return order.get(target, 0) > order.get(base, 0)
+    return target_length > base_length and target_length % base_length == pd.Timedelta(0)
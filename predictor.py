@@ -0,0 +1,245 @@
+import os
+import glob
+import time
+import threading
+import joblib
+import numpy as np
+import pandas as pd
+import archive
+import database
+import model_refresh
+import schema
+
+# Serves the newest trained model to app.py: the most recently written
+# nifty50_model_*.pkl (or the file model_refresh.STATE_FILE names). It is
+# loaded once and compiled into flat node arrays that score every tree of
+# the forest in a few vectorized numpy steps, which keeps a single-row
+# prediction far below sklearn's per-tree overhead. A watcher thread loads
+# newer artifacts in the background and swaps them in with one reference
+# assignment, so requests never wait on a reload.
+MODEL_GLOB = 'nifty50_model_*.pkl'
+RELOAD_INTERVAL = 2.0
+# train_model's target_bin: PUT = 0, CALL = 1
+CLASS_LABELS = ['PUT', 'CALL']
+
+_current = None
+_lock = threading.Lock()
+_start_lock = threading.Lock()
+_watcher = None
+
+def newest_artifact():
+    """
+    Path of the newest model file, or None when nothing has been trained:
+    refreshed models (model_refresh) and plain train_model.py runs alike.
+    """
+    paths = set(glob.glob(MODEL_GLOB))
+    state = model_refresh.load_state()
+    if state is not None and os.path.exists(state['model']):
+        paths.add(state['model'])
+    return max(paths, key=os.path.getmtime) if paths else None
+
+def compile_forest(model):
+    """
+    The fitted trees as one set of node arrays. Leaves point at themselves,
+    so `depth` rounds of "go left or right" bring every tree to its leaf.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.cumsum([0] + [t.node_count for t in trees])
+    left, right, feature, threshold, missing_left, proba = [], [], [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        nodes = np.arange(tree.node_count) + offset
+        leaf = tree.children_left == -1
+        left.append(np.where(leaf, nodes, tree.children_left + offset))
+        right.append(np.where(leaf, nodes, tree.children_right + offset))
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        missing_left.append(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool)))
+        value = tree.value[:, 0, :]
+        proba.append(value / value.sum(axis=1, keepdims=True))
+    return {
+        'roots': offsets[:-1],
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'missing_left': np.concatenate(missing_left).astype(bool),
+        'proba': np.concatenate(proba),
+        'depth': max(t.max_depth for t in trees),
+    }
+
+def forest_proba(forest, X):
+    """
+    Class probabilities of rows X (n x features, model column order), as
+    RandomForestClassifier.predict_proba: the mean of the trees' leaf
+    fractions. Compared in float32 as sklearn does; NaN follows the split's
+    missing-value direction.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    rows = np.arange(len(X))[:, None]
+    node = np.broadcast_to(forest['roots'], (len(X), len(forest['roots'])))
+    for _ in range(forest['depth']):
+        value = X[rows, forest['feature'][node]]
+        go_left = np.where(np.isnan(value), forest['missing_left'][node], value <= forest['threshold'][node])
+        node = np.where(go_left, forest['left'][node], forest['right'][node])
+    return forest['proba'][node].mean(axis=1)
+
+def load(path):
+    start = time.perf_counter()
+    model = joblib.load(path)
+    loaded = {
+        'path': path,
+        'mtime': os.path.getmtime(path),
+        'columns': list(model.feature_names_in_),
+        'classes': [CLASS_LABELS[int(c)] for c in model.classes_],
+        'forest': compile_forest(model),
+        'trees': len(model.estimators_),
+    }
+    print(f"Loaded model {path} ({loaded['trees']} trees) in {time.perf_counter() - start:.2f}s")
+    return loaded
+
+def reload():
+    """
+    Swap in the newest artifact when it differs from the served one. A file
+    that fails to load (e.g. still being written) is retried on the next poll.
+    """
+    global _current
+    with _lock:
+        path = newest_artifact()
+        if path is None:
+            return _current
+        current = _current
+        if current is not None and current['path'] == path and current['mtime'] == os.path.getmtime(path):
+            return current
+        try:
+            _current = load(path)
+        except Exception as e:
+            print(f"Model {path} not loaded: {e}")
+        return _current
+
+def _watch():
+    while True:
+        time.sleep(RELOAD_INTERVAL)
+        reload()
+
+def start():
+    """
+    Load the newest model and start the background watcher; a no-op once
+    the watcher runs, so app.py can call it before every request.
+    """
+    global _watcher
+    if _watcher is not None:
+        return
+    with _start_lock:
+        if _watcher is None:
+            reload()
+            _watcher = threading.Thread(target=_watch, daemon=True, name='model-watcher')
+            _watcher.start()
+
+def current():
+    return _current if _current is not None else reload()
+
+def feature_rows(df, columns):
+    """
+    Model inputs (float array, columns in the model's order) from
+    features_merged rows indexed by timestamp or from submitted records.
+    Same conversion as train_model.numeric_features: categoricals (stored,
+    or submitted as labels or codes) as codes, anything unparseable and any
+    missing column as NaN; `hour` comes from a timestamp index. Built
+    straight into one array; frame-wide pandas operations (reindex, column
+    assignment) would cost more than the whole forest.
+    """
+    out = np.full((len(df), len(columns)), np.nan)
+    dtypes = df.dtypes
+    numeric, other = [], []
+    for j, col in enumerate(columns):
+        if col not in dtypes.index:
+            if col == 'hour' and isinstance(df.index, pd.DatetimeIndex):
+                out[:, j] = df.index.hour
+        elif schema.categories_of(col) is None and pd.api.types.is_numeric_dtype(dtypes[col]):
+            numeric.append(j)
+        else:
+            other.append(j)
+    # The plain numeric columns in one conversion
+    out[:, numeric] = df[[columns[j] for j in numeric]].to_numpy(dtype=np.float64, na_value=np.nan)
+    for j in other:
+        col = columns[j]
+        if isinstance(dtypes[col], pd.CategoricalDtype) or schema.categories_of(col) is not None:
+            codes = database.category_codes(df[col], col)
+            out[:, j] = np.where(codes >= 0, codes, np.nan)
+        else:
+            out[:, j] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return out
+
+def predict_rows(X, served):
+    """
+    One dict per row of model inputs X: the class probabilities, the
+    predicted class and its confidence.
+    """
+    proba = forest_proba(served['forest'], X)
+    best = proba.argmax(axis=1)
+    return [{
+        'probabilities': dict(zip(served['classes'], map(float, p))),
+        'prediction': served['classes'][b],
+        'confidence': float(p[b]),
+    } for p, b in zip(proba, best)]
+
+def predict(df, served=None):
+    """
+    Predictions for the rows of `df` (features_merged rows or submitted records).
+    """
+    served = served or current()
+    if served is None:
+        raise LookupError("No trained model found")
+    return predict_rows(feature_rows(df, served['columns']), served)
+
+def _hot_rows(columns, limit):
+    """
+    (timestamps, model inputs) of the latest `limit` bars read straight from
+    the hot features_merged rows, where categoricals are already stored as
+    codes; no DataFrame is built. None when the rows can't be served this
+    way (bars in the archive, or legacy text in a numeric column).
+    """
+    with database.pooled_connection() as conn:
+        live = {r[1] for r in conn.execute(f"PRAGMA table_info({schema.FEATURES_TABLE})")}
+        stored = [c for c in columns if c in live and c != schema.KEY]
+        rows = conn.execute(
+            f"SELECT ts{''.join(', ' + c for c in stored)} FROM {schema.FEATURES_TABLE} "
+            f"ORDER BY ts DESC LIMIT ?", (limit,)).fetchall()
+    if len(rows) < limit and archive.watermark(schema.FEATURES_TABLE) is not None:
+        return None
+    try:
+        values = np.array(rows, dtype=np.float64).reshape(len(rows), len(stored) + 1)[::-1]
+    except (TypeError, ValueError):
+        return None
+    stamps = database.from_epoch(values[:, 0])
+    out = np.full((len(rows), len(columns)), np.nan)
+    positions = {c: i + 1 for i, c in enumerate(stored)}
+    for j, col in enumerate(columns):
+        if col in positions:
+            out[:, j] = values[:, positions[col]]
+        elif col == 'hour':
+            out[:, j] = stamps.hour
+    return stamps, out
+
+def predict_latest(limit=1):
+    """
+    Predictions for the latest `limit` bars of features_merged, oldest first.
+    """
+    served = current()
+    if served is None:
+        raise LookupError("No trained model found")
+    hot = _hot_rows(served['columns'], limit)
+    if hot is not None:
+        stamps, X = hot
+        results = predict_rows(X, served)
+    else:
+        df = database.get_features(limit=limit).sort_index()
+        stamps = df.index
+        results = predict(df, served)
+    for stamp, result in zip(stamps.strftime('%Y-%m-%d %H:%M:%S'), results):
+        result['timestamp'] = stamp
+    return results, served
+
+if __name__ == '__main__':
+    results, served = predict_latest()
+    print(f"{served['path']}: {results[0]}")
@@ -1,43 +1,66 @@
+import os
+import multiprocessing
 import indicators
+import streaming_indicators
 import database
+import labels
+import schema
 import pandas as pd
 
-def process_hourly_signals():
+# Streaming indicator engine checkpoints, one per timeframe
+CHECKPOINT_FILE = 'indicator_state_{}.json'
+
+def add_targets(df):
+    """
+    T+3 future close/return and the CALL/PUT/SIDEWAYS label derived from it
+    (labels.HORIZON / labels.THRESHOLD), as a categorical over the stored codes.
+    """
+    df['future_close'] = df['close'].shift(-labels.HORIZON)
+    df['future_return'] = (df['future_close'] - df['close']) / df['close']
+    df['target'] = pd.Categorical.from_codes(labels.target_codes(df['close']), schema.CATEGORIES['target'])
+    return df
+
+def checkpoint_path(timeframe, symbol=None):
+    if database.symbol_prefix(symbol) == 'nifty':
+        return CHECKPOINT_FILE.format(timeframe)
+    return CHECKPOINT_FILE.format(database.candle_table(timeframe, symbol))
+
+def process_hourly_signals(symbol=None):
+    """
+    Recompute hourly indicators and T+3 targets over the stored history; the
+    updater advances them with stream_signals instead.
+    symbol: defaults to the index
+    """
     print("Fetching hourly data from database...")
-    df = database.get_data('1h', limit=100000)
+    df = database.get_data('1h', limit=100000, symbol=symbol)
     
     if df.empty:
         print("No hourly data found.")
         return
 
-    print(f"Calculating indicators and signals for {len(df)} rows...")
     df = df.sort_index()
 
+    print(f"Calculating indicators and signals for {len(df)} rows...")
+
     # 1. Technical Indicators
     df = indicators.calculate_hourly_indicators(df)
 
-    # 2. Shift close by 3 rows to create future_close (T+3 logic)
-    df['future_close'] = df['close'].shift(-3)
-    df['future_return'] = (df['future_close'] - df['close']) / df['close']
-
-    # 3. Target columns
-    def categorize_target(ret):
-        if pd.isna(ret): return None
-        if ret > 0.004: return 'CALL'
-        elif ret < -0.004: return 'PUT'
-        else: return 'SIDEWAYS'
-
-    df['target'] = df['future_return'].apply(categorize_target)
+    # 2. T+3 future return and target columns
+    df = add_targets(df)
 
     print("Storing processed hourly data...")
-    database.store_data(df, '1h')
+    database.store_data(df, '1h', symbol)
+    # Full horizon x threshold label grid from the same closes
+    labels.update('1h', symbol, df['close'])
     
     # Save CSV reference
-    df.dropna(subset=['target']).to_csv('nifty50_hourly_targets.csv')
+    if database.symbol_prefix(symbol) == 'nifty':
+        df.dropna(subset=['target']).to_csv('nifty50_hourly_targets.csv')
 
-def process_daily_signals():
+def process_daily_signals(symbol=None):
     print("Fetching daily data from database...")
-    df = database.get_data('1d', limit=100000)
+    # Daily indicators only depend on close
+    df = database.get_data('1d', limit=100000, columns=['close'], symbol=symbol)
     
     if df.empty:
         print("No daily data found.")
@@ -48,7 +71,105 @@ def process_daily_signals():
     df = indicators.calculate_daily_indicators(df)
 
     print("Storing processed daily data...")
-    database.store_data(df, '1d')
+    database.store_data(df, '1d', symbol)
+
+def _compute_symbol(task):
+    """
+    Pool worker: read one symbol's stored bars and compute its hourly signals
+    and daily indicators. Returns (symbol, hourly, daily, error).
+    """
+    symbol, backend = task
+    try:
+        hourly = database.get_data('1h', limit=100000, symbol=symbol).sort_index()
+        if not hourly.empty:
+            hourly = add_targets(indicators.calculate_hourly_indicators(hourly, backend=backend))
+        daily = database.get_data('1d', limit=100000, columns=['close'], symbol=symbol).sort_index()
+        if not daily.empty:
+            daily = indicators.calculate_daily_indicators(daily, backend=backend)
+        return symbol, hourly, daily, None
+    except Exception as e:
+        return symbol, None, None, str(e)
+
+def process_symbols(symbols=None, workers=None, backend='pandas'):
+    """
+    Full hourly/daily recompute for many symbols (default: all registered).
+    Reads and indicator math run in a process pool, one symbol per task;
+    results are written back from this process as they arrive, so SQLite only
+    ever sees one writer.
+    """
+    symbols = database.list_symbols() if symbols is None else list(symbols)
+    workers = min(workers or os.cpu_count(), len(symbols))
+    tasks = [(symbol, backend) for symbol in symbols]
+    print(f"Processing {len(symbols)} symbols with {workers} workers...")
+
+    if workers <= 1:
+        results = map(_compute_symbol, tasks)
+        pool = None
+    else:
+        # Pooled SQLite connections must not be inherited across fork()
+        database.close_pool()
+        pool = multiprocessing.get_context('fork').Pool(workers)
+        results = pool.imap_unordered(_compute_symbol, tasks)
+
+    failed = []
+    try:
+        for symbol, hourly, daily, error in results:
+            if error is not None:
+                print(f"Error processing {symbol}: {error}")
+                failed.append(symbol)
+                continue
+            if not hourly.empty:
+                database.store_data(hourly, '1h', symbol)
+                labels.update('1h', symbol, hourly['close'])
+            if not daily.empty:
+                database.store_data(daily, '1d', symbol)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return failed
+
+def stream_signals(timeframe, symbol=None):
+    """
+    Advance the streaming indicator engine over bars stored since its last
+    checkpoint. The newest bar may still be forming, so it is evaluated
+    without committing engine state and gets recomputed next cycle.
+    """
+    path = checkpoint_path(timeframe, symbol)
+    engine = streaming_indicators.load_checkpoint(path)
+
+    if engine is None or engine.last_timestamp is None:
+        print(f"No {timeframe} indicator checkpoint, replaying stored history once...")
+        engine = streaming_indicators.new_engine(timeframe)
+        df = database.get_data(timeframe, limit=100000, symbol=symbol)
+        prev = df.iloc[:0]
+    else:
+        df = database.get_data(timeframe, start_date=engine.last_timestamp, symbol=symbol)
+        df = df[df.index > pd.Timestamp(engine.last_timestamp)]
+        # Committed bars whose target and label grid are still waiting on
+        # these new closes
+        prev = database.get_data(timeframe, end_date=engine.last_timestamp,
+                                 limit=max(labels.HORIZONS), symbol=symbol)
+
+    if df.empty:
+        print(f"No new {timeframe} bars since {engine.last_timestamp}.")
+        return
+
+    df = df.sort_index()
+    rows = []
+    for i, (ts, bar) in enumerate(df.iterrows()):
+        rows.append(engine.update(bar, ts, commit=i < len(df) - 1))
+    computed = pd.DataFrame(rows, index=df.index)
+    df[computed.columns] = computed
+
+    if timeframe == '1h':
+        df = add_targets(pd.concat([prev.sort_index(), df]))
+
+    print(f"Storing {len(df)} streamed {timeframe} rows...")
+    database.store_data(df, timeframe, symbol)
+    if timeframe == '1h':
+        labels.update('1h', symbol, df['close'], tail=True)
+    engine.save(path)
 
 if __name__ == "__main__":
     process_hourly_signals()
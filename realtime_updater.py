@@ -1,12 +1,26 @@
+import os
 import time
 import schedule
 import data_fetcher
 import database
+import process_data
+import resampler
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 import pytz
 
 # Constants
 IST = pytz.timezone('Asia/Kolkata')
+# Downloaded every cycle; 1h and 1wk are derived from these (see resampler)
+FETCH_TIMEFRAMES = ['15m', '1d']
+# 1h is also backfilled from the provider: 15m history only reaches back 60 days
+GAP_CHECK_TIMEFRAMES = ['15m', '1h', '1d']
+# Timeframes with indicators
+PROCESSED_TIMEFRAMES = ['1h', '1d']
+# Seconds to wait for one provider request before giving up on it this cycle
+FETCH_TIMEOUT = 60
+# Date the stored series were last checked for holes
+_last_gap_check = None
 
 def is_market_open():
     """
@@ -24,10 +38,148 @@ def is_market_open():
     
     return market_start <= current_time <= market_end
 
+def run_stages(stages, workers=None):
+    """
+    Run a dependency graph of stages on a thread pool.
+    stages: {name: (fn, deps, timeout)}; fn() runs once all deps succeeded and
+    its return value lands in the returned results. A stage is skipped when a
+    dependency failed, timed out or was skipped. A timed-out stage's thread is
+    abandoned and its result discarded.
+    Returns (results, report) with report[name] = (status, start, seconds)
+    relative to the start of the run. workers=1 runs the stages one at a time.
+    """
+    t0 = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=workers or len(stages))
+    pending = dict(stages)
+    running = {}
+    results, report = {}, {}
+    started = {}
+
+    def timed_stage(name, fn):
+        # Stamped in the worker thread, so time spent queued for a thread doesn't count
+        def run():
+            started[name] = time.perf_counter()
+            return fn()
+        return run
+
+    def schedule_ready():
+        progress = True
+        while progress:
+            progress = False
+            for name, (fn, deps, timeout) in list(pending.items()):
+                states = [report[d][0] if d in report else None for d in deps]
+                if any(state not in (None, 'ok') for state in states):
+                    report[name] = ('skipped', time.perf_counter() - t0, 0.0)
+                elif all(state == 'ok' for state in states):
+                    running[pool.submit(timed_stage(name, fn))] = (name, timeout)
+                else:
+                    continue
+                del pending[name]
+                progress = True
+
+    schedule_ready()
+    while running:
+        now = time.perf_counter()
+        deadlines = [started[name] + timeout for name, timeout in running.values()
+                     if timeout and name in started]
+        # Poll briefly while stages with a timeout are still waiting for a thread
+        waiting = any(timeout and name not in started for name, timeout in running.values())
+        wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+        if waiting:
+            wait_for = min(wait_for, 0.1) if wait_for is not None else 0.1
+        done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+        now = time.perf_counter()
+        for future in list(running):
+            name, timeout = running[future]
+            if future in done:
+                try:
+                    results[name] = future.result()
+                    status = 'ok'
+                except Exception as e:
+                    status = f'failed: {e}'
+            elif timeout and name in started and now - started[name] >= timeout:
+                status = 'timeout'
+            else:
+                continue
+            begin = started.get(name, now)
+            report[name] = (status, begin - t0, now - begin)
+            del running[future]
+        schedule_ready()
+
+    pool.shutdown(wait=False, cancel_futures=True)
+    return results, report
+
+def print_report(report, total):
+    for name, (status, start, seconds) in sorted(report.items(), key=lambda item: item[1][1]):
+        print(f"  {name:<12} {status:<10} start +{start:6.2f}s  took {seconds:6.2f}s")
+    print(f"  cycle total {total:.2f}s")
+
+def backfill_gaps(tf):
+    """
+    Fill holes in `tf` (see data_fetcher.backfill_gaps). Filled bars are older
+    than the streaming checkpoint, so the checkpoint is dropped and the next
+    cycle replays the series once.
+    """
+    filled = data_fetcher.backfill_gaps(tf)
+    if filled and tf in PROCESSED_TIMEFRAMES:
+        path = process_data.checkpoint_path(tf)
+        if os.path.exists(path):
+            os.remove(path)
+    return filled
+
+def build_stages(check_gaps):
+    """
+    One update cycle as a graph: fetches run concurrently, coarser timeframes
+    are rebuilt from their stored base (resampler.DERIVED_TIMEFRAMES) instead
+    of downloaded and each timeframe is processed as soon as its own data
+    lands. features_merged follows every store (see feature_builder).
+    """
+    stages = {}
+    results = {}
+
+    def fetch(tf):
+        def run():
+            results[f'fetch_{tf}'] = df = data_fetcher.fetch_missing(tf)
+            return df
+        return run
+
+    def store(tf):
+        def run():
+            df = results[f'fetch_{tf}']
+            if not df.empty:
+                database.store_data(df, tf)
+        return run
+
+    def derive(tf, base):
+        return lambda: resampler.update_resampled(tf, base)
+
+    def process(tf):
+        return lambda: process_data.stream_signals(tf)
+
+    # Stage after which each timeframe's candles are up to date
+    landed = {}
+    for tf in FETCH_TIMEFRAMES:
+        stages[f'fetch_{tf}'] = (fetch(tf), [], FETCH_TIMEOUT)
+        stages[f'store_{tf}'] = (store(tf), [f'fetch_{tf}'], None)
+        landed[tf] = f'store_{tf}'
+    for tf, base in resampler.DERIVED_TIMEFRAMES.items():
+        stages[f'derive_{tf}'] = (derive(tf, base), [landed[base]], None)
+        landed[tf] = f'derive_{tf}'
+    for tf in PROCESSED_TIMEFRAMES:
+        stages[f'process_{tf}'] = (process(tf), [landed[tf]], None)
+        landed[tf] = f'process_{tf}'
+    if check_gaps:
+        for tf in GAP_CHECK_TIMEFRAMES:
+            # Off the critical path: nothing waits on the backfill
+            stages[f'gaps_{tf}'] = ((lambda tf=tf: backfill_gaps(tf)), [landed[tf]], FETCH_TIMEOUT)
+    return stages
+
 def update_realtime_data():
     """
-    Fetch latest data and update database for all timeframes
+    Fetch latest data and update database for all timeframes.
+    Returns the per-stage report of the cycle.
     """
+    global _last_gap_check
     print(f"[{datetime.now(IST)}] Checking for updates...")
     
     # Even if market is closed, we might want to run this once to ensure we have latest data
@@ -39,42 +191,16 @@ def update_realtime_data():
         # return 
         
     try:
-        # Update 15m data
-        try:
-            print("Updating 15m data...")
-            df_15m = data_fetcher.fetch_latest_data('15m')
-            if not df_15m.empty:
-                database.store_data(df_15m, '15m')
-        except Exception as e:
-            print(f"Error updating 15m: {e}")
-            
-        # Update 1h data
-        try:
-            print("Updating 1h data...")
-            df_1h = data_fetcher.fetch_latest_data('1h')
-            if not df_1h.empty:
-                database.store_data(df_1h, '1h')
-        except Exception as e:
-            print(f"Error updating 1h: {e}")
-            
-        # Update Daily data (to get current day's candle)
-        try:
-            print("Updating Daily data...")
-            df_1d = data_fetcher.fetch_nifty_data('1d', '5d')
-            if not df_1d.empty:
-                database.store_data(df_1d, '1d')
-        except Exception as e:
-            print(f"Error updating 1d: {e}")
-            
-        # Run signal and indicator processing
-        try:
-            import process_data
-            process_data.process_hourly_signals()
-            process_data.process_daily_signals()
-        except Exception as e:
-            print(f"Error processing signals/indicators: {e}")
-            
+        # Holes left by missed cycles are backfilled once per day
+        check_gaps = _last_gap_check != datetime.now(IST).date()
+        start = time.perf_counter()
+        _, report = run_stages(build_stages(check_gaps))
+
+        if check_gaps and all(report[f'gaps_{tf}'][0] == 'ok' for tf in GAP_CHECK_TIMEFRAMES):
+            _last_gap_check = datetime.now(IST).date()
         print("Update cycle completed.")
+        print_report(report, time.perf_counter() - start)
+        return report
         
     except Exception as e:
         print(f"Error in update_realtime_data: {e}")
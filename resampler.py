@@ -0,0 +1,91 @@
+import pandas as pd
+import database
+import nse_calendar
+
+# Coarser timeframes kept in sync from a finer stored one instead of being
+# downloaded. 1d is not derived: the official NSE close is set in the
+# closing session, not by the last intraday trade.
+DERIVED_TIMEFRAMES = {'1h': '15m', '1wk': '1d'}
+OHLCV_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+def resample(df, interval):
+    """
+    Aggregate OHLCV bars into NSE-session-aware `interval` candles (see
+    nse_calendar.bucket_starts). The last candle may still be forming.
+    """
+    if df.empty:
+        return df[[c for c in OHLCV_AGG if c in df.columns]]
+    buckets = nse_calendar.bucket_starts(df.index, interval)
+    agg = {c: how for c, how in OHLCV_AGG.items() if c in df.columns}
+    out = df[list(agg)].groupby(buckets).agg(agg)
+    out.index.name = 'timestamp'
+    return out
+
+def base_for(interval, symbol=None):
+    """
+    Coarsest stored timeframe `interval` can be derived from (fewest rows to
+    read; weekly candles come from the official daily bars), or None.
+    """
+    for base in sorted(database.TIMEFRAMES, key=_length_key, reverse=True):
+        if nse_calendar.can_derive(interval, base) and database.last_timestamp(base, symbol) is not None:
+            return base
+    return None
+
+def _length_key(interval):
+    length = nse_calendar.interval_length(interval)
+    return length if length is not None else pd.Timedelta(days={'1d': 1, '1wk': 7}[interval])
+
+def bars_per_bucket(interval, base):
+    """
+    Most `base` bars one `interval` candle can hold: intraday candles end at
+    the session close, weekly ones hold five sessions.
+    """
+    days = 5 if interval == '1wk' else 1
+    base_length = nse_calendar.interval_length(base)
+    if base_length is None:
+        return days
+    session = -(-(nse_calendar.SESSION_CLOSE - nse_calendar.SESSION_OPEN) // base_length)
+    target_length = nse_calendar.interval_length(interval)
+    if target_length is None:
+        return days * session
+    return min(-(-target_length // base_length), session)
+
+def get_resampled(interval, base=None, start_date=None, end_date=None, limit=None, symbol=None):
+    """
+    `interval` candles built on the fly from stored `base` bars (default: see
+    base_for), newest first like get_data. Without a start date, `limit`
+    candles need only the newest base bars: one candle's worth more than they
+    can hold, so the oldest candle returned is never cut short.
+    """
+    base = base or base_for(interval, symbol)
+    if base is None:
+        raise ValueError(f"No stored timeframe to build {interval} candles from")
+    if not nse_calendar.can_derive(interval, base):
+        raise ValueError(f"{interval} candles cannot be built from {base} bars")
+    base_limit = None
+    if limit and start_date is None:
+        base_limit = (int(limit) + 1) * bars_per_bucket(interval, base)
+    df = database.get_data(base, start_date=start_date, end_date=end_date, limit=base_limit,
+                           columns=list(OHLCV_AGG), symbol=symbol)
+    out = resample(df.sort_index(), interval).sort_index(ascending=False)
+    return out.head(limit) if limit else out
+
+def update_resampled(interval, base=None, symbol=None):
+    """
+    Bring the stored `interval` series up to date from its base: only the
+    newest stored candle (which may have been forming) and later ones are
+    rebuilt, and store_data writes just the candles that changed.
+    """
+    base = base or DERIVED_TIMEFRAMES[interval]
+    last = database.last_timestamp(interval, symbol)
+    start = str(last) if last is not None else None
+    df = database.get_data(base, start_date=start, columns=list(OHLCV_AGG), symbol=symbol)
+    if df.empty:
+        return df
+    out = resample(df.sort_index(), interval)
+    database.store_data(out, interval, symbol)
+    return out
+
+if __name__ == '__main__':
+    for tf, base in DERIVED_TIMEFRAMES.items():
+        update_resampled(tf, base)
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+import contextlib
+import pandas as pd
+import nse_calendar
+
+try:
+    import fcntl
+except ImportError:   # Windows: writers are only serialized within the process
+    fcntl = None
+
+# Raw provider responses, content-addressed: blobs/<sha256 of the frame>.parquet.
+# The index maps each request key to a blob plus its expiry, so identical
+# responses to different requests are stored once. Lookups never write the
+# index: their hit counts and recency wait in memory for the next write, and
+# every write re-reads the index under a file lock shared by all processes.
+CACHE_DIR = 'response_cache'
+IST = 'Asia/Kolkata'
+# Total blob size kept on disk; least recently used entries go first
+MAX_BYTES = 512 * 1024 * 1024
+# Lifetime of responses that include the running session
+LIVE_TTL = 60
+
+_lock = threading.Lock()
+_index = None
+# Lookups since this process last wrote the index
+_pending = {'stats': {'hits': 0, 'misses': 0, 'expired': 0}, 'used': {}}
+
+def _index_path():
+    return os.path.join(CACHE_DIR, 'index.json')
+
+def _blob_path(digest):
+    return os.path.join(CACHE_DIR, 'blobs', f'{digest}.parquet')
+
+def _mtime():
+    try:
+        return os.stat(_index_path()).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _load():
+    """
+    The index, re-read when another process has rewritten it.
+    """
+    global _index
+    mtime = _mtime()
+    if _index is None or _index['dir'] != CACHE_DIR or _index['mtime'] != mtime:
+        data = {'entries': {}, 'stats': {'hits': 0, 'misses': 0, 'expired': 0}}
+        if mtime is not None:
+            with open(_index_path()) as f:
+                data = json.load(f)
+        _index = {'dir': CACHE_DIR, 'mtime': mtime, 'data': data}
+    return _index['data']
+
+@contextlib.contextmanager
+def _locked():
+    """
+    Exclusive right to rewrite the index: the thread lock, plus a lock on
+    index.lock against other processes.
+    """
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(os.path.join(CACHE_DIR, 'index.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+def _apply_pending(data):
+    for name, count in _pending['stats'].items():
+        data['stats'][name] += count
+        _pending['stats'][name] = 0
+    for key, used in _pending['used'].items():
+        if key in data['entries']:
+            data['entries'][key]['used'] = max(data['entries'][key]['used'], used)
+    _pending['used'].clear()
+
+def _save():
+    """
+    Write the index atomically; callers hold _locked() and loaded it under it.
+    """
+    _apply_pending(_index['data'])
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _index_path() + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(_index['data'], f)
+    os.replace(tmp_path, _index_path())
+    _index['mtime'] = _mtime()
+
+def request_key(symbol, interval, period=None, start=None, end=None):
+    """
+    Cache key of one provider request; range bounds are normalized to IST.
+    """
+    def bound(value):
+        if value is None:
+            return None
+        value = pd.Timestamp(value)
+        value = value.tz_localize(IST) if value.tz is None else value.tz_convert(IST)
+        return value.isoformat()
+    if start is not None:
+        return f'{symbol}|{interval}|{bound(start)}|{bound(end)}'
+    return f'{symbol}|{interval}|{period}'
+
+def expiry(start=None, end=None, now=None):
+    """
+    Epoch second at which a response stops being valid, None if never.
+    A range ending before the running session only holds closed bars and is
+    immutable. Anything else is live: it expires after LIVE_TTL during the
+    session and at the next session open otherwise, since bars can't change
+    while the market is shut.
+    """
+    now = pd.Timestamp.now(tz=IST) if now is None else pd.Timestamp(now).tz_convert(IST)
+    day = now.normalize()
+    in_session = (now.weekday() < 5
+                  and day + nse_calendar.SESSION_OPEN <= now < day + nse_calendar.SESSION_CLOSE)
+    if start is not None and end is not None:
+        closed_until = day + nse_calendar.SESSION_OPEN if in_session else now
+        end = pd.Timestamp(end)
+        end = end.tz_localize(IST) if end.tz is None else end
+        if end <= closed_until:
+            return None
+    if in_session:
+        return int(now.timestamp()) + LIVE_TTL
+    next_day = day if now < day + nse_calendar.SESSION_OPEN else day + pd.Timedelta(days=1)
+    next_open = nse_calendar.trading_days(next_day, next_day + pd.Timedelta(days=7))[0]
+    return int((next_open.tz_localize(IST) + nse_calendar.SESSION_OPEN).timestamp())
+
+def _expired(entry):
+    return (entry['expires'] is not None and entry['expires'] <= time.time()) \
+        or not os.path.exists(_blob_path(entry['blob']))
+
+def get(key):
+    """
+    Cached frame for `key`, or None on a miss or an expired entry. Only an
+    expired entry, which is dropped, rewrites the index.
+    """
+    with _lock:
+        entry = _load()['entries'].get(key)
+        if entry is None:
+            _pending['stats']['misses'] += 1
+            return None
+        expired = _expired(entry)
+        if expired:
+            _pending['stats']['expired'] += 1
+        else:
+            _pending['stats']['hits'] += 1
+            _pending['used'][key] = time.time()
+            path = _blob_path(entry['blob'])
+    if expired:
+        with _locked():
+            data = _load()
+            # Another process may have stored a fresh response meanwhile
+            if key in data['entries'] and _expired(data['entries'][key]):
+                _drop(data, [key])
+            _save()
+        return None
+    try:
+        return pd.read_parquet(path)
+    except FileNotFoundError:
+        # Evicted by another process since the lookup
+        return None
+
+def put(key, df, expires):
+    """
+    Store the response `df` for `key`, then evict down to MAX_BYTES.
+    A response larger than MAX_BYTES on its own is not kept.
+    """
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).values.tobytes()
+                            + '|'.join(map(str, df.columns)).encode()).hexdigest()
+    path = _blob_path(digest)
+    with _locked():
+        data = _load()
+        _apply_pending(data)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            df.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        data['entries'][key] = {'blob': digest, 'expires': expires, 'used': time.time(),
+                                'bytes': os.path.getsize(path)}
+        if data['entries'][key]['bytes'] > MAX_BYTES:
+            _drop(data, [key])
+        _evict(data)
+        _save()
+
+def _drop(data, keys):
+    """
+    Remove index entries and delete the blobs no other entry refers to.
+    """
+    blobs = {data['entries'].pop(key)['blob'] for key in keys}
+    blobs -= {entry['blob'] for entry in data['entries'].values()}
+    for blob in blobs:
+        if os.path.exists(_blob_path(blob)):
+            os.remove(_blob_path(blob))
+
+def _evict(data):
+    now = time.time()
+    _drop(data, [k for k, e in data['entries'].items() if e['expires'] is not None and e['expires'] <= now])
+    blobs = {}
+    for key, entry in data['entries'].items():
+        blobs.setdefault(entry['blob'], []).append(key)
+    total = sum(data['entries'][keys[0]]['bytes'] for keys in blobs.values())
+    # A blob's recency is that of its most recently used request
+    order = sorted(blobs, key=lambda b: max(data['entries'][k]['used'] for k in blobs[b]))
+    for blob in order:
+        if total <= MAX_BYTES:
+            break
+        total -= data['entries'][blobs[blob][0]]['bytes']
+        _drop(data, blobs[blob])
+
+def report():
+    """
+    Entry count, disk usage and hit rate of the cache since it was created.
+    """
+    with _lock:
+        data = _load()
+        stats = {name: count + _pending['stats'][name] for name, count in data['stats'].items()}
+        blobs = {e['blob']: e['bytes'] for e in data['entries'].values()}
+        immutable = sum(e['expires'] is None for e in data['entries'].values())
+    lookups = stats['hits'] + stats['misses'] + stats['expired']
+    stats.update(entries=len(data['entries']), immutable=immutable, blobs=len(blobs),
+                 bytes=sum(blobs.values()), hit_rate=stats['hits'] / lookups if lookups else 0.0)
+    return stats
+
+def clear():
+    global _index
+    with _locked():
+        data = _load()
+        for entry in data['entries'].values():
+            if os.path.exists(_blob_path(entry['blob'])):
+                os.remove(_blob_path(entry['blob']))
+        if os.path.exists(_index_path()):
+            os.remove(_index_path())
+        _index = None
+        _pending['stats'] = dict.fromkeys(_pending['stats'], 0)
+        _pending['used'].clear()
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'clear':
+        clear()
+        print("Response cache cleared.")
+    else:
+        r = report()
+        print(f"{r['entries']} cached responses ({r['immutable']} immutable) in {r['blobs']} blobs, "
+              f"{r['bytes'] / 1024 / 1024:.1f} MiB")
+        print(f"{r['hits']} hits, {r['misses']} misses, {r['expired']} expired: hit rate {r['hit_rate']:.1%}")
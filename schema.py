@@ -0,0 +1,98 @@
+# Declarative schema of the stored tables. Tables are created from it and
+# migrate_schema.py brings existing databases in line with it, so a schema
+# change is an edit here rather than another migration script.
+# Columns are (name, storage type); every table is keyed by `ts`. Categorical
+# columns are stored as small INTEGER codes into CATEGORIES.
+KEY = 'ts'
+
+CANDLE_COLUMNS = [
+    ('ts', 'INTEGER'), ('timestamp', 'TEXT'),
+    ('open', 'REAL'), ('high', 'REAL'), ('low', 'REAL'), ('close', 'REAL'),
+    ('volume', 'INTEGER'), ('target', 'INTEGER'),
+]
+
+HOURLY_INDICATORS = [
+    ('rsi_14', 'REAL'), ('rsi_sma_14', 'REAL'), ('rsi_diff', 'REAL'),
+    ('rsi_slope', 'REAL'), ('rsi_dist_50', 'REAL'), ('rsi_zone', 'INTEGER'),
+    ('roc_7', 'REAL'), ('roc_9', 'REAL'), ('roc_21', 'REAL'),
+    ('roc7_flag', 'INTEGER'), ('roc_accel', 'REAL'),
+    ('hl_range', 'REAL'), ('range_pct', 'REAL'),
+    ('ema_7', 'REAL'), ('ema_9', 'REAL'), ('ema_20', 'REAL'),
+    ('ema_50', 'REAL'), ('ema_100', 'REAL'), ('sma_25', 'REAL'),
+    ('lsma_25', 'REAL'), ('close_gt_lsma', 'INTEGER'), ('close_lt_lsma', 'INTEGER'),
+    ('close_pct_lsma', 'REAL'), ('lsma_diff', 'REAL'), ('close_pct_sma_25', 'REAL'), ('ema_alignment', 'INTEGER'),
+    ('bb_upper', 'REAL'), ('bb_lower', 'REAL'), ('bb_middle', 'REAL'),
+    ('bb_width', 'REAL'), ('bb_squeeze', 'INTEGER'), ('bb_position', 'REAL'),
+    ('bb_range', 'REAL'), ('bb_upper_slope', 'REAL'), ('bb_lower_slope', 'REAL'),
+    ('atr_14', 'REAL'), ('atr_pct', 'REAL'),
+    ('break_high_5', 'INTEGER'), ('break_low_5', 'INTEGER'),
+]
+
+DAILY_INDICATORS = [
+    ('rsi_14', 'REAL'), ('rsi_slope', 'REAL'),
+    ('ema_20', 'REAL'), ('ema_20_slope', 'REAL'),
+    ('trend_flag', 'INTEGER'),
+]
+
+# Indicator columns per timeframe; other timeframes hold plain candles
+INDICATOR_COLUMNS = {'1h': HOURLY_INDICATORS, '1d': DAILY_INDICATORS}
+
+# Dictionary encodings of the categorical columns: code = position in the
+# list, NULL = missing. Mirrored into the `categories` table for ad-hoc SQL.
+# Codes are stored, so labels may be appended but never reordered.
+CATEGORIES = {
+    'rsi_zone': ['Neutral', 'Overbought', 'Oversold'],
+    'ema_alignment': ['MIXED', 'BULLISH', 'BEARISH'],
+    'trend_flag': ['BEARISH', 'BULLISH'],
+    'target': ['PUT', 'SIDEWAYS', 'CALL'],
+}
+# 0/1 indicator flags
+FLAG_COLUMNS = {'roc7_flag', 'close_gt_lsma', 'close_lt_lsma', 'bb_squeeze',
+                'break_high_5', 'break_low_5'}
+# Kept at float64 even when indicators are read as float32
+PRICE_COLUMNS = {'open', 'high', 'low', 'close'}
+
+# features_merged: every hourly column, the previous daily bar's indicators
+# as daily_<column> and the target's code as `signal` (see feature_builder)
+FEATURES_TABLE = 'features_merged'
+DAILY_FEATURE_EXCLUDE = {'ts', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'target'}
+
+def categories_of(column):
+    """
+    Labels of a categorical column (daily_<column> in features_merged
+    included), None for other columns.
+    """
+    if column in CATEGORIES:
+        return CATEGORIES[column]
+    if column.startswith('daily_'):
+        return CATEGORIES.get(column[len('daily_'):])
+    return None
+
+def candle_columns(timeframe):
+    return CANDLE_COLUMNS + INDICATOR_COLUMNS.get(timeframe, [])
+
+def feature_columns():
+    daily = [(f'daily_{name}', ctype) for name, ctype in candle_columns('1d')
+             if name not in DAILY_FEATURE_EXCLUDE]
+    return candle_columns('1h') + daily + [('signal', 'INTEGER')]
+
+def table_columns(table):
+    """
+    Declared columns of `table`: features_merged or a <prefix>_<timeframe>
+    candle table; None for tables the schema doesn't manage.
+    """
+    if table == FEATURES_TABLE:
+        return feature_columns()
+    prefix, _, timeframe = table.rpartition('_')
+    if not prefix or not timeframe[:1].isdigit():
+        return None
+    return candle_columns(timeframe)
+
+def create_sql(table, columns=None):
+    columns = columns or table_columns(table)
+    col_defs = ''.join(f",\n                {name} {ctype}" for name, ctype in columns if name != KEY)
+    return f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {KEY} INTEGER PRIMARY KEY{col_defs}
+            )
+        '''
@@ -0,0 +1,447 @@
+import json
+import math
+import os
+from collections import deque
+
+NaN = float('nan')
+
+def _isnan(x):
+    return x is None or x != x
+
+class _Stateful:
+    """
+    Base for indicator components whose state is a flat dict of numbers and deques.
+    """
+    def get_state(self):
+        state = {}
+        for key, value in self.__dict__.items():
+            if isinstance(value, deque):
+                state[key] = {'deque': list(value), 'maxlen': value.maxlen}
+            else:
+                state[key] = value
+        return state
+
+    def set_state(self, state):
+        for key, value in state.items():
+            if isinstance(value, dict) and 'deque' in value:
+                value = deque(value['deque'], maxlen=value['maxlen'])
+            setattr(self, key, value)
+
+class EWM(_Stateful):
+    """
+    Streaming version of pandas Series.ewm(alpha=...).mean(), including the
+    adjust=True weighting used by pandas_ta's rma (Wilder smoothing).
+    """
+    def __init__(self, alpha, adjust=True, min_periods=1):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = min_periods
+        self.weighted = NaN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        # Mirrors pandas' ewm recursion step for step so results agree
+        is_obs = not _isnan(x)
+        self.nobs += is_obs
+        if not _isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                new_wt = 1.0 if self.adjust else self.alpha
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + new_wt * x) / (self.old_wt + new_wt)
+                self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.min_periods else NaN
+
+class EMA(_Stateful):
+    """
+    pandas_ta ema: SMA of the first `length` values as seed, then adjust=False EWM.
+    """
+    def __init__(self, length):
+        self.length = length
+        self.count = 0
+        self.seed = []
+        self.ewm = EWM(2.0 / (length + 1), adjust=False)
+
+    def get_state(self):
+        return {'length': self.length, 'count': self.count, 'seed': list(self.seed),
+                'ewm': self.ewm.get_state()}
+
+    def set_state(self, state):
+        self.length = state['length']
+        self.count = state['count']
+        self.seed = list(state['seed'])
+        self.ewm.set_state(state['ewm'])
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.length:
+            self.seed.append(x)
+            return NaN
+        if self.count == self.length:
+            self.seed.append(x)
+            x = math.fsum(self.seed) / self.length
+            self.seed = []
+        return self.ewm.update(x)
+
+class RollingWindow(_Stateful):
+    """
+    Fixed-length window with O(1) running sums (plus the 1..n weighted sum
+    needed by linear regression). Values are shifted by the first observation
+    to limit cancellation, and the sums are recomputed exactly once per
+    window wrap so rounding never accumulates.
+    """
+    def __init__(self, length):
+        self.length = length
+        self.values = deque(maxlen=length)
+        self.shift = None
+        self.nans = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.wsum = 0.0
+        self.updates = 0
+
+    def update(self, x):
+        if self.shift is None and not _isnan(x):
+            self.shift = x
+        full = len(self.values) == self.length
+        old = self.values[0] if full else None
+        self.values.append(x)
+        self.updates += 1
+        if self.updates % self.length == 0:
+            self._recompute()
+            return
+        if full:
+            # Every remaining value moves down one weight, whether or not the
+            # oldest (weight 1, already in sum) was NaN; then the oldest leaves
+            self.wsum -= self.sum
+            if _isnan(old):
+                self.nans -= 1
+            else:
+                y = old - self.shift
+                self.sum -= y
+                self.sumsq -= y * y
+        if _isnan(x):
+            self.nans += 1
+        else:
+            y = x - self.shift
+            self.sum += y
+            self.sumsq += y * y
+            self.wsum += len(self.values) * y
+
+    def _recompute(self):
+        ys = [0.0 if _isnan(v) else v - self.shift for v in self.values]
+        self.nans = sum(_isnan(v) for v in self.values)
+        self.sum = math.fsum(ys)
+        self.sumsq = math.fsum(y * y for y in ys)
+        self.wsum = math.fsum((i + 1) * y for i, y in enumerate(ys))
+
+    @property
+    def ready(self):
+        return len(self.values) == self.length and self.nans == 0
+
+    def mean(self):
+        if not self.ready:
+            return NaN
+        return self.sum / self.length + self.shift
+
+    def std(self):
+        # Population standard deviation (ddof=0), as used by pandas_ta bbands
+        if not self.ready:
+            return NaN
+        m = self.sum / self.length
+        return math.sqrt(max(self.sumsq / self.length - m * m, 0.0))
+
+    def linreg(self):
+        # pandas_ta linreg: least squares over x = 1..n, evaluated at m * (n - 1) + b
+        if not self.ready:
+            return NaN
+        n = self.length
+        x_sum = 0.5 * n * (n + 1)
+        x2_sum = x_sum * (2 * n + 1) / 3
+        divisor = n * x2_sum - x_sum * x_sum
+        m = (n * self.wsum - x_sum * self.sum) / divisor
+        b = (self.sum - m * x_sum) / n
+        return m * (n - 1) + b + self.shift
+
+class RollingExtreme(_Stateful):
+    """
+    Rolling max (or min) over the last `length` values with a monotonic deque.
+    """
+    def __init__(self, length, mode='max'):
+        self.length = length
+        self.mode = mode
+        self.index = 0
+        self.window = deque()
+
+    def get_state(self):
+        return {'length': self.length, 'mode': self.mode, 'index': self.index,
+                'window': [list(item) for item in self.window]}
+
+    def set_state(self, state):
+        self.length = state['length']
+        self.mode = state['mode']
+        self.index = state['index']
+        self.window = deque(tuple(item) for item in state['window'])
+
+    def value(self):
+        if self.index < self.length:
+            return NaN
+        return self.window[0][1]
+
+    def update(self, x):
+        dominated = (lambda v: v <= x) if self.mode == 'max' else (lambda v: v >= x)
+        while self.window and dominated(self.window[-1][1]):
+            self.window.pop()
+        self.window.append((self.index, x))
+        self.index += 1
+        while self.window[0][0] <= self.index - 1 - self.length:
+            self.window.popleft()
+
+class Lag(_Stateful):
+    """
+    Keeps the last `length` + 1 values so x[t] - x[t - length] is O(1).
+    """
+    def __init__(self, length):
+        self.values = deque(maxlen=length + 1)
+
+    def update(self, x):
+        self.values.append(x)
+
+    def ago(self):
+        if len(self.values) < self.values.maxlen:
+            return NaN
+        return self.values[0]
+
+class IndicatorEngine:
+    """
+    Holds named components and serializes them as one checkpoint.
+    """
+    timeframe = None
+
+    def __init__(self):
+        self.last_timestamp = None
+        self.components = {}
+
+    def to_dict(self):
+        return {
+            'timeframe': self.timeframe,
+            'last_timestamp': self.last_timestamp,
+            'components': {name: comp.get_state() for name, comp in self.components.items()},
+        }
+
+    def load_dict(self, data):
+        self.last_timestamp = data['last_timestamp']
+        for name, state in data['components'].items():
+            self.components[name].set_state(state)
+
+    def update(self, bar, timestamp=None, commit=True):
+        """
+        Feed one closed bar (anything indexable by open/high/low/close) and
+        return the indicator values for it. With commit=False the state is left
+        untouched, which is how an in-progress candle is evaluated.
+        """
+        if not commit:
+            return self.clone().update(bar, timestamp)
+        values = self._step(bar)
+        if timestamp is not None:
+            self.last_timestamp = str(timestamp)
+        return values
+
+    def clone(self):
+        """
+        Independent copy rebuilt from the checkpoint state, several times
+        cheaper than copy.deepcopy on the per-tick partial-candle path.
+        """
+        engine = type(self)()
+        engine.load_dict(self.to_dict())
+        return engine
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+class HourlyIndicatorEngine(IndicatorEngine):
+    """
+    Streaming equivalent of indicators.calculate_hourly_indicators.
+    """
+    timeframe = '1h'
+
+    def __init__(self):
+        super().__init__()
+        self.components = {
+            'rsi_gain': EWM(1.0 / 14, min_periods=14),
+            'rsi_loss': EWM(1.0 / 14, min_periods=14),
+            'rsi_sma': RollingWindow(14),
+            'rsi_lag': Lag(3),
+            'close_lag': Lag(21),
+            'ema_7': EMA(7), 'ema_9': EMA(9), 'ema_20': EMA(20),
+            'ema_50': EMA(50), 'ema_100': EMA(100),
+            'close_25': RollingWindow(25),
+            'close_20': RollingWindow(20),
+            'bb_width_sma': RollingWindow(20),
+            'bb_upper_lag': Lag(1),
+            'bb_lower_lag': Lag(1),
+            'atr': EWM(1.0 / 14, min_periods=14),
+            'high_5': RollingExtreme(5, 'max'),
+            'low_5': RollingExtreme(5, 'min'),
+        }
+
+    def _step(self, bar):
+        c = self.components
+        o, h, l, close = float(bar['open']), float(bar['high']), float(bar['low']), float(bar['close'])
+        prev_close = c['close_lag'].values[-1] if c['close_lag'].values else NaN
+        out = {}
+
+        # RSI (Wilder smoothing of gains/losses)
+        delta = close - prev_close
+        gain = c['rsi_gain'].update(NaN if _isnan(delta) else max(delta, 0.0))
+        loss = c['rsi_loss'].update(NaN if _isnan(delta) else abs(min(delta, 0.0)))
+        rsi = 100 * gain / (gain + loss) if gain + loss else NaN
+        c['rsi_sma'].update(rsi)
+        c['rsi_lag'].update(rsi)
+        out['rsi_14'] = rsi
+        out['rsi_sma_14'] = c['rsi_sma'].mean()
+        out['rsi_diff'] = rsi - out['rsi_sma_14']
+        out['rsi_slope'] = rsi - c['rsi_lag'].ago()
+        out['rsi_dist_50'] = rsi - 50
+        out['rsi_zone'] = 'Overbought' if rsi > 70 else ('Oversold' if rsi < 30 else 'Neutral')
+
+        # ROC Suite
+        c['close_lag'].update(close)
+        lags = c['close_lag'].values
+        def roc(n):
+            if len(lags) <= n:
+                return NaN
+            past = lags[-1 - n]
+            return 100 * (close - past) / past
+        out['roc_7'] = roc(7)
+        out['roc_9'] = roc(9)
+        out['roc_21'] = roc(21)
+        out['roc7_flag'] = int(out['roc_7'] > 0)
+        out['roc_accel'] = out['roc_7'] - out['roc_21']
+
+        # Range Metrics
+        out['hl_range'] = h - l
+        out['range_pct'] = (out['hl_range'] / close) * 100
+
+        # Moving Averages
+        for name in ('ema_7', 'ema_9', 'ema_20', 'ema_50', 'ema_100'):
+            out[name] = c[name].update(close)
+        c['close_25'].update(close)
+        c['close_20'].update(close)
+        out['sma_25'] = c['close_25'].mean()
+        out['lsma_25'] = c['close_25'].linreg()
+
+        # LSMA Logic
+        out['close_gt_lsma'] = int(close > out['lsma_25'])
+        out['close_lt_lsma'] = int(close < out['lsma_25'])
+        out['close_pct_lsma'] = (close - out['lsma_25']) / out['lsma_25'] * 100
+        out['lsma_diff'] = close - out['lsma_25']
+        out['close_pct_sma_25'] = (close - out['sma_25']) / out['sma_25'] * 100
+
+        # EMA Alignment Flag
+        e20, e50, e100 = out['ema_20'], out['ema_50'], out['ema_100']
+        if _isnan(e100):
+            out['ema_alignment'] = None
+        elif e20 > e50 > e100:
+            out['ema_alignment'] = 'BULLISH'
+        elif e20 < e50 < e100:
+            out['ema_alignment'] = 'BEARISH'
+        else:
+            out['ema_alignment'] = 'MIXED'
+
+        # Bollinger Bands
+        mid = c['close_20'].mean()
+        dev = 2 * c['close_20'].std()
+        out['bb_upper'] = mid + dev
+        out['bb_lower'] = mid - dev
+        out['bb_middle'] = mid
+        out['bb_width'] = (out['bb_upper'] - out['bb_lower']) / mid
+        c['bb_width_sma'].update(out['bb_width'])
+        out['bb_squeeze'] = int(out['bb_width'] < c['bb_width_sma'].mean())
+        band = out['bb_upper'] - out['bb_lower']
+        out['bb_position'] = (close - out['bb_lower']) / band if band else NaN
+        out['bb_range'] = band
+        c['bb_upper_lag'].update(out['bb_upper'])
+        c['bb_lower_lag'].update(out['bb_lower'])
+        out['bb_upper_slope'] = out['bb_upper'] - c['bb_upper_lag'].ago()
+        out['bb_lower_slope'] = out['bb_lower'] - c['bb_lower_lag'].ago()
+
+        # ATR (true range is undefined on the first bar)
+        if _isnan(prev_close):
+            tr = NaN
+        else:
+            tr = max(abs(h - l), abs(h - prev_close), abs(prev_close - l))
+        out['atr_14'] = c['atr'].update(tr)
+        out['atr_pct'] = out['atr_14'] / close * 100
+
+        # Breakouts against the previous 5 bars
+        out['break_high_5'] = int(close > c['high_5'].value())
+        out['break_low_5'] = int(close < c['low_5'].value())
+        c['high_5'].update(h)
+        c['low_5'].update(l)
+
+        return out
+
+class DailyIndicatorEngine(IndicatorEngine):
+    """
+    Streaming equivalent of indicators.calculate_daily_indicators.
+    """
+    timeframe = '1d'
+
+    def __init__(self):
+        super().__init__()
+        self.components = {
+            'rsi_gain': EWM(1.0 / 14, min_periods=14),
+            'rsi_loss': EWM(1.0 / 14, min_periods=14),
+            'rsi_lag': Lag(3),
+            'ema_20': EMA(20),
+            'ema_lag': Lag(3),
+            'prev_close': Lag(1),
+        }
+
+    def _step(self, bar):
+        c = self.components
+        close = float(bar['close'])
+        prev_close = c['prev_close'].values[-1] if c['prev_close'].values else NaN
+        c['prev_close'].update(close)
+        out = {}
+
+        delta = close - prev_close
+        gain = c['rsi_gain'].update(NaN if _isnan(delta) else max(delta, 0.0))
+        loss = c['rsi_loss'].update(NaN if _isnan(delta) else abs(min(delta, 0.0)))
+        rsi = 100 * gain / (gain + loss) if gain + loss else NaN
+        c['rsi_lag'].update(rsi)
+        out['rsi_14'] = rsi
+        out['rsi_slope'] = rsi - c['rsi_lag'].ago()
+
+        ema = c['ema_20'].update(close)
+        c['ema_lag'].update(ema)
+        out['ema_20'] = ema
+        out['ema_20_slope'] = ema - c['ema_lag'].ago()
+        out['trend_flag'] = 'BULLISH' if close > ema else 'BEARISH'
+
+        return out
+
+ENGINES = {'1h': HourlyIndicatorEngine, '1d': DailyIndicatorEngine}
+
+def new_engine(timeframe):
+    return ENGINES[timeframe]()
+
+def load_checkpoint(path):
+    """
+    Restore an engine from a checkpoint written by IndicatorEngine.save.
+    Returns None if there is no checkpoint yet.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    engine = new_engine(data['timeframe'])
+    engine.load_dict(data)
+    return engine
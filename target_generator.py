@@ -1,27 +1,21 @@
 import pandas as pd
+import labels
+import schema
 
-def generate_targets(df):
+def generate_targets(df, horizon=labels.HORIZON, threshold=labels.THRESHOLD):
     """
     Takes an hourly OHLC dataframe and adds signals based on future returns.
+    For a whole horizon x threshold grid use labels.label_frame.
     """
-    # 1. Shift close by 3 rows to create future_close (looking 3 hours ahead)
-    df['future_close'] = df['close'].shift(-3)
+    # 1. Shift close by `horizon` rows to create future_close (3 hours ahead by default)
+    df['future_close'] = df['close'].shift(-horizon)
 
     # 2. Compute future_return
     df['future_return'] = (df['future_close'] - df['close']) / df['close']
 
-    # 3. Create target column
-    def categorize_target(ret):
-        if pd.isna(ret):
-            return None
-        if ret > 0.004:
-            return 'CALL'
-        elif ret < -0.004:
-            return 'PUT'
-        else:
-            return 'SIDEWAYS'
-
-    df['target'] = df['future_return'].apply(categorize_target)
+    # 3. Create target column, vectorized over the close array
+    codes = labels.target_codes(df['close'], horizon, threshold)
+    df['target'] = pd.Categorical.from_codes(codes, schema.CATEGORIES['target'])
 
     # 4. Drop rows with NaN
     df_result = df.dropna(subset=['future_close', 'future_return', 'target']).copy()
@@ -1,24 +1,59 @@
-import sqlite3
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 import joblib
 from datetime import datetime
+import os
+import sys
+import json
+import database
+import feature_cache
+import labels
+import schema
 
-def load_and_prepare_data():
+# Columns never used as ML features
+EXCLUDE_COLS = [
+    'timestamp',       # Time identifier
+    'date',            # Date component
+    'time',            # Time string
+    'target',          # Original target string
+    'signal',          # Old name
+    'target_encoded',  # Old name
+    'target_bin'       # This is our target variable (what we predict)
+]
+# Part of the feature cache key: bump when load_and_prepare_data or
+# prepare_features change what they produce
+PREPARE_VERSION = 1
+# Probability cut-offs for the precision/coverage analysis
+CONFIDENCE_THRESHOLDS = [0.4, 0.5, 0.6, 0.7]
+# Random Forest hyperparameters; hyperparam_search.py writes tuned values to
+# PARAMS_FILE, which override these
+MODEL_PARAMS = {'n_estimators': 300, 'max_depth': 6, 'min_samples_leaf': 30}
+PARAMS_FILE = 'model_params.json'
+
+def load_and_prepare_data(label=None, limit=None, balance=True):
     """
-    Load data from features_merged table and prepare for ML
+    Load data from features_merged table and prepare for ML.
+    label: any column of the stored label grid (e.g. 'h5_t60', see labels.py)
+    to train on instead of the stored T+3 target.
+    limit: only the latest `limit` bars (model_refresh.py's recent window).
+    balance: downsample the majority class (balance_classes); without it
+    every labelled PUT/CALL bar is kept.
     """
     print("=" * 60)
     print("STEP 1: Loading data from features_merged")
     print("=" * 60)
     
-    conn = sqlite3.connect('nifty50_data.db')
+    # Load all data, or the latest `limit` bars (hot SQLite rows plus archived months)
+    df = database.get_features(limit=limit).reset_index()
     
-    # Load all data
-    df = pd.read_sql("SELECT * FROM features_merged", conn)
-    conn.close()
+    if label is not None:
+        # Swap in the chosen label from the stored matrix; the features are not re-read
+        codes = labels.load('nifty_1h', [label])[label].reindex(df['timestamp'])
+        df['target'] = pd.Categorical.from_codes(codes.fillna(-1).astype('int8').to_numpy(),
+                                                 schema.CATEGORIES['target'])
+        print(f"Using label {label} from the label matrix")
     
     print(f"Loaded {len(df)} rows")
     print(f"Columns: {len(df.columns)}")
@@ -31,14 +66,28 @@ def load_and_prepare_data():
     # STEP 1 — Filter SIDEWAYS
     print(f"\nFiltering out SIDEWAYS data...")
     rows_before = len(df)
-    df = df[df['target'] != 'SIDEWAYS'].copy()
+    df = df[df['target'].isin(['PUT', 'CALL'])].copy()
     print(f"  Rows before: {rows_before} | Rows after (PUT/CALL only): {len(df)}")
     
     # STEP 2 — Use target_bin instead of target_encoded
     # PUT = 0, CALL = 1 for binary classification
     df['target_bin'] = df['target'].map({'PUT': 0, 'CALL': 1})
     
-    # Class Balancing using resample
+    if balance:
+        df = balance_classes(df)
+    
+    # Extract hour from timestamp
+    df['hour'] = df['timestamp'].dt.hour
+    
+    print(f"Date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
+    print(f"Hour range: {df['hour'].min()} to {df['hour'].max()}")
+    
+    return df
+
+def balance_classes(df):
+    """
+    Downsample the majority of PUT and CALL rows to the size of the minority.
+    """
     print(f"\nBalancing classes (PUT vs CALL)...")
     from sklearn.utils import resample
     df_put = df[df["target_bin"] == 0]
@@ -53,15 +102,23 @@ def load_and_prepare_data():
     
     df = pd.concat([df_put_resampled, df_call_resampled]).sort_values("timestamp")
     print(f"  Final balanced rows: {len(df)}")
-    
-    # Extract hour from timestamp
-    df['hour'] = df['timestamp'].dt.hour
-    
-    print(f"Date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
-    print(f"Hour range: {df['hour'].min()} to {df['hour'].max()}")
-    
     return df
 
+def numeric_features(X):
+    """
+    X as numbers, the way the model sees it: categorical columns (rsi_zone,
+    ema_alignment, daily_trend_flag...) as their stored codes, anything
+    unparseable as NaN. predictor.feature_rows applies the same rules.
+    """
+    X = X.copy()
+    # Numeric columns would pass through to_numeric unchanged; only the others are touched
+    for col, dtype in X.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            X[col] = X[col].cat.codes.where(X[col].notna())
+        elif not pd.api.types.is_numeric_dtype(dtype):
+            X[col] = pd.to_numeric(X[col], errors='coerce')
+    return X
+
 def prepare_features(df):
     """
     Prepare features and target for ML
@@ -70,22 +127,11 @@ def prepare_features(df):
     print("STEP 3: Preparing features and target")
     print("=" * 60)
     
-    # Define columns to exclude from ML features
-    exclude_cols = [
-        'timestamp',       # Time identifier
-        'date',            # Date component
-        'time',            # Time string
-        'target',          # Original target string
-        'signal',          # Old name
-        'target_encoded',  # Old name
-        'target_bin'       # This is our target variable (what we predict)
-    ]
-    
     print(f"\n📌 Using 'target_bin' as target (PUT=0, CALL=1)")
     print(f"📌 'hour' feature created from timestamp (9:15 → 9, 10:15 → 10)")
     
     # Get feature columns
-    feature_cols = [col for col in df.columns if col not in exclude_cols]
+    feature_cols = [col for col in df.columns if col not in EXCLUDE_COLS]
     
     # CHECK FOR FEATURE LEAKAGE
     print("\n" + "=" * 60)
@@ -115,7 +161,7 @@ def prepare_features(df):
         print("   Attempting to convert to numeric...")
     
     # ENFORCE NUMERIC: Convert all to numeric, coerce errors to NaN
-    X = X.apply(pd.to_numeric, errors='coerce')
+    X = numeric_features(X)
     
     # Check for columns with all NaN values
     all_nan_cols = X.columns[X.isna().all()].tolist()
@@ -154,6 +200,34 @@ def prepare_features(df):
     
     return X, y, list(X.columns)
 
+def matrix_key(label=None):
+    """
+    Feature cache key of the prepared matrix for `label`.
+    """
+    return feature_cache.fingerprint(
+        'features_merged', label, labels.matrix_path('nifty_1h') if label is not None else None,
+        exclude=EXCLUDE_COLS, version=PREPARE_VERSION)
+
+def load_training_matrix(label=None):
+    """
+    X, y and the feature columns, from the feature cache when features_merged,
+    the label and the preparation are unchanged since the matrix was built;
+    otherwise prepared from features_merged and cached. X's index is the
+    position of each row's bar in the full chronological hourly series.
+    """
+    key = matrix_key(label)
+    cached = feature_cache.load(key)
+    if cached is not None:
+        X, y, feature_cols = cached
+        print(f"Loaded prepared matrix {key} from the feature cache: "
+              f"{len(X)} rows, {len(feature_cols)} features")
+        return X, y, feature_cols
+
+    df = load_and_prepare_data(label)
+    X, y, feature_cols = prepare_features(df)
+    feature_cache.store(key, X, y)
+    return X, y, feature_cols
+
 def split_data_chronologically(X, y, test_size=0.2):
     """
     Split data chronologically (NOT random) to avoid look-ahead bias
@@ -177,6 +251,46 @@ def split_data_chronologically(X, y, test_size=0.2):
     
     return X_train, X_test, y_train, y_test
 
+def model_params():
+    """
+    MODEL_PARAMS with the tuned values from PARAMS_FILE, when it exists.
+    """
+    params = dict(MODEL_PARAMS)
+    if os.path.exists(PARAMS_FILE):
+        with open(PARAMS_FILE) as f:
+            params.update(json.load(f)['params'])
+    return params
+
+def make_model(n_jobs=-1, **params):
+    """
+    The Random Forest every training and backtest run uses; `params`
+    override model_params() (the search uses this to try configurations).
+    """
+    return RandomForestClassifier(
+        **{**model_params(), **params},
+        random_state=42,
+        n_jobs=n_jobs,
+        class_weight='balanced'  # Handle class imbalance
+    )
+
+def confidence_metrics(y_true, y_pred, confidence, thresholds=CONFIDENCE_THRESHOLDS):
+    """
+    PUT/CALL precision, trade counts and coverage of the predictions made with
+    at least each confidence threshold. Returns one dict per threshold.
+    """
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    rows = []
+    for threshold in thresholds:
+        mask = np.asarray(confidence) >= threshold
+        row = {'threshold': threshold, 'coverage': mask.mean() if len(mask) else 0.0}
+        for code, name in ((0, 'put'), (1, 'call')):
+            picked = mask & (y_pred == code)
+            row[f'{name}_trades'] = int(picked.sum())
+            # zero_division=0 as in classification_report
+            row[f'{name}_precision'] = (y_true[picked] == code).mean() if picked.any() else 0.0
+        rows.append(row)
+    return rows
+
 def train_model(X_train, X_test, y_train, y_test, feature_cols):
     """
     Train Random Forest classifier (NO SCALING - RF doesn't need it)
@@ -188,21 +302,13 @@ def train_model(X_train, X_test, y_train, y_test, feature_cols):
     # NO SCALER - RandomForest doesn't need feature scaling
     print("\n✅ Using raw features (no scaling - RF doesn't need it)")
     
-    # Train model with improved hyperparameters
-    print("\nTraining Random Forest with conservative hyperparameters...")
-    print("  - n_estimators: 300 (more trees for stability)")
-    print("  - max_depth: 6 (reduced to prevent overfitting)")
-    print("  - min_samples_leaf: 30 (increased for ~5000 rows)")
-    
-    model = RandomForestClassifier(
-        n_estimators=300,
-        max_depth=6,
-        min_samples_leaf=30,
-        random_state=42,
-        n_jobs=-1,
-        class_weight='balanced'  # Handle class imbalance
-    )
+    # Train model with the default or tuned hyperparameters
+    source = PARAMS_FILE if os.path.exists(PARAMS_FILE) else 'defaults'
+    print(f"\nTraining Random Forest with hyperparameters from {source}:")
+    for name, value in model_params().items():
+        print(f"  - {name}: {value}")
     
+    model = make_model()
     model.fit(X_train, y_train)
     
     # Evaluate
@@ -239,24 +345,12 @@ def train_model(X_train, X_test, y_train, y_test, feature_cols):
     
     # Analyze precision by confidence threshold
     print(f"\n📊 Precision at confidence thresholds:")
-    for threshold in [0.4, 0.5, 0.6, 0.7]:
-        mask = confidence_test >= threshold
-        if mask.sum() > 0:
-            sub_y_test = y_test[mask]
-            sub_y_pred = y_pred_test[mask]
-            
-            # Recalculate precision for PUT and CALL at this threshold
-            # We use zero_division=0 to handle cases where threshold is too high
-            sub_report = classification_report(sub_y_test, sub_y_pred, 
-                                             labels=[0, 1],
-                                             target_names=['PUT', 'CALL'],
-                                             output_dict=True,
-                                             zero_division=0)
-            
-            print(f"  Confidence >= {threshold}:")
-            print(f"    PUT Precision:  {sub_report['PUT']['precision']:.3f} ({ (sub_y_pred==0).sum() } trades)")
-            print(f"    CALL Precision: {sub_report['CALL']['precision']:.3f} ({ (sub_y_pred==1).sum() } trades)")
-            print(f"    Coverage:       {mask.sum() / len(y_test) * 100:.1f}% of data")
+    for m in confidence_metrics(y_test, y_pred_test, confidence_test):
+        if m['put_trades'] + m['call_trades'] > 0:
+            print(f"  Confidence >= {m['threshold']}:")
+            print(f"    PUT Precision:  {m['put_precision']:.3f} ({m['put_trades']} trades)")
+            print(f"    CALL Precision: {m['call_precision']:.3f} ({m['call_trades']} trades)")
+            print(f"    Coverage:       {m['coverage'] * 100:.1f}% of data")
     
     print(f"\n💡 TRADING GUIDELINE: Focus on PUT/CALL Precision at >0.6 Confidence.")
     
@@ -299,24 +393,21 @@ def train_model(X_train, X_test, y_train, y_test, feature_cols):
     confidence_df.to_csv(f'test_predictions_{timestamp}.csv', index=False)
     print(f"✅ Test predictions with confidence saved: test_predictions_{timestamp}.csv")
     
-    return model, feature_importance
+    return model, feature_importance, model_filename
 
-def main():
+def main(label=None):
     print("\n" + "=" * 60)
     print("NIFTY 50 ML TRAINING PIPELINE (FIXED)")
     print("=" * 60)
     
-    # Load and prepare data
-    df = load_and_prepare_data()
-    
-    # Prepare features
-    X, y, feature_cols = prepare_features(df)
+    # Load and prepare data (cached while the inputs are unchanged)
+    X, y, feature_cols = load_training_matrix(label)
     
     # Split chronologically
     X_train, X_test, y_train, y_test = split_data_chronologically(X, y, test_size=0.2)
     
     # Train and evaluate
-    model, feature_importance = train_model(
+    model, feature_importance, model_filename = train_model(
         X_train, X_test, y_train, y_test, feature_cols
     )
     
@@ -333,4 +424,5 @@ def main():
     print("\n💡 Remember: Trade only when confidence > 0.6!")
 
 if __name__ == "__main__":
-    main()
+    # python train_model.py [LABEL], e.g. h5_t60 for T+5 at +/-0.60%
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
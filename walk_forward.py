@@ -0,0 +1,116 @@
+import os
+import time
+import argparse
+import multiprocessing
+import numpy as np
+import pandas as pd
+import database
+import feature_cache
+import labels
+import train_model
+
+# Walk-forward evaluation of the train_model pipeline. The prepared matrix is
+# split into N_FOLDS + 1 chronological blocks: the first only trains, each
+# later block is one test fold. Folds train and predict in a process pool;
+# workers map the cached matrix (feature_cache) instead of receiving a copy.
+N_FOLDS = 5
+MODES = ('expanding', 'rolling')
+
+def make_folds(bars, n_folds=N_FOLDS, mode='expanding', window=None, embargo=labels.HORIZON):
+    """
+    (train_rows, test_rows) position arrays per fold over a matrix whose rows
+    sit at bar positions `bars` (ascending). Expanding folds train on
+    everything before the test block, rolling folds on the last `window` rows
+    (default: one block). Training rows whose label reaches into the test
+    block (bar + embargo >= first test bar) are purged.
+    """
+    bars = np.asarray(bars)
+    edges = np.linspace(0, len(bars), n_folds + 2).astype(int)
+    window = window or edges[1]
+    folds = []
+    for start, end in zip(edges[1:-1], edges[2:]):
+        first = 0 if mode == 'expanding' else max(0, start - window)
+        train = np.arange(first, start)
+        train = train[bars[train] + embargo < bars[start]]
+        folds.append((train, np.arange(start, end)))
+    return folds
+
+def _run_fold(task):
+    """
+    Pool worker: fit one fold on the memory-mapped matrix and return its test
+    predictions. Runs single-threaded; the folds are the parallelism.
+    """
+    key, fold, train, test = task
+    X, y, _ = feature_cache.load(key)
+    start = time.perf_counter()
+    model = train_model.make_model(n_jobs=1)
+    model.fit(X.iloc[train], y.iloc[train])
+    probs = model.predict_proba(X.iloc[test])
+    return {
+        'fold': fold,
+        'y_true': y.iloc[test].to_numpy(),
+        'y_pred': model.classes_[probs.argmax(axis=1)],
+        'confidence': probs.max(axis=1),
+        'seconds': time.perf_counter() - start,
+    }
+
+def _metrics_frame(fold, y_true, y_pred, confidence):
+    frame = pd.DataFrame(train_model.confidence_metrics(y_true, y_pred, confidence))
+    frame.insert(0, 'fold', fold)
+    frame.insert(1, 'accuracy', (np.asarray(y_true) == np.asarray(y_pred)).mean())
+    return frame
+
+def walk_forward(label=None, n_folds=N_FOLDS, mode='expanding', window=None, embargo=None, workers=None):
+    """
+    Train and evaluate every fold, in parallel across `workers` processes.
+    Returns (per_fold, aggregate): precision/trades/coverage per fold and
+    confidence threshold, and the same over all test predictions pooled.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    embargo = labels.horizon_of(label) if embargo is None else embargo
+    X, y, _ = train_model.load_training_matrix(label)
+    key = train_model.matrix_key(label)
+    folds = make_folds(X.index, n_folds, mode, window, embargo)
+    tasks = [(key, i + 1, train, test) for i, (train, test) in enumerate(folds)]
+    workers = min(workers or os.cpu_count(), len(tasks))
+    print(f"Walk-forward ({mode}, embargo {embargo} bars): {len(tasks)} folds, {workers} workers")
+    for _, fold, train, test in tasks:
+        print(f"  fold {fold}: train {len(train)} rows | test {len(test)} rows")
+
+    start = time.perf_counter()
+    if workers <= 1:
+        results = list(map(_run_fold, tasks))
+    else:
+        # Pooled SQLite connections must not be inherited across fork()
+        database.close_pool()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            results = pool.map(_run_fold, tasks)
+    elapsed = time.perf_counter() - start
+
+    per_fold = pd.concat([_metrics_frame(r['fold'], r['y_true'], r['y_pred'], r['confidence'])
+                          for r in results], ignore_index=True)
+    aggregate = _metrics_frame('all', *(np.concatenate([r[k] for r in results])
+                                        for k in ('y_true', 'y_pred', 'confidence')))
+    print(f"Trained {len(results)} folds in {elapsed:.2f}s "
+          f"(fold fits sum to {sum(r['seconds'] for r in results):.2f}s)")
+    return per_fold, aggregate
+
+def report(per_fold, aggregate):
+    columns = ['fold', 'threshold', 'accuracy', 'put_precision', 'put_trades',
+               'call_precision', 'call_trades', 'coverage']
+    print("\nPer fold:")
+    print(per_fold[columns].to_string(index=False, float_format='%.3f'))
+    print("\nAll test folds pooled:")
+    print(aggregate[columns].to_string(index=False, float_format='%.3f'))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the RandomForest pipeline")
+    parser.add_argument('label', nargs='?', help="label from the label matrix, e.g. h5_t60")
+    parser.add_argument('--mode', choices=MODES, default='expanding')
+    parser.add_argument('--folds', type=int, default=N_FOLDS)
+    parser.add_argument('--window', type=int, help="rolling training window in rows")
+    parser.add_argument('--embargo', type=int, help="bars purged before each test fold")
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    report(*walk_forward(args.label, args.folds, args.mode, args.window, args.embargo, args.workers))